@@ -3,18 +3,27 @@ EU AI Act Klassifizierungs-Tool
 Streamlit-basierte Webanwendung zur automatischen Einstufung von KI-Systemen
 """
 
+import io
+import os
+import time
+import uuid
+from array import array
+from contextlib import closing
+from dataclasses import replace
+from functools import partial
+
 import streamlit as st
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
 from classifier_logic import (
-    classify_ai_system,
+    ClassificationInput,
+    Clock,
     RiskLevel,
-    HIGH_RISK_DOMAINS,
     PROHIBITED_PRACTICES,
-    ANNEX_I_PRODUCTS,
-    REALTIME_BIOMETRIC_EXCEPTIONS,
-    CODE_OF_PRACTICE_MARKING,
     AI_ACT_DEADLINES,
+    DEADLINE_NAMES,
+    CatalogSnapshot,
+    get_catalog,
     get_risk_color
 )
 from export_utils import (
@@ -22,8 +31,27 @@ from export_utils import (
     generate_technical_documentation_template,
     export_to_csv,
     export_to_excel,
-    create_classification_summary
+    write_csv,
+    create_classification_summary,
+    stamp_classification_time
+)
+from session_store import ClassificationRegister, DEFAULT_MEMORY_LIMIT, RegisterSnapshot
+from result_cache import get_shared_cache
+from artifact_store import get_archive
+from audit_log import classification_entry, get_audit_log
+from matrix_export import index_to_matrix
+from bulk_import import (
+    DEFAULT_COLUMN_MAPPING,
+    ImportReport,
+    import_into_register,
+    item_summary,
+    iter_import,
+    iter_inputs,
+    rehydrate_register
 )
+from conflict_lint import lint_inventory
+from prescreen import screen_description
+from jobs import JobStatus, get_job_manager, track
 
 
 # Seitenkonfiguration
@@ -107,15 +135,51 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Ansichten des Hauptbereichs
+VIEW_FORM = "📝 Neue Klassifizierung"
+VIEW_RESULTS = "📊 Ergebnis & Export"
+VIEW_REFERENCE = "📚 Referenz"
+VIEW_ALL = "💾 Alle Klassifizierungen"
+VIEWS = [VIEW_FORM, VIEW_RESULTS, VIEW_REFERENCE, VIEW_ALL]
+
+# Zeilen pro Seite in der Tabelle "Alle Klassifizierungen"
+REGISTER_PAGE_SIZE = 50
+
+# Maximale Anzahl der im Fristen-Kalender je Fristart namentlich genannten Systeme
+DEADLINE_NAMES_SHOWN = 20
+
+# Ab dieser Registergröße werden CSV/Excel-Exporte als Hintergrundauftrag erstellt
+BACKGROUND_EXPORT_THRESHOLD = 2000
+
+# Aktualisierungsintervall der Auftragsübersicht, solange Aufträge laufen (Sekunden)
+JOB_POLL_INTERVAL = 1.0
+
 # Session State initialisieren
+if 'memory_limit' not in st.session_state:
+    st.session_state.memory_limit = DEFAULT_MEMORY_LIMIT
+
 if 'classifications' not in st.session_state:
-    st.session_state.classifications = []
+    st.session_state.classifications = ClassificationRegister(st.session_state.memory_limit)
 
 if 'current_result' not in st.session_state:
     st.session_state.current_result = None
 
+# Besitzerkennung für Hintergrundaufträge dieser Session
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Messung: Durchläufe und CPU-Zeit bis zum Abschluss einer Klassifizierung
+if 'rerun_stats' not in st.session_state:
+    st.session_state.rerun_stats = {'reruns': 0, 'cpu_seconds': 0.0, 'last_classification': None}
+
 
 def main():
+    cpu_start = time.thread_time()
+    classifications_before = len(st.session_state.classifications)
+
+    # Katalog-Snapshot für diesen gesamten Durchlauf festhalten (Hot Reload wirkt ab dem nächsten Durchlauf)
+    catalog = get_catalog()
+
     # Header
     st.title("🤖 EU AI Act Klassifizierungs-Tool")
     st.markdown("""
@@ -158,217 +222,231 @@ def main():
         st.divider()
 
         # Bisherige Klassifizierungen
-        if st.session_state.classifications:
+        register = st.session_state.classifications
+        if register:
             st.header("📊 Bisherige Klassifizierungen")
-            for i, c in enumerate(st.session_state.classifications[-5:]):  # Letzte 5
+            for i, c in enumerate(register.tail(5)):  # Letzte 5
                 st.markdown(f"**{c['Systemname']}**")
                 st.caption(c['Risikostufe'])
 
-    # Hauptbereich mit Tabs
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "📝 Neue Klassifizierung",
-        "📊 Ergebnis & Export",
-        "📚 Referenz",
-        "💾 Alle Klassifizierungen"
-    ])
+        with st.expander("⚙️ Einstellungen"):
+            memory_limit = st.number_input(
+                "Klassifizierungen im Arbeitsspeicher",
+                min_value=1,
+                step=10,
+                key="memory_limit",
+                help="Ältere Klassifizierungen dieser Session werden in eine lokale Datei ausgelagert "
+                     f"(Standard: {DEFAULT_MEMORY_LIMIT})"
+            )
+            if memory_limit != register.memory_limit:
+                register.set_memory_limit(int(memory_limit))
+            if register.spilled_count:
+                st.caption(f"{register.spilled_count} von {len(register)} Klassifizierungen ausgelagert")
+            last = st.session_state.rerun_stats['last_classification']
+            if last:
+                st.caption(f"Letzte Klassifizierung: {last[0]} Durchläufe, {last[1] * 1000:.0f} ms CPU")
+
+        st.caption(f"Regelkatalog-Version: {catalog.version}")
+
+    # Hauptbereich: Nur die aktive Ansicht wird ausgeführt (st.tabs würde alle vier bei jedem Durchlauf rendern)
+    active_view = st.radio(
+        "Ansicht",
+        VIEWS,
+        horizontal=True,
+        key="active_view",
+        label_visibility="collapsed"
+    )
 
-    with tab1:
-        create_classification_form()
+    if active_view == VIEW_FORM:
+        create_classification_form(catalog)
+    elif active_view == VIEW_RESULTS:
+        show_results(catalog)
+    elif active_view == VIEW_REFERENCE:
+        show_reference(catalog)
+    else:
+        show_all_classifications(catalog)
+        show_jobs()
 
-    with tab2:
-        show_results()
+    _record_rerun(cpu_start, len(st.session_state.classifications) > classifications_before)
 
-    with tab3:
-        show_reference()
 
-    with tab4:
-        show_all_classifications()
+def _record_rerun(cpu_start: float, classification_completed: bool):
+    """Zählt vollständige Durchläufe und CPU-Zeit bis zur nächsten abgeschlossenen Klassifizierung."""
+    stats = st.session_state.rerun_stats
+    stats['reruns'] += 1
+    stats['cpu_seconds'] += time.thread_time() - cpu_start
+    if classification_completed:
+        stats['last_classification'] = (stats['reruns'], stats['cpu_seconds'])
+        stats['reruns'] = 0
+        stats['cpu_seconds'] = 0.0
 
 
-def create_classification_form():
+def create_classification_form(catalog: CatalogSnapshot):
     """Erstellt das Klassifizierungsformular."""
 
     st.header("Neue KI-System-Klassifizierung")
 
-    # Grundlegende Informationen
-    st.subheader("1️⃣ Grundlegende Informationen")
+    # Alle Fragen in einem Formular: Eingaben lösen erst beim Absenden einen Durchlauf aus
+    with st.form("classification_form"):
+        # Grundlegende Informationen
+        st.subheader("1️⃣ Grundlegende Informationen")
 
-    col1, col2 = st.columns(2)
-    with col1:
-        system_name = st.text_input(
-            "Name des KI-Systems *",
-            placeholder="z.B. ChatBot Pro 2.0",
-            help="Geben Sie einen eindeutigen Namen für Ihr KI-System ein"
-        )
-    with col2:
-        provider = st.text_input(
-            "Anbieter/Unternehmen *",
-            placeholder="z.B. Muster GmbH",
-            help="Name des Unternehmens, das das KI-System bereitstellt"
-        )
+        col1, col2 = st.columns(2)
+        with col1:
+            system_name = st.text_input(
+                "Name des KI-Systems *",
+                placeholder="z.B. ChatBot Pro 2.0",
+                help="Geben Sie einen eindeutigen Namen für Ihr KI-System ein"
+            )
+        with col2:
+            provider = st.text_input(
+                "Anbieter/Unternehmen *",
+                placeholder="z.B. Muster GmbH",
+                help="Name des Unternehmens, das das KI-System bereitstellt"
+            )
 
-    system_description = st.text_area(
-        "Beschreibung des KI-Systems *",
-        placeholder="Beschreiben Sie kurz den Zweck und die Funktionsweise des Systems...",
-        help="Eine kurze Beschreibung der Hauptfunktionen und des Einsatzzwecks",
-        height=100
-    )
+        system_description = st.text_area(
+            "Beschreibung des KI-Systems *",
+            placeholder="Beschreiben Sie kurz den Zweck und die Funktionsweise des Systems...",
+            help="Eine kurze Beschreibung der Hauptfunktionen und des Einsatzzwecks",
+            height=100
+        )
 
-    st.divider()
+        st.divider()
 
-    # Verbotene Praktiken
-    st.subheader("2️⃣ Prüfung auf verbotene Praktiken (Artikel 5)")
-    st.markdown("""
-    <div class="info-box">
-    <strong>Wichtig:</strong> Wenn Ihr System eine der folgenden Praktiken verwendet, ist es nach dem EU AI Act verboten.
-    Bitte prüfen Sie sorgfältig alle Punkte.
-    </div>
-    """, unsafe_allow_html=True)
+        # Verbotene Praktiken
+        st.subheader("2️⃣ Prüfung auf verbotene Praktiken (Artikel 5)")
+        st.markdown("""
+        <div class="info-box">
+        <strong>Wichtig:</strong> Wenn Ihr System eine der folgenden Praktiken verwendet, ist es nach dem EU AI Act verboten.
+        Bitte prüfen Sie sorgfältig alle Punkte.
+        </div>
+        """, unsafe_allow_html=True)
 
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
 
-    with col1:
-        uses_subliminal = st.checkbox(
-            "Unterschwellige Manipulation",
-            help="Das System setzt unterschwellige Techniken ein, die das Bewusstsein umgehen, um Verhalten zu beeinflussen"
-        )
+        with col1:
+            uses_subliminal = st.checkbox(
+                "Unterschwellige Manipulation",
+                help="Das System setzt unterschwellige Techniken ein, die das Bewusstsein umgehen, um Verhalten zu beeinflussen"
+            )
 
-        exploits_vulnerable = st.checkbox(
-            "Ausnutzung Schutzbedürftiger",
-            help="Das System nutzt Schwächen aufgrund von Alter, Behinderung oder sozioökonomischer Lage aus"
-        )
+            exploits_vulnerable = st.checkbox(
+                "Ausnutzung Schutzbedürftiger",
+                help="Das System nutzt Schwächen aufgrund von Alter, Behinderung oder sozioökonomischer Lage aus"
+            )
 
-        social_scoring = st.checkbox(
-            "Soziales Scoring",
-            help="Bewertung von Personen basierend auf sozialem Verhalten, die zu nachteiliger Behandlung führt"
-        )
+            social_scoring = st.checkbox(
+                "Soziales Scoring",
+                help="Bewertung von Personen basierend auf sozialem Verhalten, die zu nachteiliger Behandlung führt"
+            )
 
-        predictive_policing = st.checkbox(
-            "Predictive Policing (nur Profiling)",
-            help="Vorhersage von Straftaten ausschließlich basierend auf Profiling ohne objektive Fakten"
-        )
+            predictive_policing = st.checkbox(
+                "Predictive Policing (nur Profiling)",
+                help="Vorhersage von Straftaten ausschließlich basierend auf Profiling ohne objektive Fakten"
+            )
 
-        # NEU: Predictive Policing mit objektiven Fakten
-        predictive_policing_facts = st.checkbox(
-            "Predictive Policing (mit objektiven Fakten)",
-            help="Vorhersage von Straftaten unter Berücksichtigung objektiver, nachprüfbarer Fakten (HIGH RISK, nicht verboten)"
-        )
+            # NEU: Predictive Policing mit objektiven Fakten
+            predictive_policing_facts = st.checkbox(
+                "Predictive Policing (mit objektiven Fakten)",
+                help="Vorhersage von Straftaten unter Berücksichtigung objektiver, nachprüfbarer Fakten (HIGH RISK, nicht verboten)"
+            )
 
-    with col2:
-        facial_scraping = st.checkbox(
-            "Gesichtserkennung-Scraping",
-            help="Erstellen von Gesichtsdatenbanken durch ungezieltes Scraping aus Internet oder CCTV"
-        )
+        with col2:
+            facial_scraping = st.checkbox(
+                "Gesichtserkennung-Scraping",
+                help="Erstellen von Gesichtsdatenbanken durch ungezieltes Scraping aus Internet oder CCTV"
+            )
 
-        emotion_work_edu = st.checkbox(
-            "Emotionserkennung (Arbeit/Bildung)",
-            help="Ableitung von Emotionen am Arbeitsplatz oder in Bildungseinrichtungen (außer medizinisch)"
-        )
+            emotion_work_edu = st.checkbox(
+                "Emotionserkennung (Arbeit/Bildung)",
+                help="Ableitung von Emotionen am Arbeitsplatz oder in Bildungseinrichtungen (außer medizinisch)"
+            )
 
-        biometric_sensitive = st.checkbox(
-            "Biometrische Kategorisierung (sensibel)",
-            help="Kategorisierung durch Ableitung von Rasse, Religion, sexueller Orientierung etc."
-        )
+            biometric_sensitive = st.checkbox(
+                "Biometrische Kategorisierung (sensibel)",
+                help="Kategorisierung durch Ableitung von Rasse, Religion, sexueller Orientierung etc."
+            )
 
-        realtime_biometric = st.checkbox(
-            "Echtzeit-Biometrie (öffentlich)",
-            help="Echtzeit-Fernidentifizierung in öffentlich zugänglichen Räumen für Strafverfolgung"
-        )
+            realtime_biometric = st.checkbox(
+                "Echtzeit-Biometrie (öffentlich)",
+                help="Echtzeit-Fernidentifizierung in öffentlich zugänglichen Räumen für Strafverfolgung"
+            )
 
-    # NEU: Ausnahmen für Echtzeit-Biometrie
-    realtime_biometric_exception = None
-    if realtime_biometric:
+        # NEU: Ausnahmen für Echtzeit-Biometrie (im Formular immer sichtbar, wirkt nur bei Echtzeit-Biometrie)
         st.markdown("##### Ausnahmen für Echtzeit-Biometrie (Art. 5(2))")
-        st.markdown("*Unter sehr engen Bedingungen kann Echtzeit-Biometrie für Strafverfolgung erlaubt sein (HIGH RISK statt verboten):*")
-        exception_options = ["Keine Ausnahme (verboten)"] + [
-            f"{v['name']}: {v['description']}" for v in REALTIME_BIOMETRIC_EXCEPTIONS.values()
-        ]
+        st.markdown("*Nur relevant bei Echtzeit-Biometrie: Unter sehr engen Bedingungen kann Echtzeit-Biometrie für Strafverfolgung erlaubt sein (HIGH RISK statt verboten):*")
+        exception_options = [None] + list(catalog.realtime_biometric_exceptions)
         selected_exception = st.selectbox(
             "Ausnahme auswählen",
             exception_options,
+            format_func=lambda key: "Keine Ausnahme (verboten)" if key is None else
+                f"{catalog.realtime_biometric_exceptions[key]['name']}: {catalog.realtime_biometric_exceptions[key]['description']}",
             help="Wählen Sie eine Ausnahme, falls zutreffend"
         )
-        if selected_exception != "Keine Ausnahme (verboten)":
-            for key, val in REALTIME_BIOMETRIC_EXCEPTIONS.items():
-                if val['name'] in selected_exception:
-                    realtime_biometric_exception = key
-                    break
 
-    st.divider()
+        st.divider()
 
-    # Hochrisiko Pathway A
-    st.subheader("3️⃣ Hochrisiko-Prüfung: Pathway A (Regulierte Produkte)")
-    st.markdown("""
-    <div class="info-box">
-    Ist Ihr KI-System ein Sicherheitsbauteil oder selbst ein Produkt, das unter EU-Harmonisierungsvorschriften fällt?
-    </div>
-    """, unsafe_allow_html=True)
+        # Hochrisiko Pathway A
+        st.subheader("3️⃣ Hochrisiko-Prüfung: Pathway A (Regulierte Produkte)")
+        st.markdown("""
+        <div class="info-box">
+        Ist Ihr KI-System ein Sicherheitsbauteil oder selbst ein Produkt, das unter EU-Harmonisierungsvorschriften fällt?
+        </div>
+        """, unsafe_allow_html=True)
 
-    col1, col2, col3 = st.columns(3)
+        col1, col2, col3 = st.columns(3)
 
-    with col1:
-        is_safety_component = st.checkbox(
-            "KI steuert sicherheitskritische Funktion eines Produkts",
-            help="z.B. Bremsassistent, Medizingeräte-Steuerung, KI in Aufzügen oder Maschinen"
-        )
+        with col1:
+            is_safety_component = st.checkbox(
+                "KI steuert sicherheitskritische Funktion eines Produkts",
+                help="z.B. Bremsassistent, Medizingeräte-Steuerung, KI in Aufzügen oder Maschinen"
+            )
 
-    with col2:
-        is_product = st.checkbox(
-            "Das KI-System wird als eigenständiges Produkt verkauft",
-            help="z.B. KI-Diagnosegerät, autonomer Roboter, KI-Medizinprodukt"
-        )
+        with col2:
+            is_product = st.checkbox(
+                "Das KI-System wird als eigenständiges Produkt verkauft",
+                help="z.B. KI-Diagnosegerät, autonomer Roboter, KI-Medizinprodukt"
+            )
 
-    with col3:
-        requires_assessment = st.checkbox(
-            "Eine externe Prüfstelle (z.B. TÜV) muss das Produkt zertifizieren",
-            help="Nicht nur Selbsterklärung des Herstellers, sondern unabhängige Sicherheitsprüfung erforderlich"
-        )
+        with col3:
+            requires_assessment = st.checkbox(
+                "Eine externe Prüfstelle (z.B. TÜV) muss das Produkt zertifizieren",
+                help="Nicht nur Selbsterklärung des Herstellers, sondern unabhängige Sicherheitsprüfung erforderlich"
+            )
 
-    if is_safety_component or is_product:
         annex_i_product = st.selectbox(
             "Produktkategorie (Anhang I)",
-            ["Bitte auswählen..."] + ANNEX_I_PRODUCTS,
-            help="Wählen Sie die zutreffende Produktkategorie"
+            ["Bitte auswählen..."] + catalog.annex_i_products,
+            help="Nur relevant, wenn die KI eine sicherheitskritische Funktion steuert oder als Produkt verkauft wird"
         )
-    else:
-        annex_i_product = None
-
-    st.divider()
 
-    # Hochrisiko Pathway B
-    st.subheader("4️⃣ Hochrisiko-Prüfung: Pathway B (Anwendungsbereiche)")
-    st.markdown("""
-    <div class="info-box">
-    Wird Ihr KI-System in einem der folgenden Hochrisiko-Bereiche nach Anhang III eingesetzt?
-    </div>
-    """, unsafe_allow_html=True)
+        st.divider()
 
-    domain_names = {k: v["name"] for k, v in HIGH_RISK_DOMAINS.items()}
-    selected_domain = st.selectbox(
-        "Anwendungsbereich",
-        ["Keiner dieser Bereiche"] + list(domain_names.values()),
-        help="Wählen Sie den Bereich, in dem Ihr KI-System eingesetzt wird"
-    )
+        # Hochrisiko Pathway B
+        st.subheader("4️⃣ Hochrisiko-Prüfung: Pathway B (Anwendungsbereiche)")
+        st.markdown("""
+        <div class="info-box">
+        Wird Ihr KI-System in einem der folgenden Hochrisiko-Bereiche nach Anhang III eingesetzt?
+        </div>
+        """, unsafe_allow_html=True)
 
-    # Domain-Key aus dem Namen ableiten
-    domain_key = None
-    selected_use_case = None
-
-    for key, domain in HIGH_RISK_DOMAINS.items():
-        if domain["name"] == selected_domain:
-            domain_key = key
-            break
-
-    if domain_key:
-        use_cases = HIGH_RISK_DOMAINS[domain_key]["use_cases"]
-        selected_use_case = st.selectbox(
-            "Spezifischer Anwendungsfall",
-            ["Bitte auswählen..."] + use_cases,
-            help="Wählen Sie den spezifischen Anwendungsfall"
+        # Bereich und Anwendungsfall in einer Auswahl, da Formularwerte erst beim Absenden ausgewertet werden
+        domain_options = [(None, None)]
+        for key, domain in catalog.high_risk_domains.items():
+            domain_options.append((key, None))
+            domain_options.extend((key, use_case) for use_case in domain["use_cases"])
+
+        domain_key, selected_use_case = st.selectbox(
+            "Anwendungsbereich und Anwendungsfall",
+            domain_options,
+            format_func=lambda option: _format_domain_option(catalog, option),
+            help="Wählen Sie den Bereich (und ggf. den spezifischen Anwendungsfall), in dem Ihr KI-System eingesetzt wird"
         )
 
         st.markdown("#### Ausnahmen prüfen")
-        st.markdown("*Die folgenden Ausnahmen gelten NICHT, wenn das System Profiling natürlicher Personen durchführt.*")
+        st.markdown("*Nur relevant, wenn ein Anwendungsbereich gewählt ist. "
+                    "Die folgenden Ausnahmen gelten NICHT, wenn das System Profiling natürlicher Personen durchführt.*")
 
         col1, col2 = st.columns(2)
 
@@ -398,181 +476,252 @@ def create_classification_form():
             "Nur vorbereitende Aufgabe",
             help="Das System führt nur vorbereitende Aufgaben für eine Bewertung aus"
         )
-    else:
-        performs_profiling = False
-        narrow_procedural = False
-        improves_human = False
-        detects_patterns = False
-        preparatory_only = False
 
-    st.divider()
+        st.divider()
 
-    # Transparenzpflichten
-    st.subheader("5️⃣ Transparenzpflichten (Begrenztes Risiko)")
-    st.markdown("""
-    <div class="info-box">
-    Auch wenn Ihr System nicht als Hochrisiko eingestuft wird, können Transparenzpflichten gelten.
-    </div>
-    """, unsafe_allow_html=True)
+        # Transparenzpflichten
+        st.subheader("5️⃣ Transparenzpflichten (Begrenztes Risiko)")
+        st.markdown("""
+        <div class="info-box">
+        Auch wenn Ihr System nicht als Hochrisiko eingestuft wird, können Transparenzpflichten gelten.
+        </div>
+        """, unsafe_allow_html=True)
 
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
 
-    with col1:
-        interacts_humans = st.checkbox(
-            "Direkte Interaktion mit Menschen",
-            help="Chatbot, virtueller Assistent oder andere direkte Kommunikation"
-        )
+        with col1:
+            interacts_humans = st.checkbox(
+                "Direkte Interaktion mit Menschen",
+                help="Chatbot, virtueller Assistent oder andere direkte Kommunikation"
+            )
 
-        generates_synthetic = st.checkbox(
-            "Generiert synthetische Inhalte",
-            help="Generiert Text, Bilder, Audio oder Video"
-        )
+            generates_synthetic = st.checkbox(
+                "Generiert synthetische Inhalte",
+                help="Generiert Text, Bilder, Audio oder Video"
+            )
 
-        generates_deepfakes = st.checkbox(
-            "Generiert Deepfakes",
-            help="Generiert oder manipuliert realistische Medien von echten Personen"
-        )
+            generates_deepfakes = st.checkbox(
+                "Generiert Deepfakes",
+                help="Generiert oder manipuliert realistische Medien von echten Personen"
+            )
 
-    with col2:
-        emotion_medical = st.checkbox(
-            "Emotionserkennung (medizinisch/Sicherheit)",
-            help="Emotionserkennung für medizinische oder sicherheitsrelevante Zwecke"
-        )
+        with col2:
+            emotion_medical = st.checkbox(
+                "Emotionserkennung (medizinisch/Sicherheit)",
+                help="Emotionserkennung für medizinische oder sicherheitsrelevante Zwecke"
+            )
 
-        biometric_lawful = st.checkbox(
-            "Rechtmäßige biometrische Kategorisierung",
-            help="Rechtmäßige Filterung biometrischer Datensätze"
-        )
+            biometric_lawful = st.checkbox(
+                "Rechtmäßige biometrische Kategorisierung",
+                help="Rechtmäßige Filterung biometrischer Datensätze"
+            )
 
-    # NEU: Medientypen für Code of Practice Empfehlungen
-    synthetic_content_types = None
-    if generates_synthetic:
+        # NEU: Medientypen für Code of Practice Empfehlungen
         st.markdown("##### Welche Medientypen werden generiert?")
         content_type_options = st.multiselect(
             "Medientypen auswählen",
-            ["video", "image", "audio", "text"],
-            help="Wählen Sie alle Medientypen, die das System generiert (für spezifische Markierungsempfehlungen)"
+            list(catalog.code_of_practice_marking),
+            help="Nur relevant bei synthetischen Inhalten: Wählen Sie alle Medientypen, die das System generiert "
+                 "(für spezifische Markierungsempfehlungen)"
         )
-        if content_type_options:
-            synthetic_content_types = content_type_options
 
-    st.divider()
+        st.divider()
 
-    # NEU: GPAI (General Purpose AI) Abschnitt
-    st.subheader("6️⃣ General Purpose AI (GPAI) / Allzweck-KI")
-    st.markdown("""
-    <div class="info-box">
-    <strong>Entwickeln Sie selbst ein KI-Basismodell?</strong><br>
-    Die meisten Unternehmen <em>nutzen</em> bestehende Modelle (z.B. GPT, Claude) -
-    dann gelten die GPAI-Pflichten für den Modellanbieter, nicht für Sie.
-    </div>
-    """, unsafe_allow_html=True)
+        # NEU: GPAI (General Purpose AI) Abschnitt
+        st.subheader("6️⃣ General Purpose AI (GPAI) / Allzweck-KI")
+        st.markdown("""
+        <div class="info-box">
+        <strong>Entwickeln Sie selbst ein KI-Basismodell?</strong><br>
+        Die meisten Unternehmen <em>nutzen</em> bestehende Modelle (z.B. GPT, Claude) -
+        dann gelten die GPAI-Pflichten für den Modellanbieter, nicht für Sie.
+        </div>
+        """, unsafe_allow_html=True)
 
-    gpai_options = [
-        "Nein, ich nutze bestehende Modelle (z.B. GPT, Claude, Gemini API)",
-        "Ich finetune/passe ein bestehendes Modell an",
-        "Ja, ich entwickle selbst ein Allzweck-KI-Modell",
-        "Ja, ich entwickle ein großes, weit verbreitetes Allzweck-KI-Modell"
-    ]
-
-    selected_gpai = st.radio(
-        "Ihre Rolle:",
-        gpai_options,
-        help="Wählen Sie die Option, die auf Ihr Unternehmen zutrifft"
-    )
+        gpai_options = [
+            "Nein, ich nutze bestehende Modelle (z.B. GPT, Claude, Gemini API)",
+            "Ich finetune/passe ein bestehendes Modell an",
+            "Ja, ich entwickle selbst ein Allzweck-KI-Modell",
+            "Ja, ich entwickle ein großes, weit verbreitetes Allzweck-KI-Modell"
+        ]
 
-    # Logik für GPAI-Flags
-    is_gpai = selected_gpai in [gpai_options[2], gpai_options[3]]
-    gpai_systemic = selected_gpai == gpai_options[3]
-    is_finetuning = selected_gpai == gpai_options[1]
+        selected_gpai = st.radio(
+            "Ihre Rolle:",
+            gpai_options,
+            help="Wählen Sie die Option, die auf Ihr Unternehmen zutrifft"
+        )
 
-    # Erklärung je nach Auswahl
-    if selected_gpai == gpai_options[0]:
-        st.info("**Keine GPAI-Anbieter-Pflichten für Sie.** Ihre Pflichten ergeben sich aus den Fragen oben (Anwendungsbereich, Transparenz, etc.).")
-    elif selected_gpai == gpai_options[1]:
-        st.warning("""**Finetuning - Prüfung erforderlich:**
+        # Erklärung der Optionen (im Formular statisch, da die Auswahl erst beim Absenden ausgewertet wird)
+        with st.expander("Was bedeuten die Optionen?"):
+            st.info("**Keine GPAI-Anbieter-Pflichten für Sie.** Ihre Pflichten ergeben sich aus den Fragen oben (Anwendungsbereich, Transparenz, etc.).")
+            st.warning("""**Finetuning - Prüfung erforderlich:**
 - **Leichtes Finetuning** (LoRA, Prompt-Tuning, Adapter): Sie bleiben Deployer, keine GPAI-Pflichten.
 - **Umfangreiches Finetuning** (neue Fähigkeiten, wesentliche Änderungen): Sie könnten zum GPAI-Anbieter werden.
 
 *Im Zweifel rechtliche Beratung einholen.*""")
-    elif selected_gpai == gpai_options[2]:
-        st.warning("**GPAI-Pflichten gelten:** Technische Dokumentation, Urheberrechts-Compliance, Information an nachgelagerte Anbieter.")
-    else:
-        st.error("**GPAI + Systemisches Risiko:** Zusätzliche Pflichten wie Modell-Evaluierungen, Vorfallmeldung, Cybersicherheit.")
+            st.warning("**GPAI-Pflichten gelten:** Technische Dokumentation, Urheberrechts-Compliance, Information an nachgelagerte Anbieter.")
+            st.error("**GPAI + Systemisches Risiko:** Zusätzliche Pflichten wie Modell-Evaluierungen, Vorfallmeldung, Cybersicherheit.")
 
-    st.divider()
-
-    # Submit Button
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        submit = st.button(
-            "🔍 KI-System klassifizieren",
-            type="primary",
-            use_container_width=True
-        )
+        st.divider()
 
-    if submit:
-        # Validierung
-        if not system_name or not provider or not system_description:
-            st.error("Bitte füllen Sie alle Pflichtfelder (*) aus.")
-            return
+        # Submit Button
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            submit = st.form_submit_button(
+                "🔍 KI-System klassifizieren",
+                type="primary",
+                use_container_width=True
+            )
 
-        # Klassifizierung durchführen
-        result = classify_ai_system(
-            system_name=system_name,
-            system_description=system_description,
-            provider=provider,
-            uses_subliminal_manipulation=uses_subliminal,
-            exploits_vulnerable_groups=exploits_vulnerable,
-            performs_social_scoring=social_scoring,
-            predictive_policing_only_profiling=predictive_policing,
-            predictive_policing_with_objective_facts=predictive_policing_facts,
-            scrapes_facial_recognition=facial_scraping,
-            emotion_recognition_work_education=emotion_work_edu,
-            biometric_categorization_sensitive=biometric_sensitive,
-            realtime_biometric_public=realtime_biometric,
-            realtime_biometric_exception=realtime_biometric_exception,
-            is_safety_component_annex_i=is_safety_component,
-            is_product_annex_i=is_product,
-            requires_third_party_assessment=requires_assessment,
-            annex_i_product_type=annex_i_product if annex_i_product and annex_i_product != "Bitte auswählen..." else None,
-            high_risk_domain=domain_key,
-            high_risk_use_case=selected_use_case if selected_use_case and selected_use_case != "Bitte auswählen..." else None,
-            performs_profiling=performs_profiling,
-            narrow_procedural_task=narrow_procedural,
-            improves_human_work=improves_human,
-            detects_patterns_only=detects_patterns,
-            preparatory_task_only=preparatory_only,
-            interacts_with_humans=interacts_humans,
-            generates_synthetic_content=generates_synthetic,
-            generates_deepfakes=generates_deepfakes,
-            emotion_recognition_medical_safety=emotion_medical,
-            biometric_categorization_lawful=biometric_lawful,
-            synthetic_content_types=synthetic_content_types,
-            is_gpai=is_gpai,
-            gpai_has_systemic_risk=gpai_systemic if is_gpai else False,
-            reference_date=date.today()
-        )
+    if not submit:
+        return
 
-        # Ergebnis speichern
-        st.session_state.current_result = {
-            'result': result,
-            'system_name': system_name,
-            'system_description': system_description,
-            'provider': provider
-        }
+    # Validierung
+    if not system_name or not provider or not system_description:
+        st.error("Bitte füllen Sie alle Pflichtfelder (*) aus.")
+        return
 
-        # Zur Klassifizierungsliste hinzufügen
-        summary = create_classification_summary(result, system_name)
-        summary['Anbieter'] = provider
-        summary['Beschreibung'] = system_description
-        st.session_state.classifications.append(summary)
+    # Abhängige Angaben nur übernehmen, wenn die auslösende Frage bejaht wurde
+    realtime_biometric_exception = selected_exception if realtime_biometric else None
+    if not (is_safety_component or is_product):
+        annex_i_product = None
+    if domain_key is None:
+        performs_profiling = False
+        narrow_procedural = False
+        improves_human = False
+        detects_patterns = False
+        preparatory_only = False
+    synthetic_content_types = (content_type_options or None) if generates_synthetic else None
 
-        st.success("✅ Klassifizierung abgeschlossen! Wechseln Sie zum Tab 'Ergebnis & Export' für Details.")
-        st.balloons()
+    # Logik für GPAI-Flags
+    is_gpai = selected_gpai in [gpai_options[2], gpai_options[3]]
+    gpai_systemic = selected_gpai == gpai_options[3]
 
+    # Klassifizierung durchführen (identische Antworten teilen sich das Ergebnis sessionübergreifend)
+    inp = ClassificationInput.from_kwargs(
+        catalog=catalog,
+        system_name=system_name,
+        system_description=system_description,
+        provider=provider,
+        uses_subliminal_manipulation=uses_subliminal,
+        exploits_vulnerable_groups=exploits_vulnerable,
+        performs_social_scoring=social_scoring,
+        predictive_policing_only_profiling=predictive_policing,
+        predictive_policing_with_objective_facts=predictive_policing_facts,
+        scrapes_facial_recognition=facial_scraping,
+        emotion_recognition_work_education=emotion_work_edu,
+        biometric_categorization_sensitive=biometric_sensitive,
+        realtime_biometric_public=realtime_biometric,
+        realtime_biometric_exception=realtime_biometric_exception,
+        is_safety_component_annex_i=is_safety_component,
+        is_product_annex_i=is_product,
+        requires_third_party_assessment=requires_assessment,
+        annex_i_product_type=annex_i_product if annex_i_product and annex_i_product != "Bitte auswählen..." else None,
+        high_risk_domain=domain_key,
+        high_risk_use_case=selected_use_case,
+        performs_profiling=performs_profiling,
+        narrow_procedural_task=narrow_procedural,
+        improves_human_work=improves_human,
+        detects_patterns_only=detects_patterns,
+        preparatory_task_only=preparatory_only,
+        interacts_with_humans=interacts_humans,
+        generates_synthetic_content=generates_synthetic,
+        generates_deepfakes=generates_deepfakes,
+        emotion_recognition_medical_safety=emotion_medical,
+        biometric_categorization_lawful=biometric_lawful,
+        synthetic_content_types=synthetic_content_types,
+        is_gpai=is_gpai,
+        gpai_has_systemic_risk=gpai_systemic if is_gpai else False
+    )
+    # Eigene Uhr dieser Klassifizierung: Zeitstempel, Fristenstatus und Artefakte
+    # beziehen sich auf diesen Zeitpunkt, auch wenn das Ergebnis aus dem Cache stammt
+    clock = Clock.fixed(datetime.now())
+    result_key, result = get_shared_cache().classify(inp, catalog=catalog, clock=clock)
+
+    # Ergebnis speichern
+    st.session_state.current_result = {
+        'result': result,
+        'result_key': result_key,
+        'clock': clock,
+        'system_name': system_name,
+        'system_description': system_description,
+        'provider': provider
+    }
 
-def show_results():
+    # Mögliche Mehrfacherfassung desselben Systems erkennen (vor dem Hinzufügen)
+    register = st.session_state.classifications
+    fingerprint = inp.fingerprint()
+    duplicates = register.duplicates.candidates(system_description, provider, fingerprint)
+
+    # Zur Klassifizierungsliste hinzufügen
+    summary = create_classification_summary(result, system_name)
+    summary['Anbieter'] = provider
+    summary['Beschreibung'] = system_description
+    register.append(summary, result, fingerprint)
+
+    audit = get_audit_log()
+    if audit is not None:
+        audit.append("classification", classification_entry(inp, result)).result()
+
+    st.success("✅ Klassifizierung abgeschlossen! Wechseln Sie zur Ansicht 'Ergebnis & Export' für Details.")
+    hints = screen_description(system_description, catalog).missing_answers(inp)
+    if hints:
+        st.info(
+            "💡 Die Beschreibung deutet auf Angaben hin, die im Fragebogen fehlen – bitte prüfen: "
+            + _format_suggestions(catalog, hints)
+        )
+    if duplicates:
+        names = register.column("Systemname", [c.system_id for c in duplicates[:5]])
+        lines = "\n".join(
+            f"- **{name}** ({c.similarity:.0%} ähnlich"
+            f"{', gleicher Anbieter' if c.same_provider else ''}"
+            f"{', gleiche Antworten' if c.same_decision else ''})"
+            for name, c in zip(names, duplicates)
+        )
+        st.info(f"🔁 Mögliche Duplikate bereits erfasster Systeme – ggf. vorhandene Klassifizierung und Berichte wiederverwenden:\n{lines}")
+    st.button("📊 Zum Ergebnis", on_click=_switch_view, args=(VIEW_RESULTS,))
+    st.balloons()
+
+
+def _switch_view(view: str):
+    """Wechselt die aktive Ansicht (als Callback, bevor die Navigation neu gerendert wird)."""
+    st.session_state.active_view = view
+
+
+def _archive_download(system_name: str, kind: str, content, filename: str):
+    """Legt ein heruntergeladenes Artefakt im Archiv ab, sofern eines konfiguriert ist."""
+    archive = get_archive()
+    if archive is not None:
+        archive.put(system_name, kind, content, filename)
+
+
+def _format_domain_option(catalog: CatalogSnapshot, option: tuple) -> str:
+    """Beschriftet einen Eintrag der kombinierten Bereich/Anwendungsfall-Auswahl."""
+    domain_key, use_case = option
+    if domain_key is None:
+        return "Keiner dieser Bereiche"
+    domain_name = catalog.high_risk_domains[domain_key]["name"]
+    if use_case is None:
+        return f"{domain_name} (ohne spezifischen Anwendungsfall)"
+    return f"{domain_name} › {use_case}"
+
+
+def _format_suggestions(catalog: CatalogSnapshot, suggestions: dict) -> str:
+    """Beschriftet die Vorschläge der Stichwort-Vorprüfung (Flags unter ihrem internen Namen)."""
+    parts = []
+    for name, value in suggestions.items():
+        if name == "high_risk_domain":
+            parts.append(f"Hochrisiko-Bereich: {catalog.high_risk_domains[value]['name']}")
+        elif name == "high_risk_use_case":
+            parts.append(f"Anwendungsfall: {value}")
+        elif name == "annex_i_product_type":
+            parts.append(f"Anhang-I-Produkt: {value}")
+        else:
+            parts.append(name)
+    return ", ".join(parts)
+
+
+@st.fragment
+def show_results(catalog: CatalogSnapshot):
     """Zeigt die Klassifizierungsergebnisse an."""
 
     st.header("Klassifizierungsergebnis")
@@ -583,9 +732,20 @@ def show_results():
 
     data = st.session_state.current_result
     result = data['result']
+    result_key = data['result_key']
     system_name = data['system_name']
     provider = data['provider']
     system_description = data['system_description']
+    clock = data['clock']
+
+    # Gerenderte Artefakte werden über alle Sessions hinweg geteilt. Gemeinsame Zeitquelle
+    # ist das Referenzdatum (Tagesbeginn), das daher zur Identität gehört; den Zeitpunkt
+    # der eigenen Klassifizierung setzt stamp_classification_time erst danach ein.
+    cache = get_shared_cache()
+    artifact_clock = Clock.fixed(clock.today())
+    shared_result = replace(result, timestamp=artifact_clock.now())
+    identity = (system_name, system_description, provider, artifact_clock.today())
+    stamp = partial(stamp_classification_time, shared=shared_result.timestamp, actual=result.timestamp)
 
     # Risikostufe anzeigen
     risk_class = {
@@ -689,17 +849,9 @@ def show_results():
             <strong>Für Ihr System relevante Fristen des EU AI Act:</strong>
             </div>
             """, unsafe_allow_html=True)
-            deadline_names = {
-                "verbotene_praktiken": "Verbotene Praktiken (Art. 5)",
-                "ki_kompetenz": "KI-Kompetenz (Art. 4)",
-                "gpai": "GPAI-Modell-Pflichten",
-                "transparenzpflichten": "Transparenzpflichten (Art. 50)",
-                "hochrisiko_anhang_iii": "Hochrisiko-Systeme (Anhang III)",
-                "hochrisiko_anhang_i": "Hochrisiko-Produkte (Anhang I)"
-            }
-            today = date.today()
+            today = clock.today()
             for key, deadline in result.applicable_deadlines.items():
-                name = deadline_names.get(key, key)
+                name = DEADLINE_NAMES.get(key, key)
                 status = "✅ Bereits in Kraft" if today >= deadline else "⏳ Noch nicht in Kraft"
                 st.markdown(f"- **{name}**: {deadline.strftime('%d.%m.%Y')} - {status}")
 
@@ -716,37 +868,53 @@ def show_results():
 
     with col1:
         # Markdown-Bericht
-        markdown_report = generate_markdown_report(
-            result, system_name, system_description, provider
-        )
+        markdown_report = stamp(cache.artifact(
+            result_key, "markdown", identity,
+            lambda: generate_markdown_report(shared_result, system_name, system_description, provider, clock=artifact_clock)
+        ))
+        markdown_name = f"ai_act_report_{system_name.replace(' ', '_')}.md"
         st.download_button(
             "📄 Markdown-Bericht",
             markdown_report,
-            f"ai_act_report_{system_name.replace(' ', '_')}.md",
+            markdown_name,
             "text/markdown",
-            use_container_width=True
+            use_container_width=True,
+            on_click=_archive_download,
+            args=(system_name, "markdown", markdown_report, markdown_name)
         )
 
     with col2:
         # CSV-Export
-        csv_data = export_to_csv([create_classification_summary(result, system_name)])
+        csv_data = stamp(cache.artifact(
+            result_key, "csv", identity,
+            lambda: export_to_csv([create_classification_summary(shared_result, system_name)])
+        ))
+        csv_name = f"ai_act_classification_{system_name.replace(' ', '_')}.csv"
         st.download_button(
             "📊 CSV-Export",
             csv_data,
-            f"ai_act_classification_{system_name.replace(' ', '_')}.csv",
+            csv_name,
             "text/csv",
-            use_container_width=True
+            use_container_width=True,
+            on_click=_archive_download,
+            args=(system_name, "csv", csv_data, csv_name)
         )
 
     with col3:
         # Excel-Export
-        excel_data = export_to_excel([create_classification_summary(result, system_name)])
+        excel_data = stamp(cache.artifact(
+            result_key, "excel", identity + (catalog.version,),
+            lambda: export_to_excel([create_classification_summary(shared_result, system_name)], catalog, artifact_clock).getvalue()
+        ))
+        excel_name = f"ai_act_classification_{system_name.replace(' ', '_')}.xlsx"
         st.download_button(
             "📈 Excel-Export",
             excel_data,
-            f"ai_act_classification_{system_name.replace(' ', '_')}.xlsx",
+            excel_name,
             "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
+            use_container_width=True,
+            on_click=_archive_download,
+            args=(system_name, "excel", excel_data, excel_name)
         )
 
     # Technische Dokumentation (nur für Hochrisiko)
@@ -758,17 +926,23 @@ def show_results():
         Hier können Sie eine Vorlage herunterladen:
         """)
 
-        tech_doc = generate_technical_documentation_template(system_name, provider, result)
+        tech_doc = cache.artifact(
+            result_key, "annex_iv", identity,
+            lambda: generate_technical_documentation_template(system_name, provider, shared_result, clock=artifact_clock)
+        )
+        tech_doc_name = f"technical_documentation_{system_name.replace(' ', '_')}.md"
         st.download_button(
             "📋 Dokumentationsvorlage (Markdown)",
             tech_doc,
-            f"technical_documentation_{system_name.replace(' ', '_')}.md",
+            tech_doc_name,
             "text/markdown",
-            use_container_width=True
+            use_container_width=True,
+            on_click=_archive_download,
+            args=(system_name, "annex_iv", tech_doc, tech_doc_name)
         )
 
 
-def show_reference():
+def show_reference(catalog: CatalogSnapshot):
     """Zeigt die Referenzinformationen an."""
 
     st.header("📚 EU AI Act Referenz")
@@ -788,7 +962,7 @@ def show_reference():
 
     with tab2:
         st.subheader("Hochrisiko-Anwendungsbereiche (Anhang III)")
-        for key, domain in HIGH_RISK_DOMAINS.items():
+        for key, domain in catalog.high_risk_domains.items():
             with st.expander(f"⚠️ {domain['name']}"):
                 st.markdown(f"**{domain['article']}**")
                 st.markdown("**Anwendungsfälle:**")
@@ -810,24 +984,70 @@ def show_reference():
             st.markdown(f"**{item['Datum']}**: {item['Ereignis']}")
 
 
-def show_all_classifications():
+@st.fragment
+def show_all_classifications(catalog: CatalogSnapshot):
     """Zeigt alle bisherigen Klassifizierungen an."""
 
     st.header("💾 Alle Klassifizierungen")
 
-    if not st.session_state.classifications:
+    register = st.session_state.classifications
+    _show_import(register, catalog)
+
+    if not register:
         st.info("Noch keine Klassifizierungen durchgeführt.")
         return
 
-    # Tabelle anzeigen
-    import pandas as pd
-    df = pd.DataFrame(st.session_state.classifications)
-
-    # Spaltenauswahl für Anzeige
-    display_cols = ['Systemname', 'Anbieter', 'Risikostufe', 'Klassifizierungsdatum']
-    available_cols = [col for col in display_cols if col in df.columns]
+    # Tabelle seitenweise aus den fortgeschriebenen Spalten anzeigen
+    page_count = (len(register) + REGISTER_PAGE_SIZE - 1) // REGISTER_PAGE_SIZE
+    if st.session_state.get('register_page', 1) > page_count:
+        st.session_state.register_page = page_count
+
+    page = 1
+    if page_count > 1:
+        page = st.number_input(
+            f"Seite (von {page_count})",
+            min_value=1,
+            max_value=page_count,
+            key="register_page"
+        )
+    offset = (page - 1) * REGISTER_PAGE_SIZE
+    st.dataframe(register.page(offset, REGISTER_PAGE_SIZE), use_container_width=True)
+    st.caption(f"Einträge {offset + 1}–{min(offset + REGISTER_PAGE_SIZE, len(register))} von {len(register)}")
 
-    st.dataframe(df[available_cols], use_container_width=True)
+    # Fristen-Kalender über alle Klassifizierungen
+    if register.deadlines:
+        with st.expander("📅 Fristen-Kalender"):
+            today = date.today()
+            upcoming = register.deadlines.next_boundary(today)
+            if upcoming:
+                boundary, groups = upcoming
+                st.markdown(f"**Nächster Stichtag: {boundary.strftime('%d.%m.%Y')}** – folgende Pflichten treten in Kraft:")
+                _show_deadline_groups(register, groups)
+            else:
+                st.info("Alle Fristen der klassifizierten Systeme sind bereits in Kraft.")
+
+            days = st.number_input("Fällig in den nächsten ... Tagen", min_value=1, value=365, step=30, key="deadline_days")
+            groups = register.deadlines.grouped(today, today + timedelta(days=days))
+            if groups:
+                _show_deadline_groups(register, groups)
+            else:
+                st.caption("Keine Fristen in diesem Zeitraum.")
+
+    # Pflichten-Abfrage über den invertierten Index
+    if register.obligations:
+        with st.expander("🔎 Pflichten-Abfrage"):
+            terms = register.obligations.terms()
+            all_of = st.multiselect("Alle folgenden Pflichten/Artikel", terms, key="obligation_all")
+            any_of = st.multiselect("Mindestens eine der folgenden", terms, key="obligation_any")
+            none_of = st.multiselect("Keine der folgenden", terms, key="obligation_none")
+            if all_of or any_of or none_of:
+                ids = register.obligations.query(all_of, any_of, none_of)
+                st.markdown(f"**{len(ids)} Systeme**")
+                if ids:
+                    st.dataframe(
+                        {col: register.column(col, ids) for col in ("Systemname", "Anbieter", "Risikostufe")},
+                        use_container_width=True
+                    )
 
     st.divider()
 
@@ -836,34 +1056,281 @@ def show_all_classifications():
 
     col1, col2 = st.columns(2)
 
-    with col1:
-        csv_all = export_to_csv(st.session_state.classifications)
-        st.download_button(
-            "📊 Alle als CSV",
-            csv_all,
-            f"alle_klassifizierungen_{datetime.now().strftime('%Y%m%d')}.csv",
-            "text/csv",
-            use_container_width=True
-        )
+    if len(register) > BACKGROUND_EXPORT_THRESHOLD:
+        # Große Register nicht im Skriptlauf exportieren, sondern als Hintergrundauftrag
+        # Die Aufträge lesen einen Schnappschuss, da die Session das Register währenddessen ändern kann
+        date_suffix = datetime.now().strftime('%Y%m%d')
+        total = len(register)
+        with col1:
+            if st.button("📊 CSV im Hintergrund erstellen", use_container_width=True):
+                _submit_job(
+                    f"CSV-Export ({total} Einträge)", _csv_export_job, register.snapshot(),
+                    filename=f"alle_klassifizierungen_{date_suffix}.csv", mime="text/csv"
+                )
+        with col2:
+            if st.button("📈 Excel im Hintergrund erstellen", use_container_width=True):
+                _submit_job(
+                    f"Excel-Export ({total} Einträge)", _excel_export_job, register.snapshot(), catalog,
+                    Clock.fixed(date.today()),
+                    filename=f"alle_klassifizierungen_{date_suffix}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+        st.caption("Fertige Exporte stehen unter „Hintergrundaufträge“ zum Download bereit.")
+    else:
+        with col1:
+            # Exporte werden nur neu erzeugt, wenn sich das Register geändert hat
+            csv_all = register.artifact("csv", lambda: export_to_csv(register, register.columns))
+            st.download_button(
+                "📊 Alle als CSV",
+                csv_all,
+                f"alle_klassifizierungen_{datetime.now().strftime('%Y%m%d')}.csv",
+                "text/csv",
+                use_container_width=True
+            )
 
-    with col2:
-        excel_all = export_to_excel(st.session_state.classifications)
-        st.download_button(
-            "📈 Alle als Excel",
-            excel_all,
-            f"alle_klassifizierungen_{datetime.now().strftime('%Y%m%d')}.xlsx",
-            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
-        )
+        with col2:
+            # Feste Tagesuhr: gleiche Register ergeben am selben Tag byte-identische Dateien
+            today = date.today()
+            excel_all = register.artifact(
+                f"excel:{catalog.version}:{today}",
+                lambda: export_to_excel(list(register), catalog, Clock.fixed(today)).getvalue()
+            )
+            st.download_button(
+                "📈 Alle als Excel",
+                excel_all,
+                f"alle_klassifizierungen_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+
+    # Inzidenzmatrizen für Portfolio-Analysen (CSR, .npz)
+    if register.obligations:
+        col1, col2 = st.columns(2)
+        for column, kind, label in ((col1, "obligations", "Pflichten"), (col2, "articles", "Artikel")):
+            with column:
+                matrix_npz = register.artifact(f"matrix:{kind}", lambda: _matrix_npz(register, kind))
+                st.download_button(
+                    f"🧮 Systeme × {label} (.npz)",
+                    matrix_npz,
+                    f"matrix_{kind}_{datetime.now().strftime('%Y%m%d')}.npz",
+                    "application/octet-stream",
+                    use_container_width=True
+                )
 
     st.divider()
 
     # Klassifizierungen löschen
     if st.button("🗑️ Alle Klassifizierungen löschen", type="secondary"):
-        st.session_state.classifications = []
+        st.session_state.classifications.clear()
         st.session_state.current_result = None
         st.rerun()
 
 
+def _show_import(register: ClassificationRegister, catalog: CatalogSnapshot):
+    """Import eines bestehenden Inventars bzw. eines früheren Exports."""
+    with st.expander("📥 Inventar importieren"):
+        upload = st.file_uploader("CSV- oder Excel-Datei", type=["csv", "xlsx"], key="import_file")
+        mode = st.radio(
+            "Inhalt",
+            [
+                "Inventar klassifizieren",
+                "Im Hintergrund klassifizieren (CSV)",
+                "Nur Konsistenz prüfen",
+                "Früheren Export wiederherstellen"
+            ],
+            horizontal=True,
+            key="import_mode"
+        )
+        if mode != "Früheren Export wiederherstellen":
+            st.caption(
+                "Erkannte Spalten: " + ", ".join(DEFAULT_COLUMN_MAPPING)
+                + " sowie alle Eingaben unter ihrem internen Namen (z.B. performs_profiling); "
+                "Ja/Nein-Spalten akzeptieren Ja, Nein, x, 1, 0."
+            )
+        if upload is None or not st.button("Importieren", key="import_run"):
+            return
+
+        try:
+            if mode == "Inventar klassifizieren":
+                report = import_into_register(
+                    upload, register, catalog=catalog, cache=get_shared_cache(), audit=get_audit_log()
+                )
+                st.success(
+                    f"{report.imported} von {report.rows} Zeilen klassifiziert "
+                    f"({report.batch.groups} unterschiedliche Antwortkombinationen)."
+                )
+                if report.assignment_count:
+                    with st.expander(f"{report.assignment_count} Freitexte dem Katalog zugeordnet"):
+                        st.dataframe(
+                            {
+                                "Zeile": [a.row for a in report.assignments],
+                                "Eingabe": [a.text for a in report.assignments],
+                                "Katalogeintrag": [a.match.label for a in report.assignments],
+                                "Ähnlichkeit": [round(a.match.score, 2) for a in report.assignments],
+                            },
+                            use_container_width=True
+                        )
+                if report.hint_count:
+                    with st.expander(f"💡 {report.hint_count} Beschreibungen deuten auf fehlende Angaben hin"):
+                        st.dataframe(
+                            {
+                                "Zeile": [h.row for h in report.hints],
+                                "Systemname": [h.system_name for h in report.hints],
+                                "Vorschläge": [_format_suggestions(catalog, h.suggestions) for h in report.hints],
+                            },
+                            use_container_width=True
+                        )
+                if report.error_count:
+                    st.warning(f"{report.error_count} Zeilen mit ungültigen Angaben übersprungen:")
+                    st.dataframe(
+                        {
+                            "Zeile": [e.row for e in report.errors],
+                            "Fehler": ["; ".join(e.messages) for e in report.errors],
+                        },
+                        use_container_width=True
+                    )
+            elif mode == "Im Hintergrund klassifizieren (CSV)":
+                # Kopie des Uploads, da der Auftrag den Skriptlauf überdauert
+                source = io.BytesIO(upload.getvalue())
+                source.name = upload.name
+                _submit_job(
+                    f"Klassifizierung {upload.name}", _classification_job, source, catalog,
+                    filename=f"klassifizierung_{os.path.splitext(upload.name)[0]}.csv", mime="text/csv"
+                )
+                st.success("Auftrag gestartet – Fortschritt und Ergebnis unter „Hintergrundaufträge“.")
+            elif mode == "Nur Konsistenz prüfen":
+                _show_inventory_lint(upload, catalog)
+            else:
+                count = rehydrate_register(upload, register)
+                st.success(f"{count} Klassifizierungen wiederhergestellt.")
+        except (ValueError, ImportError) as e:
+            st.error(f"Import fehlgeschlagen: {e}")
+
+
+def show_jobs():
+    """Übersicht der Hintergrundaufträge dieser Session; aktualisiert sich, solange Aufträge laufen."""
+    jobs = get_job_manager().jobs(owner=st.session_state.session_id)
+    if not jobs:
+        return
+    active = any(not job.is_finished for job in jobs)
+    st.fragment(_render_jobs, run_every=JOB_POLL_INTERVAL if active else None)(active)
+
+
+def _render_jobs(polling: bool):
+    manager = get_job_manager()
+    jobs = manager.jobs(owner=st.session_state.session_id)
+
+    st.subheader("⏳ Hintergrundaufträge")
+    for job in jobs:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            if job.status == JobStatus.DONE:
+                st.markdown(f"✅ **{job.title}** – fertig um {job.finished.strftime('%H:%M:%S')}")
+            elif job.status == JobStatus.FAILED:
+                st.markdown(f"❌ **{job.title}** – {job.error}")
+            elif job.status == JobStatus.CANCELLED:
+                st.markdown(f"⏹️ **{job.title}** – abgebrochen")
+            else:
+                label = f"{job.title}: {job.status.value}"
+                if job.done:
+                    label += f" ({job.done}" + (f" von {job.total})" if job.total else " Einträge)")
+                st.progress(job.progress if job.progress is not None else 0.0, text=label)
+        with col2:
+            if job.status == JobStatus.DONE:
+                st.download_button(
+                    "⬇️ Herunterladen",
+                    manager.result(job.id),
+                    job.filename,
+                    job.mime,
+                    key=f"job_download_{job.id}",
+                    use_container_width=True
+                )
+            elif not job.is_finished:
+                st.button("Abbrechen", key=f"job_cancel_{job.id}", on_click=manager.cancel, args=(job.id,))
+
+    # Nach dem letzten laufenden Auftrag einmal komplett neu rendern, damit das Polling endet
+    if polling and all(job.is_finished for job in jobs):
+        st.rerun()
+
+
+def _submit_job(title: str, func, *args, filename: str, mime: str):
+    get_job_manager().submit(title, func, *args, filename=filename, mime=mime, owner=st.session_state.session_id)
+
+
+def _csv_export_job(progress, snapshot: RegisterSnapshot) -> str:
+    with closing(snapshot):
+        buffer = io.StringIO()
+        write_csv(track(snapshot, progress, len(snapshot)), buffer, snapshot.columns)
+        return buffer.getvalue()
+
+
+def _excel_export_job(progress, snapshot: RegisterSnapshot, catalog: CatalogSnapshot, clock: Clock) -> bytes:
+    with closing(snapshot):
+        return export_to_excel(list(track(snapshot, progress, len(snapshot))), catalog, clock).getvalue()
+
+
+def _classification_job(progress, source, catalog: CatalogSnapshot) -> str:
+    items = iter_import(source, catalog=catalog, cache=get_shared_cache())
+    audit = get_audit_log()
+    if audit is not None:
+        items = _audited(items, audit)
+    buffer = io.StringIO()
+    write_csv((item_summary(item) for item in track(items, progress)), buffer)
+    if audit is not None:
+        audit.flush()  # bei einem Schreibfehler schlägt der Auftrag fehl, statt ungesichert zu liefern
+    return buffer.getvalue()
+
+
+def _audited(items, audit):
+    for item in items:
+        audit.append("classification", classification_entry(item.input, item.result))
+        yield item
+
+
+def _show_inventory_lint(upload, catalog: CatalogSnapshot):
+    """Prüft ein Inventar auf widersprüchliche Angaben, ohne es zu klassifizieren."""
+    import_report = ImportReport()
+    rows = array("q")
+
+    def inputs():
+        for row, inp in iter_inputs(upload, catalog=catalog, report=import_report):
+            rows.append(row)
+            yield inp
+
+    report = lint_inventory(inputs())
+    st.markdown(
+        f"**{report.total} Einträge geprüft** ({report.combinations} unterschiedliche Antwortkombinationen): "
+        f"{report.affected} mit Auffälligkeiten, {import_report.error_count} ungültige Zeilen."
+    )
+    if not report.findings:
+        st.success("Keine widersprüchlichen Angaben gefunden.")
+        return
+    st.dataframe(
+        {
+            "Art": [f.rule.severity for f in report.findings],
+            "Einträge": [f.count for f in report.findings],
+            "Beispielzeilen": [", ".join(str(rows[i]) for i in f.examples) for f in report.findings],
+            "Befund": [f.rule.message for f in report.findings],
+        },
+        use_container_width=True
+    )
+
+
+def _matrix_npz(register: ClassificationRegister, kind: str) -> bytes:
+    """Erzeugt die Inzidenzmatrix des Registers als .npz-Datei."""
+    matrix = index_to_matrix(register.obligations, register.column("Systemname", range(len(register))), kind)
+    buffer = io.BytesIO()
+    matrix.save_npz(buffer)
+    return buffer.getvalue()
+
+
+def _show_deadline_groups(register: ClassificationRegister, groups: dict[str, list[int]]):
+    """Listet die Systeme je Fristart auf."""
+    for key, ids in groups.items():
+        names = register.column("Systemname", ids[:DEADLINE_NAMES_SHOWN])
+        more = f" und {len(ids) - len(names)} weitere" if len(ids) > len(names) else ""
+        st.markdown(f"- **{DEADLINE_NAMES.get(key, key)}** ({len(ids)} Systeme): {', '.join(names)}{more}")
+
+
 if __name__ == "__main__":
     main()
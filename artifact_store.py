@@ -0,0 +1,295 @@
+"""
+Inhaltsadressiertes Archiv für Berichte und Exporte
+Legt erzeugte Artefakte (Markdown-Berichte, Anhang-IV-Vorlagen, Excel-Exporte)
+dedupliziert und komprimiert in einer lokalen SQLite-Datei ab.
+
+Artefakte werden inhaltsdefiniert in Blöcke zerlegt (rollender Gear-Hash);
+jeder Block wird nur einmal gespeichert. Da sich die Berichte überwiegend in
+den statischen Abschnitten gleichen, wachsen Speicherbedarf und Schreiblast
+mit dem tatsächlich neuen Inhalt statt mit der Anzahl der Berichte.
+Komprimiert wird mit zstd, falls das Paket `zstandard` installiert ist,
+sonst mit gzip.
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional, Union
+
+from classifier_logic import Clock, SYSTEM_CLOCK
+from session_store import DATA_DIR
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+
+Artifact = Union[str, bytes]
+
+DEFAULT_ARCHIVE_PATH = os.path.join(DATA_DIR, "archive.sqlite")
+
+# Archivierung heruntergeladener Artefakte in der Anwendung (aus, wenn nicht gesetzt)
+ARCHIVE_FILE_ENV = "AI_ACT_ARCHIVE_FILE"
+
+# Blockgrößen der inhaltsdefinierten Zerlegung (Bytes)
+MIN_CHUNK = 64
+MAX_CHUNK = 8192
+_BOUNDARY_MASK = 0xFF  # durchschnittlich ca. 320 Bytes pro Block
+
+# Feste Zufallstabelle des Gear-Hashs (aus SHA-256 abgeleitet, damit prozessübergreifend stabil)
+_GEAR = tuple(
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "big")
+    for i in range(256)
+)
+
+# Typkennung wie im Ergebnis-Cache
+_KIND_STR = "s"
+_KIND_BYTES = "b"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    hash BLOB NOT NULL UNIQUE,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    chunks BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    system TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    created TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    filename TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS entries_system_created ON entries (system, created);
+CREATE INDEX IF NOT EXISTS entries_created ON entries (created);
+"""
+
+
+@dataclass(frozen=True)
+class ArchivedArtifact:
+    """Eintrag im Archiv (ohne Inhalt; der Inhalt wird über `digest` geladen)."""
+    id: int
+    system: str
+    kind: str
+    created: datetime
+    digest: str
+    filename: str
+
+
+def split_chunks(data: bytes) -> list[bytes]:
+    """
+    Zerlegt Daten inhaltsdefiniert in Blöcke.
+
+    Blockgrenzen hängen nur vom lokalen Inhalt ab; eine Änderung am Anfang
+    (z.B. Systemname im Kopf des Berichts) verschiebt daher nur die
+    Grenzen in ihrer Nähe, alle folgenden Blöcke bleiben identisch.
+    """
+    chunks = []
+    start = 0
+    length = len(data)
+    gear = _GEAR
+    while start < length:
+        end = min(start + MAX_CHUNK, length)
+        cut = end
+        h = 0
+        for i in range(start + MIN_CHUNK, end):
+            h = ((h << 1) + gear[data[i]]) & 0xFFFFFFFF
+            if not h & _BOUNDARY_MASK:
+                cut = i + 1
+                break
+        chunks.append(data[start:cut])
+        start = cut
+    return chunks
+
+
+class ArtifactStore:
+    """
+    Inhaltsadressiertes, dedupliziertes Archiv für Artefakte.
+
+    `put` legt ein Artefakt für ein System ab und gibt seinen SHA-256-Digest
+    zurück. Identische Artefakte belegen nur einen Eintrag, gleiche Blöcke
+    verschiedener Artefakte werden geteilt. `find` sucht über einen Index
+    nach System und Erstellungsdatum.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        self.codec = "zstd" if zstandard is not None else "gzip"
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def put(
+        self,
+        system: str,
+        kind: str,
+        content: Artifact,
+        filename: str = "",
+        clock: Optional[Clock] = None
+    ) -> str:
+        """Archiviert ein Artefakt (z.B. kind="markdown") und gibt seinen Digest zurück."""
+        if isinstance(content, str):
+            data, data_type = content.encode("utf-8"), _KIND_STR
+        else:
+            data, data_type = bytes(content), _KIND_BYTES
+        digest = hashlib.sha256(data).hexdigest()
+        created = (clock or SYSTEM_CLOCK).now().isoformat(timespec="seconds")
+
+        with closing(self._connect()) as conn, conn:
+            known = conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if not known:
+                self._store_blob(conn, digest, data_type, data)
+            conn.execute(
+                "INSERT INTO entries (system, kind, created, digest, filename) VALUES (?, ?, ?, ?, ?)",
+                (system, kind, created, digest, filename)
+            )
+        return digest
+
+    def get(self, digest: str) -> Artifact:
+        """Lädt den Inhalt eines Artefakts; KeyError, falls unbekannt."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT type, chunks FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                raise KeyError(digest)
+            data_type, chunk_list = row
+            chunk_ids = array("q", chunk_list)
+            stored = {
+                chunk_id: (codec, payload) for chunk_id, codec, payload in _select_in(
+                    conn, "SELECT id, codec, data FROM chunks WHERE id IN ({})", sorted(set(chunk_ids))
+                )
+            }
+        data = b"".join(_decompress(*stored[chunk_id]) for chunk_id in chunk_ids)
+        return data.decode("utf-8") if data_type == _KIND_STR else data
+
+    def find(
+        self,
+        system: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        kind: Optional[str] = None
+    ) -> list[ArchivedArtifact]:
+        """Sucht Einträge nach System, Zeitraum (Tage inklusive) und Art; neueste zuerst."""
+        clauses, params = [], []
+        if system is not None:
+            clauses.append("system = ?")
+            params.append(system)
+        if start is not None:
+            clauses.append("created >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("created < ?")
+            params.append((end + timedelta(days=1)).isoformat())
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT id, system, kind, created, digest, filename FROM entries {where} "
+                "ORDER BY created DESC, id DESC",
+                params
+            ).fetchall()
+        return [
+            ArchivedArtifact(id, system, kind, datetime.fromisoformat(created), digest, filename)
+            for id, system, kind, created, digest, filename in rows
+        ]
+
+    def stats(self) -> dict:
+        """Gibt logische und tatsächlich belegte Größe des Archivs zurück."""
+        with closing(self._connect()) as conn:
+            entries, logical = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(b.size), 0) FROM entries e JOIN blobs b ON b.digest = e.digest"
+            ).fetchone()
+            unique = conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            chunks, raw, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM chunks"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "unique_artifacts": unique,
+            "chunks": chunks,
+            "logical_bytes": logical,
+            "chunk_bytes": raw,
+            "stored_bytes": stored,
+        }
+
+    def _store_blob(self, conn: sqlite3.Connection, digest: str, data_type: str, data: bytes) -> None:
+        """Speichert nur die noch unbekannten Blöcke (komprimiert) und die Liste ihrer IDs."""
+        chunks = split_chunks(data)
+        hashes = [hashlib.sha256(chunk).digest() for chunk in chunks]
+        ids = dict(_select_in(conn, "SELECT hash, id FROM chunks WHERE hash IN ({})", list(set(hashes))))
+
+        missing = {h: chunk for h, chunk in zip(hashes, chunks) if h not in ids}
+        if missing:
+            # Parallele Schreiber können denselben Block zwischen Abfrage und Einfügen
+            # anlegen; daher OR IGNORE und die IDs danach in der Schreibtransaktion lesen
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunks (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                ((h, self.codec, len(chunk), self._compress(chunk)) for h, chunk in missing.items())
+            )
+            ids.update(_select_in(conn, "SELECT hash, id FROM chunks WHERE hash IN ({})", list(missing)))
+        conn.execute(
+            "INSERT OR IGNORE INTO blobs (digest, type, size, chunks) VALUES (?, ?, ?, ?)",
+            (digest, data_type, len(data), array("q", (ids[h] for h in hashes)).tobytes())
+        )
+
+    def _compress(self, chunk: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.compression_level).compress(chunk)
+        return gzip.compress(chunk, compresslevel=self.compression_level, mtime=0)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+
+def _decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archivblock ist mit zstd komprimiert, das Paket 'zstandard' fehlt")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return gzip.decompress(payload)
+
+
+def _select_in(conn: sqlite3.Connection, query: str, values: list, batch_size: int = 500) -> list[tuple]:
+    """Führt eine IN-Abfrage in Teilmengen aus (SQLite begrenzt die Anzahl der Parameter)."""
+    rows = []
+    for i in range(0, len(values), batch_size):
+        part = values[i:i + batch_size]
+        rows.extend(conn.execute(query.format(", ".join("?" * len(part))), part).fetchall())
+    return rows
+
+
+_archive: Optional[ArtifactStore] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[ArtifactStore]:
+    """Gibt das über AI_ACT_ARCHIVE_FILE konfigurierte Archiv zurück (None, wenn nicht gesetzt)."""
+    global _archive
+    path = os.environ.get(ARCHIVE_FILE_ENV)
+    if not path:
+        return None
+    if _archive is None or _archive.path != path:
+        with _archive_lock:
+            if _archive is None or _archive.path != path:
+                _archive = ArtifactStore(path)
+    return _archive
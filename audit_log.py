@@ -0,0 +1,353 @@
+"""
+Revisionssicheres Protokoll der Klassifizierungen
+Hängt Eingaben und Ergebnisse jeder Klassifizierung an eine Protokolldatei an,
+die nur erweitert wird. Jede Zeile enthält den SHA-256-Hash über den Hash der
+vorherigen Zeile und den eigenen Inhalt; eine nachträgliche Änderung, ein
+Einschub oder eine Löschung bricht die Kette ab der betroffenen Zeile.
+
+Zeilenformat: `<hash hex> <JSON>\n`. Die Prüfung liest die Datei zeilenweise
+und hasht nur Bytes, ohne JSON zu parsen.
+
+Geschrieben wird über einen eigenen Thread mit Gruppen-Commit: alle
+Einträge, die während eines Schreibvorgangs eintreffen, werden gemeinsam
+geschrieben und mit einem einzigen fsync gesichert. Eine Datei darf nur von
+einem Prozess beschrieben werden (exklusive Dateisperre, sofern verfügbar).
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional
+
+from classifier_logic import ClassificationInput, ClassificationResult, Clock, SYSTEM_CLOCK
+
+try:
+    import fcntl
+except ImportError:  # nicht POSIX
+    fcntl = None
+
+
+# Protokolldatei der Anwendung (aus, wenn nicht gesetzt)
+AUDIT_FILE_ENV = "AI_ACT_AUDIT_FILE"
+
+# Höchstzahl der Einträge je Gruppen-Commit
+DEFAULT_BATCH_SIZE = 1000
+
+# Vorgänger-Hash der ersten Zeile
+GENESIS_HASH = bytes(32)
+
+_HASH_HEX_LEN = 64
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class AuditReceipt:
+    """Bestätigung eines dauerhaft geschriebenen Eintrags."""
+    seq: int
+    hash: str
+
+
+@dataclass(frozen=True)
+class AuditEntry:
+    seq: int
+    timestamp: datetime
+    kind: str
+    data: Any
+    hash: str
+
+
+@dataclass(frozen=True)
+class AuditVerification:
+    """Ergebnis der Kettenprüfung."""
+    ok: bool
+    entries: int                 # geprüfte (gültige) Einträge
+    head: str                    # Hash des letzten gültigen Eintrags
+    error_line: int = 0          # erste fehlerhafte Zeile (1-basiert)
+    message: str = ""
+
+
+class AuditLog:
+    """
+    Hash-verkettetes Protokoll mit Gruppen-Commit.
+
+    `append` reiht einen Eintrag ein und gibt ein Future zurück, das nach dem
+    fsync des zugehörigen Schreibvorgangs mit einer AuditReceipt erfüllt
+    wird. Wer nicht auf die Sicherung warten muss, ignoriert das Future und
+    ruft am Ende `flush` auf.
+    Eine beim Absturz unvollständig geschriebene letzte Zeile wurde nie
+    bestätigt und wird beim Öffnen abgeschnitten.
+
+    Nach einem Schreibfehler (z.B. fehlgeschlagenem fsync) ist der Zustand
+    der Datei nicht mehr verlässlich: Das Protokoll merkt sich den Fehler,
+    lehnt weitere Einträge ab und `flush` löst ihn aus. Weiter geht es mit
+    einer neuen Instanz, die beim Öffnen den Kettenstand neu einliest.
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE, clock: Optional[Clock] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.clock = clock or SYSTEM_CLOCK
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(self._fd)
+                raise RuntimeError(f"Protokoll wird bereits von einem anderen Prozess beschrieben: {path}") from None
+        self._seq, self._head = _recover_tail(self._fd)
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()  # Prüfung und Einreihen gegenüber close() atomar
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._writer = threading.Thread(target=self._write_loop, name="audit-log-writer", daemon=True)
+        self._writer.start()
+
+    @property
+    def head(self) -> AuditReceipt:
+        """Letzter geschriebener Eintrag (z.B. zur externen Verankerung des Kettenstands)."""
+        return AuditReceipt(self._seq, self._head.hex())
+
+    @property
+    def failed(self) -> bool:
+        """True, sobald ein Schreibvorgang fehlgeschlagen ist."""
+        return self._error is not None
+
+    def append(self, kind: str, data: Any) -> Future:
+        """Reiht einen Eintrag ein (`data` muss JSON-serialisierbar sein)."""
+        future: Future = Future()
+        self._put((kind, data, self.clock.now(), future))
+        return future
+
+    def append_many(self, entries: Iterable[tuple[str, Any]]) -> Optional[Future]:
+        """Reiht mehrere Einträge ein und gibt das Future des letzten zurück."""
+        future = None
+        for kind, data in entries:
+            future = self.append(kind, data)
+        return future
+
+    def flush(self) -> None:
+        """
+        Wartet, bis alle bisher eingereihten Einträge gesichert sind.
+        Löst den Schreibfehler aus, falls einer aufgetreten ist (auch bei früheren Einträgen).
+        """
+        marker: Future = Future()
+        self._put((None, None, None, marker))
+        marker.result()
+        self._check()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+        # Sollte der Schreib-Thread vorzeitig geendet haben, darf niemand auf Einträge warten
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                item[3].set_exception(RuntimeError("Protokoll ist geschlossen"))
+        os.close(self._fd)
+
+    def _put(self, item: tuple) -> None:
+        with self._lock:
+            self._check()
+            if self._closed:
+                raise RuntimeError("Protokoll ist geschlossen")
+            self._queue.put(item)
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Protokoll ist nach einem Schreibfehler gesperrt: {self._error}") from self._error
+
+    def _write_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            # Gruppen-Commit: alles mitnehmen, was während des letzten fsync eingetroffen ist
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch: list) -> None:
+        if self._error is not None:
+            for *_, future in batch:
+                future.set_exception(self._error)
+            return
+
+        seq, head = self._seq, self._head
+        lines = []
+        receipts = []
+        size = None
+        try:
+            for kind, data, timestamp, future in batch:
+                if kind is None:  # flush-Markierung
+                    receipts.append((future, None))
+                    continue
+                seq += 1
+                payload = json.dumps(
+                    {"seq": seq, "ts": timestamp.isoformat(), "kind": kind, "data": data},
+                    ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str
+                ).encode("utf-8")
+                head = hashlib.sha256(head + payload).digest()
+                hex_hash = head.hex()
+                lines.append(b"%s %s\n" % (hex_hash.encode("ascii"), payload))
+                receipts.append((future, AuditReceipt(seq, hex_hash)))
+
+            if lines:
+                size = os.lseek(self._fd, 0, os.SEEK_END)
+                _write_all(self._fd, b"".join(lines))
+                os.fsync(self._fd)
+        except BaseException as e:
+            self._error = e
+            if size is not None:
+                # Teilweise geschriebenen Block nach Möglichkeit verwerfen
+                try:
+                    os.ftruncate(self._fd, size)
+                except OSError:
+                    pass
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+
+        self._seq, self._head = seq, head
+        for future, receipt in receipts:
+            future.set_result(receipt)
+
+
+def classification_entry(inp: ClassificationInput, result: ClassificationResult) -> dict:
+    """Protokolleintrag einer Klassifizierung: vollständige Eingabe und entscheidungsrelevantes Ergebnis."""
+    return {
+        "input": inp.pack(),
+        "fingerprint": inp.fingerprint(),
+        "risk_level": result.risk_level.value,
+        "timestamp": result.timestamp.isoformat(),
+        "catalog_version": result.catalog_version,
+        "reasons": result.reasons,
+        "applicable_articles": result.applicable_articles,
+        "warnings": result.warnings,
+        "is_gpai": result.is_gpai,
+        "gpai_has_systemic_risk": result.gpai_has_systemic_risk,
+        "exception_documentation_required": result.exception_documentation_required,
+    }
+
+
+def verify_log(path: str, expected_head: Optional[str] = None) -> AuditVerification:
+    """
+    Prüft die Hash-Kette einer Protokolldatei. Mit `expected_head` (extern
+    verankerter Hash) wird zusätzlich erkannt, ob Einträge am Ende entfernt wurden.
+    """
+    head = GENESIS_HASH
+    entries = 0
+    sha256 = hashlib.sha256
+    with open(path, "rb") as f:
+        for line_no, line in enumerate(f, start=1):
+            if not line.endswith(b"\n"):
+                return AuditVerification(False, entries, head.hex(), line_no, "Unvollständige letzte Zeile")
+            digest = sha256(head + line[_HASH_HEX_LEN + 1:-1]).digest()
+            if line[:_HASH_HEX_LEN] != digest.hex().encode("ascii") or line[_HASH_HEX_LEN:_HASH_HEX_LEN + 1] != b" ":
+                return AuditVerification(False, entries, head.hex(), line_no, "Hash stimmt nicht mit Inhalt und Vorgänger überein")
+            head = digest
+            entries += 1
+
+    if expected_head is not None and head.hex() != expected_head:
+        return AuditVerification(False, entries, head.hex(), 0, "Kettenende weicht vom erwarteten Stand ab")
+    return AuditVerification(True, entries, head.hex())
+
+
+def iter_entries(path: str) -> Iterator[AuditEntry]:
+    """Liest alle Einträge (ohne Kettenprüfung, siehe verify_log)."""
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                return
+            record = json.loads(line[_HASH_HEX_LEN + 1:])
+            yield AuditEntry(
+                record["seq"],
+                datetime.fromisoformat(record["ts"]),
+                record["kind"],
+                record["data"],
+                line[:_HASH_HEX_LEN].decode("ascii")
+            )
+
+
+def _recover_tail(fd: int) -> tuple[int, bytes]:
+    """Liest Sequenznummer und Hash der letzten vollständigen Zeile; schneidet eine unvollständige ab."""
+    size = os.lseek(fd, 0, os.SEEK_END)
+    if size == 0:
+        return 0, GENESIS_HASH
+
+    # Rückwärts in Blöcken lesen, bis die letzte vollständige Zeile gefunden ist
+    block = 64 * 1024
+    end = size
+    tail = b""
+    while True:
+        start = max(end - block, 0)
+        tail = os.pread(fd, end - start, start) + tail
+        end = start
+        complete = tail[:tail.rfind(b"\n") + 1]
+        if complete.count(b"\n") >= 2 or start == 0:
+            break
+
+    if not complete:
+        os.ftruncate(fd, 0)
+        return 0, GENESIS_HASH
+    valid_size = size - (len(tail) - len(complete))
+    if valid_size < size:
+        os.ftruncate(fd, valid_size)
+
+    last = complete[complete.rfind(b"\n", 0, len(complete) - 1) + 1:-1]
+    seq = json.loads(last[_HASH_HEX_LEN + 1:])["seq"]
+    return seq, bytes.fromhex(last[:_HASH_HEX_LEN].decode("ascii"))
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+_audit_log: Optional[AuditLog] = None
+_audit_log_lock = threading.Lock()
+
+
+def get_audit_log() -> Optional[AuditLog]:
+    """
+    Gibt das über AI_ACT_AUDIT_FILE konfigurierte Protokoll zurück (None, wenn nicht gesetzt).
+    Nach einem Schreibfehler wird die Datei beim nächsten Aufruf neu geöffnet.
+    """
+    global _audit_log
+    path = os.environ.get(AUDIT_FILE_ENV)
+    if not path:
+        return None
+    if _audit_log is None or _audit_log.path != path or _audit_log.failed:
+        with _audit_log_lock:
+            if _audit_log is None or _audit_log.path != path or _audit_log.failed:
+                if _audit_log is not None:
+                    _audit_log.close()
+                _audit_log = AuditLog(path)
+                atexit.register(_audit_log.close)
+    return _audit_log
@@ -0,0 +1,134 @@
+"""
+Stapelverarbeitung für KI-Inventare
+Gruppiert Systeme mit identischen Antworten, klassifiziert jede Gruppe nur
+einmal und verteilt das Ergebnis auf alle Mitglieder.
+"""
+
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import Iterable, Iterator, Optional, Union
+
+from classifier_logic import (
+    ClassificationInput,
+    ClassificationResult,
+    CatalogSnapshot,
+    Clock,
+    SYSTEM_CLOCK,
+    classify_ai_system,
+    get_catalog
+)
+from intake_schema import get_validator
+from result_cache import SharedResultCache
+
+
+@dataclass(frozen=True)
+class BatchItem:
+    """Ergebnis eines einzelnen Inventar-Eintrags."""
+    index: int                     # Position in der Eingabe
+    input: ClassificationInput
+    result: ClassificationResult   # eigener Zeitstempel, Listen mit der Gruppe geteilt
+    group: int                     # Nummer der Entscheidungsgruppe
+
+    @property
+    def system_name(self) -> str:
+        return self.input.system_name
+
+
+@dataclass
+class BatchReport:
+    """Ergebnisse eines Stapellaufs inklusive Deduplizierungs-Statistik."""
+    items: list[BatchItem] = field(default_factory=list)
+    groups: int = 0
+    total: int = 0    # Anzahl verarbeiteter Einträge (auch beim Streamen ohne `items`)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """Anteil der Einträge, die keine eigene Klassifizierung benötigt haben (0.0 - 1.0)."""
+        if not self.total:
+            return 0.0
+        return 1 - self.groups / self.total
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def classify_batch(
+    records: Iterable[Union[ClassificationInput, dict]],
+    reference_date: Optional[date] = None,
+    catalog: Optional[CatalogSnapshot] = None,
+    cache: Optional[SharedResultCache] = None,
+    clock: Optional[Clock] = None
+) -> BatchReport:
+    """
+    Klassifiziert ein Inventar mit Deduplizierung.
+
+    Einträge werden über ClassificationInput.decision_key() gruppiert (ohne
+    Name, Beschreibung und Anbieter). Jede Gruppe wird genau einmal
+    klassifiziert; die Mitglieder erhalten eine flache Kopie mit eigenem
+    Zeitstempel, die Listen (Gründe, Pflichten, ...) werden nicht kopiert und
+    dürfen daher nicht verändert werden. Dicts werden gegen das Schema des
+    Katalogs geprüft (ValueError mit allen Fehlern des Eintrags) und über
+    ClassificationInput.from_kwargs umgewandelt. Mit `cache` werden die
+    Gruppenergebnisse zusätzlich über den sessionübergreifenden Cache geteilt.
+    Zeitstempel und Standard-Referenzdatum stammen aus `clock`.
+    """
+    report = BatchReport()
+    report.items.extend(iter_batch(records, reference_date, catalog, cache, clock, report=report))
+    return report
+
+
+def iter_batch(
+    records: Iterable[Union[ClassificationInput, dict]],
+    reference_date: Optional[date] = None,
+    catalog: Optional[CatalogSnapshot] = None,
+    cache: Optional[SharedResultCache] = None,
+    clock: Optional[Clock] = None,
+    report: Optional[BatchReport] = None
+) -> Iterator[BatchItem]:
+    """
+    Wie classify_batch, liefert die Einträge aber einzeln, sobald sie
+    klassifiziert sind. Gehalten werden nur die Gruppenergebnisse, der
+    Speicherbedarf wächst also nicht mit der Länge des Inventars. Ein
+    übergebener `report` wird fortlaufend um `total` und `groups` ergänzt
+    (`items` bleibt unverändert).
+    """
+    if clock is None:
+        clock = SYSTEM_CLOCK
+    if reference_date is None:
+        reference_date = clock.today()
+    if catalog is None:
+        catalog = get_catalog()
+
+    shared: dict[tuple, tuple[int, ClassificationResult]] = {}
+
+    validator = get_validator(catalog)
+
+    for index, record in enumerate(records):
+        if isinstance(record, ClassificationInput):
+            inp = record
+        else:
+            errors = validator.errors(record)
+            if errors:
+                raise ValueError(f"Eintrag {index}: {'; '.join(errors)}")
+            inp = ClassificationInput.from_kwargs(catalog=catalog, **record)
+        key = inp.decision_key()
+
+        entry = shared.get(key)
+        if entry is None:
+            if cache is not None:
+                _, result = cache.classify(inp, reference_date=reference_date, catalog=catalog, clock=clock)
+            else:
+                result = classify_ai_system(inp, reference_date=reference_date, catalog=catalog, clock=clock)
+            entry = shared[key] = (len(shared), result)
+            if report is not None:
+                report.groups = len(shared)
+
+        if report is not None:
+            report.total += 1
+        group, result = entry
+        yield BatchItem(
+            index=index,
+            input=inp,
+            result=replace(result, timestamp=clock.now()),
+            group=group
+        )
@@ -0,0 +1,85 @@
+"""
+CSV-Export-Benchmark
+Vergleicht den zeilenweisen Standardbibliotheks-Export (export_utils.write_csv)
+mit dem bisherigen pandas-Pfad (DataFrame + to_csv) nach Laufzeit und
+Spitzen-Speicherbedarf.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/csv_export.py [--rows N]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from classifier_logic import Clock, classify_ai_system  # noqa: E402
+from export_utils import create_classification_summary, export_to_csv, write_csv  # noqa: E402
+
+
+def build_register(rows: int) -> list[dict]:
+    """Erzeugt ein synthetisches Register mit gemischten Risikostufen (fester Zeitstempel)."""
+    clock = Clock.fixed(datetime(2026, 1, 1, 12, 0))
+    templates = [
+        dict(high_risk_domain="employment", performs_profiling=True),
+        dict(interacts_with_humans=True, generates_synthetic_content=True, synthetic_content_types=["text", "image"]),
+        dict(performs_social_scoring=True),
+        dict(is_gpai=True, gpai_has_systemic_risk=True),
+    ]
+    results = [
+        classify_ai_system(f"Vorlage {i}", "Beschreibung", "Anbieter", clock=clock, **kwargs)
+        for i, kwargs in enumerate(templates)
+    ]
+
+    register = []
+    for i in range(rows):
+        summary = create_classification_summary(results[i % len(results)], f"System {i}")
+        summary["Anbieter"] = f"Anbieter {i % 97}"
+        summary["Beschreibung"] = f"Beschreibung des Systems {i}"
+        register.append(summary)
+    return register
+
+
+def measure(label: str, func) -> None:
+    """Misst Laufzeit und Spitzen-Speicher einer Funktion (in getrennten Durchläufen)."""
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed * 1000:>10.1f} ms {peak / 1024 / 1024:>10.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    register = build_register(args.rows)
+    print(f"{args.rows} Zeilen")
+    print(f"{'Variante':<22} {'Laufzeit':>13} {'Spitze':>14}")
+
+    measure("stdlib (Datei)", lambda: write_csv(register, open(os.devnull, "w", encoding="utf-8")))
+    measure("stdlib (String)", lambda: write_csv(register, io.StringIO()))
+
+    try:
+        import pandas as pd
+    except ImportError:
+        print("pandas nicht installiert - Vergleich übersprungen")
+        return
+
+    measure("pandas (DataFrame)", lambda: pd.DataFrame(register).to_csv(index=False))
+    identical = export_to_csv(register) == pd.DataFrame(register).to_csv(index=False)
+    print(f"Ausgabe identisch: {'ja' if identical else 'nein'}")
+
+
+if __name__ == "__main__":
+    main()
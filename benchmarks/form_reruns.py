@@ -0,0 +1,103 @@
+"""
+Durchlauf-Benchmark des Fragebogens
+Spielt eine vollständige Klassifizierung (Stammdaten, Hochrisiko-Bereich mit
+Anwendungsfall, drei Ja/Nein-Fragen, Absenden) über streamlit.testing durch
+und zählt die Skript-Durchläufe sowie die CPU-Zeit bis zum Ergebnis.
+
+Außerhalb eines Formulars löst im Browser jede Widget-Änderung einen
+Durchlauf aus; das wird hier nachgebildet. Für den Vergleich mit einem
+älteren Stand das Skript mit --app auf dessen app.py richten (z.B. aus
+`git worktree add`).
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/form_reruns.py [--app PFAD] [--repeat N]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+def find(widgets, prefix: str):
+    for widget in widgets:
+        if widget.label.startswith(prefix):
+            return widget
+    raise KeyError(prefix)
+
+
+def choose(widget, text: str):
+    widget.set_value(next(option for option in widget.options if text in option))
+
+
+def run_flow(app_path: str) -> tuple[int, float]:
+    """Führt eine Klassifizierung durch und gibt (Durchläufe, CPU-Sekunden) zurück."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=120)
+    runs = 0
+    cpu = 0.0
+
+    def run():
+        nonlocal runs, cpu
+        start = time.process_time()
+        at.run()
+        cpu += time.process_time() - start
+        runs += 1
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    run()
+    submit = find(at.button, "🔍")
+    in_form = bool(getattr(submit, "form_id", ""))
+
+    steps = [
+        lambda: find(at.text_input, "Name").input("Recruiter AI"),
+        lambda: find(at.text_input, "Anbieter").input("Muster GmbH"),
+        lambda: find(at.text_area, "Beschreibung").input("Sortiert Bewerbungen und erstellt ein Ranking"),
+    ]
+    if in_form:
+        steps.append(lambda: choose(find(at.selectbox, "Anwendungsbereich"), "Rekrutierung"))
+    else:
+        steps.append(lambda: choose(find(at.selectbox, "Anwendungsbereich"), "Beschäftigung"))
+        steps.append(lambda: choose(find(at.selectbox, "Spezifischer"), "Rekrutierung"))
+    steps += [
+        lambda: find(at.checkbox, "System führt Profiling").check(),
+        lambda: find(at.checkbox, "Direkte Interaktion").check(),
+        lambda: find(at.checkbox, "Generiert synthetische").check(),
+    ]
+    for step in steps:
+        step()
+        if not in_form:
+            run()
+    find(at.button, "🔍").click()
+    run()
+
+    if len(at.session_state.classifications) != 1:
+        raise RuntimeError("Klassifizierung wurde nicht abgeschlossen")
+    return runs, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py"))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    os.environ.setdefault("AI_ACT_DATA_DIR", tempfile.mkdtemp(prefix="ai_act_bench_"))
+    app_path = os.path.abspath(args.app)
+    sys.path.insert(0, os.path.dirname(app_path))
+
+    results = [run_flow(app_path) for _ in range(args.repeat)]
+    cpu = [seconds for _, seconds in results]
+    print(f"{app_path}")
+    print(f"Durchläufe bis zum Ergebnis: {results[0][0]}")
+    print(f"CPU-Zeit: Median {statistics.median(cpu) * 1000:.0f} ms, Minimum {min(cpu) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
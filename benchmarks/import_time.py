@@ -0,0 +1,67 @@
+"""
+Import-Zeit-Benchmark
+Misst die Importzeit der Anwendungsmodule mit `python -X importtime`
+und listet die teuersten Importe (kumulativ) auf.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/import_time.py [modul ...] [--top N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ["classifier_logic", "export_utils"]
+
+
+def measure_import(module: str) -> list[tuple[int, int, str]]:
+    """
+    Importiert ein Modul in einem frischen Interpreter und gibt die
+    importtime-Zeilen als (self_us, cumulative_us, name) zurück.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import von {module} fehlgeschlagen:\n{proc.stderr}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15, help="Anzahl der angezeigten Importe pro Modul")
+    args = parser.parse_args()
+
+    for module in args.modules:
+        entries = measure_import(module)
+        total_us = next((cum for _, cum, name in entries if name.strip() == module), 0)
+        third_party = sorted({
+            name.strip().split(".")[0] for _, _, name in entries
+            if name.strip().split(".")[0] in ("pandas", "numpy", "openpyxl", "streamlit")
+        })
+
+        print(f"== {module}: {total_us / 1000:.1f} ms kumulativ, {len(entries)} Module")
+        print(f"   Drittanbieter-Pakete: {', '.join(third_party) if third_party else 'keine'}")
+        print(f"   {'self [ms]':>10} {'kumulativ [ms]':>15}  Modul")
+        for self_us, cumulative_us, name in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+            print(f"   {self_us / 1000:>10.2f} {cumulative_us / 1000:>15.2f}  {name}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Vorprüfungs-Benchmark
+Misst den Durchsatz der Stichwort-Vorprüfung (prescreen.KeywordScreener) über
+synthetische Systembeschreibungen aus Fülltext und Katalogbegriffen.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/prescreen.py [--descriptions N] [--size BYTES] [--density P] [--repeat N]
+
+Der Durchsatz hängt stark von der Trefferdichte ab, da jede Fundstelle in
+Python als Hit aufgenommen wird (--density = Anteil der Katalogbegriffe an den Wörtern).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from prescreen import DOMAIN_KEYWORDS, FLAG_KEYWORDS, get_screener  # noqa: E402
+
+
+FILLER = (
+    "Das System verarbeitet eingehende Daten aus mehreren Quellen und stellt die Ergebnisse "
+    "den zuständigen Mitarbeitern in einer Weboberfläche zur Verfügung. Die Auswertung erfolgt "
+    "nächtlich, Abweichungen werden protokolliert und an den Fachbereich gemeldet."
+).split()
+
+
+def build_descriptions(count: int, size: int, density: float = 0.04, seed: int = 1) -> list[str]:
+    """Erzeugt Beschreibungen von etwa `size` Bytes; Anteil `density` der Wörter sind Katalogbegriffe."""
+    rng = random.Random(seed)
+    keywords = [word for words in (*FLAG_KEYWORDS.values(), *DOMAIN_KEYWORDS.values()) for word in words]
+    descriptions = []
+    for _ in range(count):
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(keywords) if rng.random() < density else rng.choice(FILLER)
+            words.append(word)
+            length += len(word.encode("utf-8")) + 1
+        descriptions.append(" ".join(words))
+    return descriptions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--descriptions", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--density", type=float, default=0.04)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    screener = get_screener()
+    descriptions = build_descriptions(args.descriptions, args.size, args.density)
+    megabytes = sum(len(text.encode("utf-8")) for text in descriptions) / 1e6
+    print(f"{args.descriptions} Beschreibungen, {megabytes:.1f} MB")
+
+    for label, func in (("scan", screener.scan), ("screen", screener.screen)):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for text in descriptions:
+                func(text)
+            best = min(best, time.perf_counter() - start)
+        print(f"{label:<8} {best * 1000:>10.1f} ms {megabytes / best:>8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,513 @@
+"""
+Massenimport von KI-Inventaren
+Liest bestehende Asset-Register aus CSV- oder Excel-Dateien, ordnet die
+Spalten über eine konfigurierbare Zuordnung den Eingaben von
+classify_ai_system zu und klassifiziert sie über die Stapelverarbeitung.
+Zusätzlich können frühere Exporte (CSV bzw. Sheet "Klassifizierungen" des
+Excel-Exports) wieder in ein Register geladen werden.
+
+CSV-Dateien werden Zeile für Zeile gelesen, Excel-Dateien im Read-only-Modus
+von openpyxl, ohne das Arbeitsblatt vollständig in den Speicher zu laden.
+Der Speicherbedarf hängt damit nicht von der Größe der Datei ab.
+"""
+
+import csv
+import io
+import os
+import re
+from dataclasses import dataclass, field, replace
+from datetime import date
+from itertools import chain
+from typing import Any, BinaryIO, Iterator, Optional, TextIO, Union
+
+from audit_log import AuditLog, classification_entry
+from batch import BatchItem, BatchReport, iter_batch
+from classifier_logic import CatalogSnapshot, ClassificationInput, Clock, get_catalog
+from export_utils import create_classification_summary
+from fuzzy_match import DEFAULT_MIN_SCORE, KIND_ANNEX_I, KIND_USE_CASE, FuzzyMatch, get_fuzzy_index
+from intake_schema import INPUT_FIELDS, TEXT_FIELDS, get_validator
+from prescreen import get_screener
+from result_cache import SharedResultCache
+from session_store import ClassificationRegister
+
+
+Source = Union[str, BinaryIO, TextIO]
+
+FORMAT_CSV = "csv"
+FORMAT_XLSX = "xlsx"
+
+_EXTENSIONS = {
+    ".csv": FORMAT_CSV,
+    ".txt": FORMAT_CSV,
+    ".xlsx": FORMAT_XLSX,
+    ".xlsm": FORMAT_XLSX,
+}
+
+# Sheet mit den Zusammenfassungen im Excel-Export (siehe export_to_excel)
+EXPORT_SHEET = "Klassifizierungen"
+
+# Pflichtspalten eines Exports (siehe create_classification_summary)
+EXPORT_KEY_COLUMNS = ("Systemname", "Risikostufe")
+
+# Spaltenüberschrift -> Eingabe. Spalten, die wie die Eingabe heißen, werden immer zugeordnet.
+DEFAULT_COLUMN_MAPPING = {
+    "Systemname": "system_name",
+    "Beschreibung": "system_description",
+    "Anbieter": "provider",
+    "Hochrisiko-Bereich": "high_risk_domain",
+    "Anwendungsfall": "high_risk_use_case",
+    "Biometrie-Ausnahme": "realtime_biometric_exception",
+    "Anhang-I-Produkt": "annex_i_product_type",
+    "Medientypen": "synthetic_content_types",
+}
+
+# Höchstzahl der im ImportReport aufbewahrten Fehlerzeilen (gezählt werden alle)
+MAX_REPORTED_ERRORS = 1000
+
+_TRUE_VALUES = frozenset({"ja", "j", "yes", "y", "true", "wahr", "1", "x"})
+_FALSE_VALUES = frozenset({"nein", "n", "no", "false", "falsch", "0", ""})
+_LIST_SEPARATOR_RE = re.compile(r"[,;|]")
+_CSV_DELIMITERS = ",;\t"
+
+
+@dataclass(frozen=True)
+class RowError:
+    """Ungültige Zeile mit allen gefundenen Fehlern."""
+    row: int                   # Zeilennummer in der Datei (Kopfzeile = 1)
+    messages: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class FuzzyAssignment:
+    """Freitext, der per unscharfer Suche einem Katalogeintrag zugeordnet wurde."""
+    row: int                   # Zeilennummer in der Datei (Kopfzeile = 1)
+    field: str                 # high_risk_use_case bzw. annex_i_product_type
+    text: str                  # Zellwert
+    match: FuzzyMatch
+
+
+@dataclass(frozen=True)
+class ScreeningHint:
+    """Antworten, die die Stichwort-Vorprüfung der Beschreibung nahelegt, die Zeile aber nicht gibt."""
+    row: int                   # Zeilennummer in der Datei (Kopfzeile = 1)
+    system_name: str
+    suggestions: dict          # siehe prescreen.ScreeningReport.missing_answers
+
+
+@dataclass
+class ImportReport:
+    """Ergebnis eines Imports: gelesene Zeilen, Stapel-Statistik, Fehler, unscharfe Zuordnungen und Vorprüfungs-Hinweise."""
+    rows: int = 0                                    # Datenzeilen ohne Leerzeilen
+    batch: BatchReport = field(default_factory=BatchReport)
+    errors: list[RowError] = field(default_factory=list)
+    error_count: int = 0
+    assignments: list[FuzzyAssignment] = field(default_factory=list)
+    assignment_count: int = 0
+    hints: list[ScreeningHint] = field(default_factory=list)
+    hint_count: int = 0
+
+    @property
+    def imported(self) -> int:
+        return self.batch.total
+
+    def add_error(self, row: int, messages: list[str]) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(row, tuple(messages)))
+
+    def add_assignment(self, row: int, name: str, text: str, match: FuzzyMatch) -> None:
+        self.assignment_count += 1
+        if len(self.assignments) < MAX_REPORTED_ERRORS:
+            self.assignments.append(FuzzyAssignment(row, name, text, match))
+
+    def add_hint(self, row: int, system_name: str, suggestions: dict) -> None:
+        self.hint_count += 1
+        if len(self.hints) < MAX_REPORTED_ERRORS:
+            self.hints.append(ScreeningHint(row, system_name, suggestions))
+
+
+def detect_format(file: Source, format: Optional[str] = None) -> str:
+    """Bestimmt das Dateiformat aus `format` oder der Dateiendung (auch bei Uploads über `.name`)."""
+    if format is None:
+        name = file if isinstance(file, str) else getattr(file, "name", "")
+        format = _EXTENSIONS.get(os.path.splitext(name)[1].lower())
+        if format is None:
+            raise ValueError(f"Dateiformat nicht erkennbar: {name or '(ohne Namen)'} (erwartet .csv oder .xlsx)")
+    elif format not in (FORMAT_CSV, FORMAT_XLSX):
+        raise ValueError(f"Unbekanntes Dateiformat: {format}")
+    return format
+
+
+def iter_table(file: Source, format: Optional[str] = None, sheet: Optional[str] = None) -> Iterator[tuple]:
+    """
+    Liefert die Zeilen einer Tabelle als Tupel, beginnend mit der Kopfzeile.
+    `sheet` wählt bei Excel-Dateien das Arbeitsblatt (Standard: aktives Blatt).
+    """
+    if detect_format(file, format) == FORMAT_XLSX:
+        yield from _iter_xlsx(file, sheet)
+    else:
+        yield from _iter_csv(file)
+
+
+def _iter_csv(file: Source) -> Iterator[tuple]:
+    if isinstance(file, str):
+        with open(file, newline="", encoding="utf-8-sig") as f:
+            yield from _read_csv(f)
+        return
+
+    if isinstance(file.read(0), bytes):
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        try:
+            yield from _read_csv(text)
+        finally:
+            text.detach()  # Upload-Objekt nicht mitschließen
+    else:
+        yield from _read_csv(file)
+
+
+def _read_csv(f: TextIO) -> Iterator[tuple]:
+    """Liest CSV zeilenweise; das Trennzeichen (Komma, Semikolon, Tab) wird aus der Kopfzeile bestimmt."""
+    header = f.readline()
+    if not header:
+        return
+    delimiter = max(_CSV_DELIMITERS, key=header.count)
+    for row in csv.reader(chain([header], f), delimiter=delimiter):
+        yield tuple(row)
+
+
+def _iter_xlsx(file: Source, sheet: Optional[str]) -> Iterator[tuple]:
+    from openpyxl import load_workbook  # optional, nur für den Excel-Import
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        if sheet is None:
+            worksheet = workbook.active
+        elif sheet in workbook.sheetnames:
+            worksheet = workbook[sheet]
+        else:
+            raise ValueError(f"Arbeitsblatt nicht gefunden: {sheet}")
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def resolve_columns(header: tuple, mapping: Optional[dict[str, str]] = None) -> list[tuple[int, str]]:
+    """
+    Ordnet die Spalten einer Kopfzeile den Eingaben zu und gibt (Spaltenposition, Eingabe) zurück.
+    Überschriften werden ohne Groß-/Kleinschreibung verglichen; nicht zugeordnete Spalten werden ignoriert.
+    """
+    if mapping is None:
+        mapping = DEFAULT_COLUMN_MAPPING
+    unknown = sorted(set(mapping.values()) - set(INPUT_FIELDS))
+    if unknown:
+        raise ValueError(f"Unbekannte Eingaben in der Spaltenzuordnung: {', '.join(unknown)}")
+
+    lookup = {name.casefold(): name for name in INPUT_FIELDS}
+    lookup.update((title.strip().casefold(), target) for title, target in mapping.items())
+
+    columns = []
+    seen: dict[str, str] = {}
+    for position, title in enumerate(header):
+        title = _cell_text(title)
+        target = lookup.get(title.casefold())
+        if target is None:
+            continue
+        if target in seen:
+            raise ValueError(f"Spalten '{seen[target]}' und '{title}' sind beide '{target}' zugeordnet")
+        seen[target] = title
+        columns.append((position, target))
+    if not columns:
+        raise ValueError("Keine Spalte der Kopfzeile ist einer Eingabe zugeordnet")
+    return columns
+
+
+class RecordMapper:
+    """
+    Wandelt Tabellenzeilen über die aufgelösten Spalten in ClassificationInput um.
+    Zellwerte werden in die Typen von classify_ai_system übersetzt und danach
+    mit dem Schema-Validator des Katalogs geprüft.
+
+    Anwendungsfälle und Anhang-I-Produkte, die nicht wörtlich im Katalog stehen,
+    werden über den Trigramm-Index (fuzzy_match) dem ähnlichsten Katalogeintrag
+    zugeordnet; ein fehlender Hochrisiko-Bereich wird aus dem Anwendungsfall
+    ergänzt. Liegt der beste Treffer unter `min_score`, ist die Zeile ungültig.
+    """
+
+    def __init__(self, columns: list[tuple[int, str]], catalog: CatalogSnapshot, min_score: float = DEFAULT_MIN_SCORE):
+        self.columns = columns
+        self.min_score = min_score
+        self._catalog = catalog
+        self._domains = _choice_lookup(catalog.high_risk_domains)
+        self._exceptions = _choice_lookup(catalog.realtime_biometric_exceptions)
+        self._content_types = {key.casefold(): key for key in catalog.code_of_practice_marking}
+        self._use_cases: dict[str, dict[str, str]] = {}   # Anwendungsfall (casefold) -> {Bereich: Wortlaut}
+        for domain_key, domain in catalog.high_risk_domains.items():
+            for use_case in domain["use_cases"]:
+                self._use_cases.setdefault(use_case.casefold(), {})[domain_key] = use_case
+        self._products = {product.casefold(): product for product in catalog.annex_i_products}
+        self._validator = get_validator(catalog)
+
+    def convert(
+        self,
+        row: tuple,
+        assignments: Optional[list[tuple[str, str, FuzzyMatch]]] = None
+    ) -> tuple[Optional[ClassificationInput], list[str]]:
+        """
+        Gibt (Eingabe, []) oder (None, Fehlermeldungen) zurück; es werden alle Fehler einer Zeile gesammelt.
+        Unscharfe Zuordnungen werden als (Eingabe, Zellwert, Treffer) an `assignments` angehängt.
+        """
+        kwargs: dict[str, Any] = {}
+        errors = []
+        width = len(row)
+        for position, name in self.columns:
+            value = row[position] if position < width else None
+            try:
+                if name in TEXT_FIELDS:
+                    kwargs[name] = _cell_text(value)
+                elif name == "high_risk_domain":
+                    kwargs[name] = _parse_choice(value, self._domains)
+                elif name == "realtime_biometric_exception":
+                    kwargs[name] = _parse_choice(value, self._exceptions)
+                elif name == "synthetic_content_types":
+                    kwargs[name] = [
+                        self._content_types.get(part.strip().casefold(), part.strip())
+                        for part in _LIST_SEPARATOR_RE.split(_cell_text(value)) if part.strip()
+                    ]
+                else:
+                    kwargs[name] = _parse_bool(value)
+            except ValueError as e:
+                errors.append(f"{name}: {e}")
+        self._match_catalog(kwargs, errors, assignments)
+        errors.extend(self._validator.errors(kwargs))
+        if errors:
+            return None, errors
+        try:
+            return ClassificationInput.from_kwargs(catalog=self._catalog, **kwargs), []
+        except ValueError as e:
+            return None, [str(e)]
+
+
+    def _match_catalog(
+        self,
+        kwargs: dict[str, Any],
+        errors: list[str],
+        assignments: Optional[list[tuple[str, str, FuzzyMatch]]]
+    ) -> None:
+        """Ersetzt Anwendungsfall und Produkt durch den Wortlaut des Katalogs (exakt oder unscharf)."""
+        use_case = kwargs.get("high_risk_use_case")
+        domain = kwargs.get("high_risk_domain")
+        # Unbekannte Bereiche meldet die Schema-Prüfung
+        if use_case and (not domain or domain in self._catalog.high_risk_domains):
+            exact = self._use_cases.get(use_case.casefold(), {})
+            if exact and (not domain or domain in exact):
+                domain = domain or next(iter(exact))
+                kwargs["high_risk_domain"], kwargs["high_risk_use_case"] = domain, exact[domain]
+            else:
+                match = self._best(use_case, KIND_USE_CASE, domain or None, "high_risk_use_case", "Anwendungsfall", errors)
+                if match is not None:
+                    kwargs["high_risk_domain"] = match.domain
+                    kwargs["high_risk_use_case"] = match.label
+                    if assignments is not None:
+                        assignments.append(("high_risk_use_case", use_case, match))
+
+        product = kwargs.get("annex_i_product_type")
+        if product:
+            exact_product = self._products.get(product.casefold())
+            if exact_product is not None:
+                kwargs["annex_i_product_type"] = exact_product
+            else:
+                match = self._best(product, KIND_ANNEX_I, None, "annex_i_product_type", "Anhang-I-Produkt", errors)
+                if match is not None:
+                    kwargs["annex_i_product_type"] = match.label
+                    if assignments is not None:
+                        assignments.append(("annex_i_product_type", product, match))
+
+    def _best(
+        self,
+        text: str,
+        kind: str,
+        domain: Optional[str],
+        name: str,
+        label: str,
+        errors: list[str]
+    ) -> Optional[FuzzyMatch]:
+        matches = get_fuzzy_index(self._catalog).search(text, kind, limit=1, domain=domain)
+        if matches and matches[0].score >= self.min_score:
+            return matches[0]
+        message = f"{name}: kein passender {label} im Katalog: {text!r}"
+        if matches:
+            message += f" (ähnlichster: {matches[0].label!r}, Ähnlichkeit {matches[0].score:.2f})"
+        errors.append(message)
+        return None
+
+
+def iter_inputs(
+    file: Source,
+    mapping: Optional[dict[str, str]] = None,
+    format: Optional[str] = None,
+    sheet: Optional[str] = None,
+    catalog: Optional[CatalogSnapshot] = None,
+    report: Optional[ImportReport] = None
+) -> Iterator[tuple[int, ClassificationInput]]:
+    """
+    Liest ein Inventar und liefert (Zeilennummer, Eingabe) für jede gültige Zeile.
+    Leerzeilen werden übersprungen, ungültige Zeilen und unscharfe Zuordnungen in `report` festgehalten.
+    Mit `report` wird zudem jede Beschreibung per Stichwort-Vorprüfung (prescreen) gegen die
+    Antworten der Zeile abgeglichen; nahegelegte, aber fehlende Antworten landen als Hinweis im Bericht.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    rows = iter_table(file, format, sheet)
+    header = next(rows, None)
+    if header is None:
+        return
+    mapper = RecordMapper(resolve_columns(header, mapping), catalog)
+    screener = get_screener(catalog) if report is not None else None
+
+    for row_number, row in enumerate(rows, start=2):
+        if not any(_cell_text(value) for value in row):
+            continue
+        if report is not None:
+            report.rows += 1
+        assignments: list[tuple[str, str, FuzzyMatch]] = []
+        inp, errors = mapper.convert(row, assignments)
+        if inp is None:
+            if report is not None:
+                report.add_error(row_number, errors)
+            continue
+        if report is not None:
+            for name, text, match in assignments:
+                report.add_assignment(row_number, name, text, match)
+            if inp.system_description:
+                missing = screener.screen(inp.system_description).missing_answers(inp)
+                if missing:
+                    report.add_hint(row_number, inp.system_name, missing)
+        yield row_number, inp
+
+
+def iter_import(
+    file: Source,
+    mapping: Optional[dict[str, str]] = None,
+    format: Optional[str] = None,
+    sheet: Optional[str] = None,
+    reference_date: Optional[date] = None,
+    catalog: Optional[CatalogSnapshot] = None,
+    cache: Optional[SharedResultCache] = None,
+    clock: Optional[Clock] = None,
+    report: Optional[ImportReport] = None
+) -> Iterator[BatchItem]:
+    """
+    Liest und klassifiziert ein Inventar als Strom über batch.iter_batch.
+    `BatchItem.index` ist die Zeilennummer in der Datei.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    if report is None:
+        report = ImportReport()
+    current_row = 0
+
+    def inputs() -> Iterator[ClassificationInput]:
+        nonlocal current_row
+        for current_row, inp in iter_inputs(file, mapping, format, sheet, catalog, report):
+            yield inp
+
+    # iter_batch liefert jeden Eintrag, bevor es die nächste Eingabe anfordert
+    for item in iter_batch(inputs(), reference_date, catalog, cache, clock, report=report.batch):
+        yield replace(item, index=current_row)
+
+
+def import_into_register(
+    file: Source,
+    register: ClassificationRegister,
+    mapping: Optional[dict[str, str]] = None,
+    format: Optional[str] = None,
+    sheet: Optional[str] = None,
+    reference_date: Optional[date] = None,
+    catalog: Optional[CatalogSnapshot] = None,
+    cache: Optional[SharedResultCache] = None,
+    clock: Optional[Clock] = None,
+    audit: Optional[AuditLog] = None
+) -> ImportReport:
+    """
+    Klassifiziert ein Inventar und fügt die Ergebnisse (inkl. Portfolio-Indizes) dem Register hinzu.
+    Mit `audit` wird jede Klassifizierung protokolliert; die Funktion kehrt erst
+    zurück, wenn alle Einträge gesichert sind, und löst einen Schreibfehler des
+    Protokolls aus (siehe AuditLog.flush).
+    """
+    report = ImportReport()
+    for item in iter_import(file, mapping, format, sheet, reference_date, catalog, cache, clock, report):
+        register.append(item_summary(item), item.result, item.input.fingerprint())
+        if audit is not None:
+            audit.append("classification", classification_entry(item.input, item.result))
+    if audit is not None:
+        audit.flush()
+    return report
+
+
+def item_summary(item: BatchItem) -> dict:
+    """Zusammenfassung eines Stapel-Eintrags wie im Register (inkl. Anbieter und Beschreibung)."""
+    inp = item.input
+    summary = create_classification_summary(item.result, inp.system_name)
+    summary["Anbieter"] = inp.provider
+    summary["Beschreibung"] = inp.system_description
+    return summary
+
+
+def rehydrate_register(file: Source, register: ClassificationRegister, format: Optional[str] = None) -> int:
+    """
+    Lädt einen früheren Export (CSV oder Sheet "Klassifizierungen") zurück ins
+    Register und gibt die Anzahl der Einträge zurück. Die Zusammenfassungen
+    werden unverändert übernommen; da die ursprünglichen Antworten nicht
+    exportiert werden, bleiben die Portfolio-Indizes für diese Einträge leer.
+    """
+    sheet = EXPORT_SHEET if detect_format(file, format) == FORMAT_XLSX else None
+    rows = iter_table(file, format, sheet)
+    header = [_cell_text(title) for title in next(rows, ())]
+    missing = [col for col in EXPORT_KEY_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Kein Klassifizierungs-Export, es fehlen die Spalten: {', '.join(missing)}")
+
+    count = 0
+    for row in rows:
+        summary = {title: _cell_text(value) for title, value in zip(header, row) if title}
+        if not any(summary.values()):
+            continue
+        register.append(summary)
+        count += 1
+    return count
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = _cell_text(value).casefold()
+    if text in _TRUE_VALUES:
+        return True
+    if text in _FALSE_VALUES:
+        return False
+    raise ValueError(f"kein Ja/Nein-Wert: {value!r}")
+
+
+def _choice_lookup(choices: dict) -> dict[str, str]:
+    """Schlüssel und Anzeigenamen (ohne Groß-/Kleinschreibung) -> Schlüssel."""
+    lookup = {}
+    for key, entry in choices.items():
+        lookup[key.casefold()] = key
+        lookup[entry["name"].casefold()] = key
+    return lookup
+
+
+def _parse_choice(value: Any, lookup: dict[str, str]) -> Optional[str]:
+    """Schlüssel zu Schlüssel oder Anzeigename; unbekannte Werte bleiben für die Schema-Prüfung erhalten."""
+    text = _cell_text(value)
+    if not text:
+        return None
+    return lookup.get(text.casefold(), text)
@@ -0,0 +1,293 @@
+"""
+Wiederaufsetzbare Stapelläufe
+Führt Portfolio-Läufe (Klassifizierung plus Markdown-Bericht je System) mit
+Zwischenständen in einer lokalen SQLite-Datei aus. Bricht ein Lauf ab, setzt
+ein erneuter Aufruf mit derselben Lauf-ID nach dem letzten gesicherten
+Eintrag wieder auf.
+
+Ein Eintrag gilt als erledigt, wenn für seine Record-ID der gleiche
+Eingabe-Fingerabdruck gesichert ist; geänderte Einträge werden neu
+klassifiziert. Zeitstempel, Referenzdatum und Katalog-Version werden beim
+ersten Start des Laufs festgehalten und bei jeder Fortsetzung
+wiederverwendet, sodass Ergebnisse und Berichte unabhängig von Abbrüchen
+byte-identisch sind. Berichte werden vor dem Sichern des Zwischenstands
+atomar geschrieben; nach einem Abbruch dazwischen werden sie beim Fortsetzen
+mit gleichem Inhalt überschrieben.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO, Union
+from urllib.parse import quote
+
+from batch import iter_batch
+from bulk_import import item_summary
+from classifier_logic import CatalogSnapshot, ClassificationInput, Clock, SYSTEM_CLOCK, get_catalog
+from export_utils import generate_markdown_report, write_csv
+from intake_schema import get_validator
+from result_cache import SharedResultCache
+from session_store import DATA_DIR
+
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(DATA_DIR, "checkpoints.sqlite")
+
+# Einträge pro gesichertem Zwischenstand
+DEFAULT_COMMIT_EVERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started TEXT NOT NULL,
+    reference_date TEXT NOT NULL,
+    catalog_version TEXT NOT NULL,
+    finished TEXT
+);
+CREATE TABLE IF NOT EXISTS records (
+    run_id TEXT NOT NULL,
+    record_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    report TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (run_id, record_id)
+);
+CREATE INDEX IF NOT EXISTS records_position ON records (run_id, position);
+"""
+
+Record = tuple[str, Union[ClassificationInput, dict]]
+
+
+@dataclass
+class RunInfo:
+    """Festgehaltene Rahmendaten eines Laufs."""
+    run_id: str
+    started: datetime
+    reference_date: date
+    catalog_version: str
+    finished: Optional[datetime] = None
+
+
+@dataclass
+class CheckpointReport:
+    """Ergebnis eines (fortgesetzten) Laufs."""
+    run: RunInfo
+    resumed: bool          # Lauf existierte bereits
+    total: int = 0         # gelesene Einträge
+    skipped: int = 0       # bereits erledigt (gleicher Fingerabdruck)
+    processed: int = 0     # in diesem Aufruf klassifiziert
+    groups: int = 0        # davon unterschiedliche Antwortkombinationen
+    commits: int = 0
+
+
+class CheckpointStore:
+    """Zwischenstände von Stapelläufen in einer SQLite-Datei (mehrere Läufe je Datei)."""
+
+    def __init__(self, path: str = DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def start(
+        self,
+        run_id: str,
+        catalog: CatalogSnapshot,
+        reference_date: Optional[date] = None,
+        clock: Optional[Clock] = None
+    ) -> tuple[RunInfo, bool]:
+        """
+        Legt einen Lauf an oder lädt den bestehenden; gibt (Lauf, fortgesetzt) zurück.
+        Ein bestehender Lauf kann nur mit derselben Katalog-Version fortgesetzt werden.
+        """
+        with closing(self._connect()) as conn, conn:
+            run = self._load_run(conn, run_id)
+            if run is not None:
+                if run.catalog_version != catalog.version:
+                    raise ValueError(
+                        f"Lauf {run_id} wurde mit Katalog-Version {run.catalog_version} begonnen, "
+                        f"aktiv ist {catalog.version}; bitte neue Lauf-ID verwenden"
+                    )
+                return run, True
+
+            started = (clock or SYSTEM_CLOCK).now()
+            run = RunInfo(run_id, started, reference_date or started.date(), catalog.version)
+            conn.execute(
+                "INSERT INTO runs (run_id, started, reference_date, catalog_version) VALUES (?, ?, ?, ?)",
+                (run_id, started.isoformat(), run.reference_date.isoformat(), catalog.version)
+            )
+        return run, False
+
+    def run(self, run_id: str) -> Optional[RunInfo]:
+        with closing(self._connect()) as conn:
+            return self._load_run(conn, run_id)
+
+    def completed(self, run_id: str, record_ids: list[str]) -> dict[str, str]:
+        """Gesicherte Fingerabdrücke der angegebenen Einträge (Record-ID -> Fingerabdruck)."""
+        done = {}
+        with closing(self._connect()) as conn:
+            for i in range(0, len(record_ids), 500):
+                part = record_ids[i:i + 500]
+                done.update(conn.execute(
+                    f"SELECT record_id, fingerprint FROM records WHERE run_id = ? "
+                    f"AND record_id IN ({', '.join('?' * len(part))})",
+                    [run_id, *part]
+                ).fetchall())
+        return done
+
+    def commit(self, run_id: str, rows: list[tuple]) -> None:
+        """Sichert (record_id, position, fingerprint, risk_level, summary, report) in einer Transaktion."""
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO records "
+                "(run_id, record_id, position, fingerprint, risk_level, summary, report) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in rows]
+            )
+
+    def finish(self, run_id: str, clock: Optional[Clock] = None) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE runs SET finished = ? WHERE run_id = ?",
+                ((clock or SYSTEM_CLOCK).now().isoformat(), run_id)
+            )
+
+    def summaries(self, run_id: str) -> Iterator[dict]:
+        """Zusammenfassungen des Laufs in Eingabereihenfolge (zeilenweise aus der Datei)."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "SELECT summary FROM records WHERE run_id = ? ORDER BY position, record_id", (run_id,)
+            )
+            for (summary,) in cursor:
+                yield json.loads(summary)
+
+    def count(self, run_id: str) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM records WHERE run_id = ?", (run_id,)).fetchone()[0]
+
+    def _load_run(self, conn: sqlite3.Connection, run_id: str) -> Optional[RunInfo]:
+        row = conn.execute(
+            "SELECT started, reference_date, catalog_version, finished FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        started, reference_date, catalog_version, finished = row
+        return RunInfo(
+            run_id,
+            datetime.fromisoformat(started),
+            date.fromisoformat(reference_date),
+            catalog_version,
+            datetime.fromisoformat(finished) if finished else None
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+
+def run_checkpointed(
+    records: Iterable[Record],
+    run_id: str,
+    store: Optional[CheckpointStore] = None,
+    report_dir: Optional[str] = None,
+    reference_date: Optional[date] = None,
+    catalog: Optional[CatalogSnapshot] = None,
+    cache: Optional[SharedResultCache] = None,
+    clock: Optional[Clock] = None,
+    commit_every: int = DEFAULT_COMMIT_EVERY
+) -> CheckpointReport:
+    """
+    Klassifiziert (Record-ID, Eingabe)-Paare mit Zwischenständen.
+
+    Bereits erledigte Einträge werden übersprungen, alle übrigen über
+    batch.iter_batch klassifiziert. Mit `report_dir` wird je Eintrag ein
+    Markdown-Bericht `<Record-ID>.md` (URL-kodiert) geschrieben. Alle
+    `commit_every` Einträge wird der Zwischenstand gesichert. `reference_date`
+    und `clock` wirken nur beim ersten Start des Laufs.
+    """
+    if store is None:
+        store = CheckpointStore()
+    if catalog is None:
+        catalog = get_catalog()
+    run, resumed = store.start(run_id, catalog, reference_date, clock)
+    run_clock = Clock.fixed(run.started)
+    report = CheckpointReport(run=run, resumed=resumed)
+    validator = get_validator(catalog)
+    if report_dir is not None:
+        os.makedirs(report_dir, exist_ok=True)
+
+    current: tuple[str, int, str] = ("", 0, "")
+
+    def pending() -> Iterator[ClassificationInput]:
+        nonlocal current
+        position = 0
+        records_iter = iter(records)
+        while True:
+            chunk = list(islice(records_iter, commit_every))
+            if not chunk:
+                return
+            done = store.completed(run_id, [record_id for record_id, _ in chunk])
+            for record_id, record in chunk:
+                report.total += 1
+                if isinstance(record, ClassificationInput):
+                    inp = record
+                else:
+                    errors = validator.errors(record)
+                    if errors:
+                        raise ValueError(f"Eintrag {record_id}: {'; '.join(errors)}")
+                    inp = ClassificationInput.from_kwargs(catalog=catalog, **record)
+                fingerprint = inp.fingerprint()
+                if done.get(record_id) == fingerprint:
+                    report.skipped += 1
+                else:
+                    current = (record_id, position, fingerprint)
+                    yield inp
+                position += 1
+
+    batch = []
+    for item in iter_batch(pending(), run.reference_date, catalog, cache, run_clock):
+        record_id, position, fingerprint = current
+        summary = item_summary(item)
+        report_file = ""
+        if report_dir is not None:
+            inp = item.input
+            report_file = quote(record_id, safe="") + ".md"
+            _write_atomic(
+                os.path.join(report_dir, report_file),
+                generate_markdown_report(item.result, inp.system_name, inp.system_description, inp.provider, clock=run_clock)
+            )
+        batch.append((
+            record_id, position, fingerprint, item.result.risk_level.value,
+            json.dumps(summary, ensure_ascii=False), report_file
+        ))
+        report.processed += 1
+        report.groups = max(report.groups, item.group + 1)
+        if len(batch) >= commit_every:
+            store.commit(run_id, batch)
+            report.commits += 1
+            batch = []
+
+    if batch:
+        store.commit(run_id, batch)
+        report.commits += 1
+    store.finish(run_id, clock)
+    return report
+
+
+def export_run_csv(store: CheckpointStore, run_id: str, file: TextIO) -> int:
+    """Schreibt alle Zusammenfassungen eines Laufs als CSV; gibt die Anzahl der Zeilen zurück."""
+    return write_csv(store.summaries(run_id), file)
+
+
+def _write_atomic(path: str, content: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, path)
@@ -3,12 +3,22 @@ EU AI Act Klassifizierungslogik
 Enthält alle Kriterien und Logik zur Einstufung von KI-Systemen
 """
 
-from dataclasses import dataclass, field
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from typing import Optional
+from typing import Any, Iterable, Optional, Union
 from datetime import datetime, date
 
 
+logger = logging.getLogger(__name__)
+
+
 class RiskLevel(Enum):
     UNACCEPTABLE = "Unannehmbares Risiko (Verboten)"
     HIGH = "Hohes Risiko"
@@ -25,6 +35,16 @@ AI_ACT_DEADLINES = {
     "high_risk_annex_i": date(2027, 8, 2),   # Hochrisiko Anhang I
 }
 
+# Bezeichnungen der Schlüssel in ClassificationResult.applicable_deadlines
+DEADLINE_NAMES = {
+    "verbotene_praktiken": "Verbotene Praktiken (Art. 5)",
+    "ki_kompetenz": "KI-Kompetenz (Art. 4)",
+    "gpai": "GPAI-Modell-Pflichten",
+    "transparenzpflichten": "Transparenzpflichten (Art. 50)",
+    "hochrisiko_anhang_iii": "Hochrisiko-Systeme (Anhang III)",
+    "hochrisiko_anhang_i": "Hochrisiko-Produkte (Anhang I)"
+}
+
 
 @dataclass
 class ClassificationResult:
@@ -43,6 +63,35 @@ class ClassificationResult:
     applicable_deadlines: dict[str, date] = field(default_factory=dict)
     exception_documentation_required: bool = False  # Dokumentationspflicht bei Ausnahme
     warnings: list[str] = field(default_factory=list)  # Warnungen bei Konflikten
+    catalog_version: str = ""  # Version des Regelkatalog-Snapshots, gegen den klassifiziert wurde
+
+
+@dataclass(frozen=True)
+class Clock:
+    """
+    Zeitquelle für Klassifizierung und Berichte.
+
+    Ohne `timestamp` liefert die Uhr die Systemzeit. Mit festem `timestamp`
+    erzeugen gleiche Eingaben byte-identische Ergebnisse und Artefakte
+    (Caching, Deduplizierung, reproduzierbare Benchmarks).
+    """
+    timestamp: Optional[datetime] = None
+
+    @classmethod
+    def fixed(cls, moment: Union[datetime, date]) -> "Clock":
+        """Erstellt eine Uhr mit festem Zeitpunkt (ein Datum steht für 00:00 Uhr)."""
+        if not isinstance(moment, datetime):
+            moment = datetime.combine(moment, datetime.min.time())
+        return cls(moment)
+
+    def now(self) -> datetime:
+        return self.timestamp if self.timestamp is not None else datetime.now()
+
+    def today(self) -> date:
+        return self.now().date()
+
+
+SYSTEM_CLOCK = Clock()
 
 
 # GPAI (General Purpose AI) Pflichten
@@ -261,12 +310,208 @@ LIMITED_RISK_TRIGGERS = {
     "biometric_categorization_allowed": "Rechtmäßige biometrische Kategorisierung"
 }
 
+# Warnungen bei widersprüchlichen Eingaben (Schritt 0, auch für conflict_lint)
+CONFLICT_WARNINGS = {
+    "emotion_recognition": (
+        "KONFLIKT: Emotionserkennung kann nicht gleichzeitig am Arbeitsplatz/in Bildung "
+        "(verboten) UND für medizinische/Sicherheitszwecke (erlaubt) sein. "
+        "Bitte klären Sie den primären Verwendungszweck."
+    ),
+    "biometric_categorization": (
+        "KONFLIKT: Biometrische Kategorisierung kann nicht gleichzeitig nach sensiblen "
+        "Merkmalen (verboten) UND rechtmäßig (erlaubt) sein. "
+        "Bitte prüfen Sie welche Kategorien tatsächlich erfasst werden."
+    ),
+    "predictive_policing": (
+        "KONFLIKT: Predictive Policing kann nicht gleichzeitig NUR auf Profiling "
+        "basieren UND objektive Fakten nutzen. "
+        "Bitte klären Sie die tatsächliche Datenbasis."
+    ),
+}
+
+
+# ============================================================
+# Versionierte Regelkataloge (Hot Reload ohne Neustart)
+# ============================================================
+
+# Pfad zu einer optionalen JSON-Datei, die die eingebauten Kataloge überschreibt
+CATALOG_FILE_ENV = "AI_ACT_CATALOG_FILE"
+
+# Mindestabstand zwischen zwei Prüfungen der Katalogdatei (Sekunden)
+CATALOG_POLL_INTERVAL = 1.0
+
+# Zuordnung JSON-Schlüssel -> erwarteter Typ
+_CATALOG_FIELDS = {
+    "high_risk_domains": dict,
+    "annex_i_products": list,
+    "realtime_biometric_exceptions": dict,
+    "code_of_practice_marking": dict,
+}
+
+
+# Pflichtfelder (Feld -> Typ) je Eintrag der Kataloge mit Einträgen als dict
+_CATALOG_ENTRY_FIELDS = {
+    "high_risk_domains": ("Hochrisiko-Bereich", {"name": str, "use_cases": list, "article": str}),
+    "realtime_biometric_exceptions": ("Biometrie-Ausnahme", {"name": str, "description": str, "article": str}),
+}
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """
+    Unveränderlicher, versionierter Stand der Regelkataloge.
+
+    Ein Snapshot wird nie verändert, sondern bei Änderungen als Ganzes ersetzt.
+    Eine laufende Klassifizierung arbeitet daher bis zum Ende mit dem Stand,
+    mit dem sie begonnen hat. Die Version ist ein Hash über den Inhalt und
+    eignet sich als Cache-Schlüssel.
+    """
+    version: str
+    high_risk_domains: dict
+    annex_i_products: list[str]
+    realtime_biometric_exceptions: dict
+    code_of_practice_marking: dict
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CatalogSnapshot":
+        """
+        Erstellt einen Snapshot aus einem Dictionary (z.B. geladenem JSON).
+        Fehlende Kataloge werden mit den eingebauten Standardwerten belegt.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Kataloge müssen als Objekt (JSON-Objekt) angegeben werden")
+        catalogs = {
+            "high_risk_domains": HIGH_RISK_DOMAINS,
+            "annex_i_products": ANNEX_I_PRODUCTS,
+            "realtime_biometric_exceptions": REALTIME_BIOMETRIC_EXCEPTIONS,
+            "code_of_practice_marking": CODE_OF_PRACTICE_MARKING,
+        }
+        for key, expected_type in _CATALOG_FIELDS.items():
+            if key in data:
+                if not isinstance(data[key], expected_type):
+                    raise ValueError(
+                        f"Katalog '{key}' muss vom Typ {expected_type.__name__} sein"
+                    )
+                catalogs[key] = data[key]
+
+        _validate_catalogs(catalogs)
+
+        # Tiefe Kopie, damit spätere Änderungen an den Quellen den Snapshot nicht berühren
+        catalogs = copy.deepcopy(catalogs)
+        canonical = json.dumps(catalogs, sort_keys=True, ensure_ascii=False)
+        version = hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+        return cls(version=version, **catalogs)
+
+
+def _validate_catalogs(catalogs: dict) -> None:
+    """
+    Prüft Aufbau und Typen aller Katalogeinträge, damit eine fehlerhafte Datei
+    abgelehnt wird, statt erst bei der Klassifizierung zu scheitern (ValueError).
+    """
+    for key, (label, fields) in _CATALOG_ENTRY_FIELDS.items():
+        for entry_key, entry in catalogs[key].items():
+            if not isinstance(entry_key, str) or not entry_key:
+                raise ValueError(f"Katalog '{key}': Schlüssel müssen nicht-leere Texte sein")
+            if not isinstance(entry, dict):
+                raise ValueError(f"{label} '{entry_key}' muss ein Objekt sein")
+            missing = set(fields) - set(entry)
+            if missing:
+                raise ValueError(f"{label} '{entry_key}' fehlen Felder: {', '.join(sorted(missing))}")
+            for field_name, expected_type in fields.items():
+                value = entry[field_name]
+                if not isinstance(value, expected_type) or (expected_type is list and not _is_text_list(value)):
+                    kind = "eine Liste von Texten" if expected_type is list else "ein Text"
+                    raise ValueError(f"{label} '{entry_key}': Feld '{field_name}' muss {kind} sein")
+
+    if not _is_text_list(catalogs["annex_i_products"]):
+        raise ValueError("Katalog 'annex_i_products' muss eine Liste von Texten sein")
+
+    for content_type, methods in catalogs["code_of_practice_marking"].items():
+        if not isinstance(content_type, str) or not content_type:
+            raise ValueError("Katalog 'code_of_practice_marking': Medientypen müssen nicht-leere Texte sein")
+        if not _is_text_list(methods):
+            raise ValueError(f"Medientyp '{content_type}': Markierungsmethoden müssen eine Liste von Texten sein")
+
+
+def _is_text_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+_catalog_lock = threading.Lock()
+_active_catalog = CatalogSnapshot.from_dict({})
+_catalog_file_state: Optional[tuple] = None  # (Pfad, mtime_ns, Größe) der zuletzt geladenen Datei
+_catalog_last_poll = 0.0
+
+
+def load_catalog_file(path: str) -> CatalogSnapshot:
+    """Lädt einen Katalog-Snapshot aus einer JSON-Datei."""
+    with open(path, encoding="utf-8") as f:
+        return CatalogSnapshot.from_dict(json.load(f))
+
+
+def set_catalog(snapshot: CatalogSnapshot) -> None:
+    """Ersetzt den aktiven Katalog-Snapshot atomar."""
+    global _active_catalog
+    with _catalog_lock:
+        _active_catalog = snapshot
+
+
+def get_catalog() -> CatalogSnapshot:
+    """
+    Gibt den aktiven Katalog-Snapshot zurück.
+
+    Ist die Umgebungsvariable AI_ACT_CATALOG_FILE gesetzt, wird die Datei
+    höchstens einmal pro CATALOG_POLL_INTERVAL auf Änderungen geprüft und bei
+    Bedarf neu geladen. Eine fehlerhafte Datei lässt den bisherigen Snapshot
+    aktiv und wird protokolliert.
+    """
+    path = os.environ.get(CATALOG_FILE_ENV)
+    if path:
+        _reload_catalog_if_changed(path)
+    return _active_catalog
+
+
+def _reload_catalog_if_changed(path: str) -> None:
+    """Lädt die Katalogdatei neu, falls sich Pfad, Änderungszeit oder Größe geändert haben."""
+    global _active_catalog, _catalog_file_state, _catalog_last_poll
+
+    now = time.monotonic()
+    if now - _catalog_last_poll < CATALOG_POLL_INTERVAL:
+        return
+
+    with _catalog_lock:
+        if now - _catalog_last_poll < CATALOG_POLL_INTERVAL:
+            return
+        _catalog_last_poll = now
+
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logger.warning("Katalogdatei %s nicht lesbar: %s", path, e)
+            return
+
+        state = (path, stat.st_mtime_ns, stat.st_size)
+        if state == _catalog_file_state:
+            return
+        # Auch fehlerhafte Stände merken, damit nur einmal pro Änderung gewarnt wird
+        _catalog_file_state = state
+
+        try:
+            snapshot = load_catalog_file(path)
+        except (OSError, ValueError) as e:
+            logger.warning("Katalogdatei %s ungültig, bisheriger Stand bleibt aktiv: %s", path, e)
+            return
+
+        if snapshot.version != _active_catalog.version:
+            logger.info("Regelkataloge aktualisiert: %s -> %s", _active_catalog.version, snapshot.version)
+            _active_catalog = snapshot
+
 
 def classify_ai_system(
-    # Grundlegende Informationen
-    system_name: str,
-    system_description: str,
-    provider: str,
+    # Grundlegende Informationen (oder eine vollständige ClassificationInput)
+    system_name: Union[str, "ClassificationInput"],
+    system_description: str = "",
+    provider: str = "",
 
     # Verbotene Praktiken Checks
     uses_subliminal_manipulation: bool = False,
@@ -305,14 +550,20 @@ def classify_ai_system(
     emotion_recognition_medical_safety: bool = False,
     biometric_categorization_lawful: bool = False,
     # NEU: Medientypen für spezifische Markierungsempfehlungen
-    synthetic_content_types: Optional[list[str]] = None,  # video, image, audio, text
+    synthetic_content_types: Optional[list[str]] = None,  # Schlüssel aus CODE_OF_PRACTICE_MARKING
 
     # NEU: GPAI (General Purpose AI) Parameter
     is_gpai: bool = False,
     gpai_has_systemic_risk: bool = False,
 
     # NEU: Für Fristberechnung
-    reference_date: Optional[date] = None  # Standardmäßig heute
+    reference_date: Optional[date] = None,  # Standardmäßig heute
+
+    # Regelkatalog-Stand (Standard: aktiver Snapshot)
+    catalog: Optional[CatalogSnapshot] = None,
+
+    # Zeitquelle für Zeitstempel und Standard-Referenzdatum (Standard: Systemzeit)
+    clock: Optional[Clock] = None
 ) -> ClassificationResult:
     """
     Klassifiziert ein KI-System nach EU AI Act Risikoklassen.
@@ -325,11 +576,46 @@ def classify_ai_system(
     5. Fallback → MINIMAL
 
     Zusätzlich: GPAI-Pflichten, universelle Pflichten, Fristlogik
+
+    Der Katalog-Snapshot wird zu Beginn einmal festgelegt, sodass ein
+    gleichzeitiges Neuladen der Kataloge diese Klassifizierung nicht beeinflusst.
+
+    Statt der einzelnen Keyword-Argumente kann als erstes Argument eine
+    ClassificationInput übergeben werden; die Fragebogen-Argumente werden dann ignoriert.
     """
 
-    # Referenzdatum für Fristberechnung
+    # Typisierte Eingabe entpacken (Reihenfolge entspricht FLAG_FIELDS)
+    if isinstance(system_name, ClassificationInput):
+        inp = system_name
+        system_name, system_description, provider = inp.system_name, inp.system_description, inp.provider
+        (
+            uses_subliminal_manipulation, exploits_vulnerable_groups, performs_social_scoring,
+            predictive_policing_only_profiling, predictive_policing_with_objective_facts,
+            scrapes_facial_recognition, emotion_recognition_work_education,
+            biometric_categorization_sensitive, realtime_biometric_public,
+            is_safety_component_annex_i, is_product_annex_i, requires_third_party_assessment,
+            performs_profiling, narrow_procedural_task, improves_human_work,
+            detects_patterns_only, preparatory_task_only,
+            interacts_with_humans, generates_synthetic_content, generates_deepfakes,
+            emotion_recognition_medical_safety, biometric_categorization_lawful,
+            is_gpai, gpai_has_systemic_risk,
+        ) = inp.flag_values()
+        realtime_biometric_exception = inp.realtime_biometric_exception
+        annex_i_product_type = inp.annex_i_product_type
+        high_risk_domain = inp.high_risk_domain
+        high_risk_use_case = inp.high_risk_use_case
+        synthetic_content_types = list(inp.content_types) or None
+
+    # Katalog-Snapshot für die gesamte Klassifizierung festhalten
+    if catalog is None:
+        catalog = get_catalog()
+
+    # Zeitstempel und Referenzdatum für Fristberechnung
+    if clock is None:
+        clock = SYSTEM_CLOCK
+    timestamp = clock.now()
     if reference_date is None:
-        reference_date = date.today()
+        reference_date = timestamp.date()
 
     reasons = []
     obligations = []
@@ -348,27 +634,15 @@ def classify_ai_system(
 
     # Konflikt: Emotionserkennung am Arbeitsplatz UND medizinisch/Sicherheit
     if emotion_recognition_work_education and emotion_recognition_medical_safety:
-        warnings.append(
-            "KONFLIKT: Emotionserkennung kann nicht gleichzeitig am Arbeitsplatz/in Bildung "
-            "(verboten) UND für medizinische/Sicherheitszwecke (erlaubt) sein. "
-            "Bitte klären Sie den primären Verwendungszweck."
-        )
+        warnings.append(CONFLICT_WARNINGS["emotion_recognition"])
 
     # Konflikt: Biometrische Kategorisierung sensibel UND rechtmäßig
     if biometric_categorization_sensitive and biometric_categorization_lawful:
-        warnings.append(
-            "KONFLIKT: Biometrische Kategorisierung kann nicht gleichzeitig nach sensiblen "
-            "Merkmalen (verboten) UND rechtmäßig (erlaubt) sein. "
-            "Bitte prüfen Sie welche Kategorien tatsächlich erfasst werden."
-        )
+        warnings.append(CONFLICT_WARNINGS["biometric_categorization"])
 
     # Konflikt: Predictive Policing nur Profiling UND mit objektiven Fakten
     if predictive_policing_only_profiling and predictive_policing_with_objective_facts:
-        warnings.append(
-            "KONFLIKT: Predictive Policing kann nicht gleichzeitig NUR auf Profiling "
-            "basieren UND objektive Fakten nutzen. "
-            "Bitte klären Sie die tatsächliche Datenbasis."
-        )
+        warnings.append(CONFLICT_WARNINGS["predictive_policing"])
 
     # ============================================================
     # UNIVERSELLE PFLICHTEN (gelten für alle Systeme)
@@ -410,9 +684,9 @@ def classify_ai_system(
     # Echtzeit-Biometrie: Prüfung mit Ausnahmen
     realtime_biometric_prohibited = False
     if realtime_biometric_public:
-        if realtime_biometric_exception and realtime_biometric_exception in REALTIME_BIOMETRIC_EXCEPTIONS:
+        if realtime_biometric_exception and realtime_biometric_exception in catalog.realtime_biometric_exceptions:
             # Ausnahme greift - System ist HIGH RISK, nicht VERBOTEN
-            exception = REALTIME_BIOMETRIC_EXCEPTIONS[realtime_biometric_exception]
+            exception = catalog.realtime_biometric_exceptions[realtime_biometric_exception]
             reasons.append(
                 f"Echtzeit-Biometrie mit Ausnahme: {exception['name']} - {exception['description']}"
             )
@@ -456,7 +730,9 @@ def classify_ai_system(
             gpai_has_systemic_risk=gpai_has_systemic_risk,
             universal_obligations=universal_obligations,
             applicable_deadlines=applicable_deadlines,
-            warnings=warnings
+            warnings=warnings,
+            catalog_version=catalog.version,
+            timestamp=timestamp
         )
 
     # ============================================================
@@ -479,7 +755,7 @@ def classify_ai_system(
         transparency_obligations = _collect_transparency_obligations(
             interacts_with_humans, generates_deepfakes, generates_synthetic_content,
             emotion_recognition_medical_safety, biometric_categorization_lawful,
-            synthetic_content_types
+            synthetic_content_types, catalog.code_of_practice_marking
         )
 
         obligations = _get_high_risk_obligations()
@@ -502,7 +778,9 @@ def classify_ai_system(
             transparency_obligations=transparency_obligations,
             universal_obligations=universal_obligations,
             applicable_deadlines=applicable_deadlines,
-            warnings=warnings
+            warnings=warnings,
+            catalog_version=catalog.version,
+            timestamp=timestamp
         )
 
     # ============================================================
@@ -515,7 +793,7 @@ def classify_ai_system(
     realtime_biometric_high_risk = (
         realtime_biometric_public and
         realtime_biometric_exception and
-        realtime_biometric_exception in REALTIME_BIOMETRIC_EXCEPTIONS
+        realtime_biometric_exception in catalog.realtime_biometric_exceptions
     )
 
     # Sonderfall: Predictive Policing MIT objektiven Fakten ist HIGH RISK (nicht verboten)
@@ -527,8 +805,8 @@ def classify_ai_system(
     # Prüfung auf Anhang III Hochrisiko-Bereich
     is_high_risk_pathway_b = False
 
-    if high_risk_domain and high_risk_domain in HIGH_RISK_DOMAINS:
-        domain = HIGH_RISK_DOMAINS[high_risk_domain]
+    if high_risk_domain and high_risk_domain in catalog.high_risk_domains:
+        domain = catalog.high_risk_domains[high_risk_domain]
         applicable_deadlines["hochrisiko_anhang_iii"] = AI_ACT_DEADLINES["high_risk_annex_iii"]
 
         # Prüfung der Ausnahmen (gelten NICHT wenn Profiling durchgeführt wird)
@@ -581,7 +859,7 @@ def classify_ai_system(
         transparency_obligations = _collect_transparency_obligations(
             interacts_with_humans, generates_deepfakes, generates_synthetic_content,
             emotion_recognition_medical_safety, biometric_categorization_lawful,
-            synthetic_content_types
+            synthetic_content_types, catalog.code_of_practice_marking
         )
 
         obligations = _get_high_risk_obligations()
@@ -605,7 +883,9 @@ def classify_ai_system(
             universal_obligations=universal_obligations,
             applicable_deadlines=applicable_deadlines,
             exception_documentation_required=False,
-            warnings=warnings
+            warnings=warnings,
+            catalog_version=catalog.version,
+            timestamp=timestamp
         )
 
     # ============================================================
@@ -662,9 +942,9 @@ def classify_ai_system(
         # Spezifische Markierungsempfehlungen pro Medientyp
         if synthetic_content_types:
             for content_type in synthetic_content_types:
-                if content_type in CODE_OF_PRACTICE_MARKING:
+                if content_type in catalog.code_of_practice_marking:
                     recommendations.append(f"--- Empfehlungen für {content_type.upper()}: ---")
-                    recommendations.extend(CODE_OF_PRACTICE_MARKING[content_type])
+                    recommendations.extend(catalog.code_of_practice_marking[content_type])
 
         # GPAI-Pflichten hinzufügen falls zutreffend
         if is_gpai:
@@ -683,7 +963,9 @@ def classify_ai_system(
             universal_obligations=universal_obligations,
             applicable_deadlines=applicable_deadlines,
             exception_documentation_required=exception_documentation_required,
-            warnings=warnings
+            warnings=warnings,
+            catalog_version=catalog.version,
+            timestamp=timestamp
         )
 
     # ============================================================
@@ -725,10 +1007,215 @@ def classify_ai_system(
         universal_obligations=universal_obligations,
         applicable_deadlines=applicable_deadlines,
         exception_documentation_required=exception_documentation_required,
-        warnings=warnings
+        warnings=warnings,
+        catalog_version=catalog.version,
+        timestamp=timestamp
     )
 
 
+def decision_fingerprint(inputs: dict) -> str:
+    """
+    Berechnet einen stabilen Fingerabdruck der entscheidungsrelevanten Eingaben.
+
+    Name, Beschreibung und Anbieter des Systems sowie Stichtag, Uhr und
+    Katalog fließen nicht ein; nicht angegebene Eingaben werden mit ihren
+    Standardwerten belegt. Identische Fragebogen-Antworten ergeben damit
+    denselben Fingerabdruck (entspricht ClassificationInput.fingerprint).
+    """
+    kwargs = {name: value for name, value in inputs.items() if name not in ("reference_date", "catalog", "clock")}
+    return ClassificationInput.from_kwargs(catalog=inputs.get("catalog"), **kwargs).fingerprint()
+
+
+def deadline_epoch(reference_date: date) -> int:
+    """
+    Gibt die Anzahl der zum Stichtag bereits erreichten Fristen zurück.
+
+    Die Einstufung hängt nur über Vergleiche mit AI_ACT_DEADLINES vom Datum ab;
+    zwei Stichtage in derselben Epoche liefern daher dasselbe Ergebnis.
+    """
+    return sum(1 for deadline in AI_ACT_DEADLINES.values() if reference_date >= deadline)
+
+
+# ============================================================
+# Typisierte Eingabe für Batch-Verarbeitung und Caching
+# ============================================================
+
+# Medientypen früherer pack()-Stände als Bitmaske; Position = Bit (nur zum Lesen alter Eingaben)
+_LEGACY_CONTENT_TYPE_BITS = ("video", "image", "audio", "text")
+
+# Boolesche Eingaben von classify_ai_system; Position = Bit in ClassificationInput.flags.
+# Die Reihenfolge ist Teil des gespeicherten Formats (pack) und darf nur am Ende erweitert werden.
+FLAG_FIELDS = (
+    "uses_subliminal_manipulation",
+    "exploits_vulnerable_groups",
+    "performs_social_scoring",
+    "predictive_policing_only_profiling",
+    "predictive_policing_with_objective_facts",
+    "scrapes_facial_recognition",
+    "emotion_recognition_work_education",
+    "biometric_categorization_sensitive",
+    "realtime_biometric_public",
+    "is_safety_component_annex_i",
+    "is_product_annex_i",
+    "requires_third_party_assessment",
+    "performs_profiling",
+    "narrow_procedural_task",
+    "improves_human_work",
+    "detects_patterns_only",
+    "preparatory_task_only",
+    "interacts_with_humans",
+    "generates_synthetic_content",
+    "generates_deepfakes",
+    "emotion_recognition_medical_safety",
+    "biometric_categorization_lawful",
+    "is_gpai",
+    "gpai_has_systemic_risk",
+)
+
+FLAG_BITS = {name: 1 << i for i, name in enumerate(FLAG_FIELDS)}
+
+
+@dataclass(frozen=True, slots=True)
+class ClassificationInput:
+    """
+    Kompakte, unveränderliche Eingabe für classify_ai_system.
+
+    Alle booleschen Fragen sind in `flags` als Bitmaske zusammengefasst (siehe
+    FLAG_FIELDS). Bereich, Ausnahme und Medientypen sind Schlüssel des
+    Regelkatalogs (HIGH_RISK_DOMAINS, REALTIME_BIOMETRIC_EXCEPTIONS bzw.
+    CODE_OF_PRACTICE_MARKING) und werden beim Erstellen gegen den
+    Katalog-Snapshot geprüft, damit per Katalogdatei ergänzte Schlüssel nutzbar sind.
+    `decision_key()` und `fingerprint()` umfassen nur die entscheidungsrelevanten
+    Felder und eignen sich zum Gruppieren, Deduplizieren und Cachen.
+    Medientypen werden ohne Duplikate in der Reihenfolge des Katalogs abgelegt.
+    """
+    system_name: str
+    system_description: str = ""
+    provider: str = ""
+    flags: int = 0
+    high_risk_domain: Optional[str] = None
+    high_risk_use_case: Optional[str] = None
+    realtime_biometric_exception: Optional[str] = None
+    annex_i_product_type: Optional[str] = None
+    content_types: tuple[str, ...] = ()
+
+    @classmethod
+    def from_kwargs(cls, catalog: Optional[CatalogSnapshot] = None, **kwargs) -> "ClassificationInput":
+        """
+        Erstellt die Eingabe aus den Keyword-Argumenten von classify_ai_system.
+        Unbekannte Argumente, Medientypen sowie Bereiche oder Ausnahmen, die
+        nicht im Katalog-Snapshot (Standard: aktiver Snapshot) stehen, führen zu einem ValueError.
+        """
+        if catalog is None:
+            catalog = get_catalog()
+        flags = 0
+        for name, bit in FLAG_BITS.items():
+            if kwargs.pop(name, False):
+                flags |= bit
+
+        domain = kwargs.pop("high_risk_domain", None)
+        exception = kwargs.pop("realtime_biometric_exception", None)
+        content_types = kwargs.pop("synthetic_content_types", None)
+        if domain and domain not in catalog.high_risk_domains:
+            raise ValueError(f"Unbekannter Hochrisiko-Bereich: {domain!r}")
+        if exception and exception not in catalog.realtime_biometric_exceptions:
+            raise ValueError(f"Unbekannte Biometrie-Ausnahme: {exception!r}")
+        requested = set(content_types or ())
+        for content_type in requested:
+            if content_type not in catalog.code_of_practice_marking:
+                raise ValueError(f"Unbekannter Medientyp: {content_type!r}")
+
+        inp = cls(
+            system_name=kwargs.pop("system_name", ""),
+            system_description=kwargs.pop("system_description", ""),
+            provider=kwargs.pop("provider", ""),
+            flags=flags,
+            high_risk_domain=domain or None,
+            high_risk_use_case=kwargs.pop("high_risk_use_case", None) or None,
+            realtime_biometric_exception=exception or None,
+            annex_i_product_type=kwargs.pop("annex_i_product_type", None) or None,
+            content_types=tuple(name for name in catalog.code_of_practice_marking if name in requested),
+        )
+        if kwargs:
+            raise ValueError(f"Unbekannte Eingaben: {', '.join(sorted(kwargs))}")
+        return inp
+
+    def has(self, flag: str) -> bool:
+        """Prüft, ob eine boolesche Frage (Name aus FLAG_FIELDS) bejaht ist."""
+        return bool(self.flags & FLAG_BITS[flag])
+
+    def flag_values(self) -> tuple[bool, ...]:
+        """Gibt alle booleschen Fragen in der Reihenfolge von FLAG_FIELDS zurück."""
+        flags = self.flags
+        return tuple(bool(flags & (1 << i)) for i in range(len(FLAG_FIELDS)))
+
+    def decision_key(self) -> tuple:
+        """Hashbarer Schlüssel aller entscheidungsrelevanten Felder (ohne Name, Beschreibung, Anbieter)."""
+        return (
+            self.flags,
+            self.high_risk_domain or "",
+            self.high_risk_use_case or "",
+            self.realtime_biometric_exception or "",
+            self.annex_i_product_type or "",
+            self.content_types,
+        )
+
+    def fingerprint(self) -> str:
+        """Prozessübergreifend stabiler Hash des decision_key (SHA-256, hex)."""
+        canonical = json.dumps(self.decision_key(), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def with_identity(self, system_name: str, system_description: str = "", provider: str = "") -> "ClassificationInput":
+        """Gibt eine Kopie mit anderem Namen, Beschreibung und Anbieter zurück."""
+        return replace(self, system_name=system_name, system_description=system_description, provider=provider)
+
+    def pack(self) -> tuple:
+        """Serialisiert die Eingabe als flaches, JSON-taugliches Tupel."""
+        return (self.system_name, self.system_description, self.provider) + self.decision_key()
+
+    @classmethod
+    def unpack(cls, packed: Iterable) -> "ClassificationInput":
+        """
+        Gegenstück zu pack() (ohne Katalogprüfung, gespeicherte Eingaben bleiben lesbar).
+        Medientypen älterer Stände liegen als Bitmaske vor und werden über
+        _LEGACY_CONTENT_TYPE_BITS in Namen übersetzt.
+        """
+        name, description, provider, flags, domain, use_case, exception, annex_i, content_types = packed
+        return cls(
+            system_name=name,
+            system_description=description,
+            provider=provider,
+            flags=flags,
+            high_risk_domain=domain or None,
+            high_risk_use_case=use_case or None,
+            realtime_biometric_exception=exception or None,
+            annex_i_product_type=annex_i or None,
+            content_types=_unpack_content_types(content_types),
+        )
+
+    def to_kwargs(self) -> dict:
+        """Gibt die Eingabe als Keyword-Argumente für classify_ai_system zurück."""
+        kwargs = dict(zip(FLAG_FIELDS, self.flag_values()))
+        kwargs.update(
+            system_name=self.system_name,
+            system_description=self.system_description,
+            provider=self.provider,
+            high_risk_domain=self.high_risk_domain,
+            high_risk_use_case=self.high_risk_use_case,
+            realtime_biometric_exception=self.realtime_biometric_exception,
+            annex_i_product_type=self.annex_i_product_type,
+            synthetic_content_types=list(self.content_types) or None,
+        )
+        return kwargs
+
+
+def _unpack_content_types(packed) -> tuple[str, ...]:
+    """Medientypen aus pack(): Namensliste oder (ältere Stände) Bitmaske."""
+    if isinstance(packed, int):
+        return tuple(name for bit, name in enumerate(_LEGACY_CONTENT_TYPE_BITS) if packed & (1 << bit))
+    return tuple(packed)
+
+
 def _get_gpai_obligations(has_systemic_risk: bool = False) -> list[str]:
     """Gibt die Pflichten für GPAI-Modelle zurück."""
     obligations = GPAI_OBLIGATIONS["basic"].copy()
@@ -743,9 +1230,13 @@ def _collect_transparency_obligations(
     generates_synthetic_content: bool,
     emotion_recognition_medical_safety: bool,
     biometric_categorization_lawful: bool,
-    synthetic_content_types: Optional[list[str]] = None
+    synthetic_content_types: Optional[list[str]] = None,
+    code_of_practice_marking: Optional[dict] = None
 ) -> list[str]:
     """Sammelt alle zutreffenden Transparenzpflichten (auch für HIGH Risk Systeme)."""
+    if code_of_practice_marking is None:
+        code_of_practice_marking = CODE_OF_PRACTICE_MARKING
+
     obligations = []
 
     if interacts_with_humans:
@@ -760,8 +1251,8 @@ def _collect_transparency_obligations(
         # Spezifische Markierungsempfehlungen pro Medientyp
         if synthetic_content_types:
             for content_type in synthetic_content_types:
-                if content_type in CODE_OF_PRACTICE_MARKING:
-                    for method in CODE_OF_PRACTICE_MARKING[content_type]:
+                if content_type in code_of_practice_marking:
+                    for method in code_of_practice_marking[content_type]:
                         obligations.append(f"  [{content_type.upper()}] {method}")
 
     if emotion_recognition_medical_safety:
@@ -0,0 +1,241 @@
+"""
+Konsistenzprüfung ganzer Inventare
+Prüft die Fragebogen-Antworten eines Inventars auf Widersprüche und
+unvollständige Angaben, ohne die Klassifizierung auszuführen.
+
+Jeder Eintrag wird auf eine einzige Ganzzahl abgebildet: die Flag-Bitmaske
+von ClassificationInput, ergänzt um je ein Bit für angegebene Bereiche,
+Anwendungsfälle, Ausnahmen, Produktkategorien und Medientypen. Alle Regeln
+sind Bitmasken-Tests. Die Schlüssel werden spaltenweise in einem array
+gesammelt und gezählt; die Regeln laufen danach nur über die (wenigen)
+unterschiedlichen Kombinationen statt über jede Zeile.
+"""
+
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Union
+
+from classifier_logic import CONFLICT_WARNINGS, FLAG_BITS, FLAG_FIELDS, ClassificationInput
+
+
+SEVERITY_CONFLICT = "Konflikt"      # Angaben schließen sich gegenseitig aus
+SEVERITY_HINT = "Hinweis"           # Angaben sind wirkungslos oder unvollständig
+
+# Felder, deren Angabe (ja/nein) über Zusatzbits oberhalb der Flags erfasst wird
+PRESENCE_FIELDS = (
+    "high_risk_domain",
+    "high_risk_use_case",
+    "realtime_biometric_exception",
+    "annex_i_product_type",
+    "synthetic_content_types",
+)
+
+LINT_BITS = {
+    **FLAG_BITS,
+    **{name: 1 << (len(FLAG_FIELDS) + i) for i, name in enumerate(PRESENCE_FIELDS)},
+}
+
+# Anzahl der je Regel aufbewahrten Beispielzeilen
+MAX_EXAMPLES = 10
+
+_EXCEPTION_FLAGS = ("narrow_procedural_task", "improves_human_work", "detects_patterns_only", "preparatory_task_only")
+
+
+@dataclass(frozen=True)
+class LintRule:
+    """Regel: greift, wenn alle `all_of`, mindestens eines der `any_of` und keines der `none_of` gesetzt sind."""
+    key: str
+    severity: str
+    message: str
+    all_of: tuple[str, ...] = ()
+    any_of: tuple[str, ...] = ()
+    none_of: tuple[str, ...] = ()
+
+    def masks(self) -> tuple[int, int, int]:
+        return _mask(self.all_of), _mask(self.any_of), _mask(self.none_of)
+
+
+LINT_RULES = (
+    # Schritt 0 von classify_ai_system
+    LintRule(
+        "emotion_recognition", SEVERITY_CONFLICT, CONFLICT_WARNINGS["emotion_recognition"],
+        all_of=("emotion_recognition_work_education", "emotion_recognition_medical_safety"),
+    ),
+    LintRule(
+        "biometric_categorization", SEVERITY_CONFLICT, CONFLICT_WARNINGS["biometric_categorization"],
+        all_of=("biometric_categorization_sensitive", "biometric_categorization_lawful"),
+    ),
+    LintRule(
+        "predictive_policing", SEVERITY_CONFLICT, CONFLICT_WARNINGS["predictive_policing"],
+        all_of=("predictive_policing_only_profiling", "predictive_policing_with_objective_facts"),
+    ),
+    # Weitere Konsistenzprüfungen
+    LintRule(
+        "exceptions_with_profiling", SEVERITY_CONFLICT,
+        "Ausnahmen nach Art. 6(3) sind angegeben, das System führt aber Profiling natürlicher "
+        "Personen durch - die Ausnahmen sind dann nicht anwendbar.",
+        all_of=("performs_profiling",), any_of=_EXCEPTION_FLAGS,
+    ),
+    LintRule(
+        "annex_i_without_assessment", SEVERITY_HINT,
+        "Anhang-I-Produkt bzw. Sicherheitskomponente ohne Konformitätsbewertung durch Dritte - "
+        "Hochrisiko Pathway A greift nicht. Bitte Bewertungsverfahren prüfen.",
+        any_of=("is_safety_component_annex_i", "is_product_annex_i"),
+        none_of=("requires_third_party_assessment",),
+    ),
+    LintRule(
+        "assessment_without_annex_i", SEVERITY_HINT,
+        "Konformitätsbewertung durch Dritte angegeben, aber weder Anhang-I-Produkt noch "
+        "Sicherheitskomponente.",
+        all_of=("requires_third_party_assessment",),
+        none_of=("is_safety_component_annex_i", "is_product_annex_i"),
+    ),
+    LintRule(
+        "product_type_without_annex_i", SEVERITY_HINT,
+        "Produktkategorie nach Anhang I angegeben, aber weder Anhang-I-Produkt noch Sicherheitskomponente.",
+        all_of=("annex_i_product_type",),
+        none_of=("is_safety_component_annex_i", "is_product_annex_i"),
+    ),
+    LintRule(
+        "exception_without_realtime_biometrics", SEVERITY_HINT,
+        "Ausnahme nach Art. 5(2) angegeben, aber keine Echtzeit-Biometrie im öffentlichen Raum.",
+        all_of=("realtime_biometric_exception",), none_of=("realtime_biometric_public",),
+    ),
+    LintRule(
+        "use_case_without_domain", SEVERITY_HINT,
+        "Anwendungsfall nach Anhang III angegeben, aber kein Hochrisiko-Bereich.",
+        all_of=("high_risk_use_case",), none_of=("high_risk_domain",),
+    ),
+    LintRule(
+        "exceptions_without_domain", SEVERITY_HINT,
+        "Ausnahmen nach Art. 6(3) angegeben, aber kein Hochrisiko-Bereich - die Angaben sind wirkungslos.",
+        any_of=_EXCEPTION_FLAGS, none_of=("high_risk_domain",),
+    ),
+    LintRule(
+        "content_types_without_generation", SEVERITY_HINT,
+        "Medientypen angegeben, aber weder synthetische Inhalte noch Deepfakes.",
+        all_of=("synthetic_content_types",), none_of=("generates_synthetic_content", "generates_deepfakes"),
+    ),
+    LintRule(
+        "systemic_risk_without_gpai", SEVERITY_CONFLICT,
+        "Systemisches Risiko angegeben, das System ist aber nicht als GPAI-Modell markiert.",
+        all_of=("gpai_has_systemic_risk",), none_of=("is_gpai",),
+    ),
+)
+
+
+@dataclass
+class LintFinding:
+    """Treffer einer Regel über das gesamte Inventar."""
+    rule: LintRule
+    count: int
+    examples: list[int] = field(default_factory=list)   # Positionen im Inventar
+
+
+@dataclass
+class LintReport:
+    """Zusammenfassung der Konsistenzprüfung."""
+    total: int = 0
+    affected: int = 0            # Einträge mit mindestens einem Treffer
+    combinations: int = 0        # unterschiedliche Antwortkombinationen
+    findings: list[LintFinding] = field(default_factory=list)
+
+    @property
+    def conflicts(self) -> int:
+        return sum(f.count for f in self.findings if f.rule.severity == SEVERITY_CONFLICT)
+
+    @property
+    def hints(self) -> int:
+        return sum(f.count for f in self.findings if f.rule.severity == SEVERITY_HINT)
+
+
+def lint_key(record: Union[ClassificationInput, dict]) -> int:
+    """Bildet einen Eintrag (ClassificationInput oder Keyword-Argumente) auf seinen Prüfschlüssel ab."""
+    if isinstance(record, ClassificationInput):
+        key = record.flags
+        if record.high_risk_domain:
+            key |= LINT_BITS["high_risk_domain"]
+        if record.high_risk_use_case:
+            key |= LINT_BITS["high_risk_use_case"]
+        if record.realtime_biometric_exception:
+            key |= LINT_BITS["realtime_biometric_exception"]
+        if record.annex_i_product_type:
+            key |= LINT_BITS["annex_i_product_type"]
+        if record.content_types:
+            key |= LINT_BITS["synthetic_content_types"]
+        return key
+
+    key = 0
+    for name, value in record.items():
+        if value:
+            key |= LINT_BITS.get(name, 0)
+    return key
+
+
+def lint_record(record: Union[ClassificationInput, dict], rules: Iterable[LintRule] = LINT_RULES) -> list[LintRule]:
+    """Regeln, die für einen einzelnen Eintrag greifen."""
+    key = lint_key(record)
+    return [rule for rule in rules if _matches(key, *rule.masks())]
+
+
+def lint_inventory(
+    records: Iterable[Union[ClassificationInput, dict]],
+    rules: Iterable[LintRule] = LINT_RULES,
+    max_examples: int = MAX_EXAMPLES
+) -> LintReport:
+    """Prüft ein ganzes Inventar und fasst die Treffer je Regel zusammen."""
+    return lint_keys(array("q", map(lint_key, records)), rules, max_examples)
+
+
+def lint_keys(
+    keys: array,
+    rules: Iterable[LintRule] = LINT_RULES,
+    max_examples: int = MAX_EXAMPLES
+) -> LintReport:
+    """Wie lint_inventory, aber für bereits berechnete Prüfschlüssel (eine Spalte je Eintrag)."""
+    counts = Counter(keys)
+    compiled = [(rule, rule.masks()) for rule in rules]
+    report = LintReport(total=len(keys), combinations=len(counts))
+
+    # Regeln nur je unterschiedlicher Kombination auswerten
+    hits: dict[int, list[int]] = {}
+    rule_counts = [0] * len(compiled)
+    for key, count in counts.items():
+        matched = [i for i, (_, masks) in enumerate(compiled) if _matches(key, *masks)]
+        if matched:
+            hits[key] = matched
+            report.affected += count
+            for i in matched:
+                rule_counts[i] += count
+
+    findings = {i: LintFinding(rule, rule_counts[i]) for i, (rule, _) in enumerate(compiled) if rule_counts[i]}
+    if findings:
+        # Beispielzeilen: nur bis jede Regel genug Beispiele hat
+        pending = set(findings)
+        for position, key in enumerate(keys):
+            matched = hits.get(key)
+            if matched is None:
+                continue
+            for i in matched:
+                examples = findings[i].examples
+                if len(examples) < max_examples:
+                    examples.append(position)
+                    if len(examples) == max_examples:
+                        pending.discard(i)
+            if not pending:
+                break
+
+    report.findings = sorted(findings.values(), key=lambda f: (f.rule.severity != SEVERITY_CONFLICT, -f.count))
+    return report
+
+
+def _mask(names: tuple[str, ...]) -> int:
+    mask = 0
+    for name in names:
+        mask |= LINT_BITS[name]
+    return mask
+
+
+def _matches(key: int, all_of: int, any_of: int, none_of: int) -> bool:
+    return key & all_of == all_of and (not any_of or key & any_of) and not key & none_of
@@ -1,15 +1,32 @@
 """
 Export-Utilities für EU AI Act Klassifizierungen
 Unterstützt Markdown, Excel und CSV Export
+
+Der CSV-Export kommt ohne pandas aus. pandas und openpyxl werden erst beim
+ersten Excel-Export importiert, damit der Start der Anwendung nicht von diesen
+Abhängigkeiten ausgebremst wird.
 """
 
+import csv
 import io
+import re
+import zipfile
 from datetime import datetime
-from typing import Optional
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Sequence, TextIO, Union
+from xml.sax.saxutils import escape
+
+from classifier_logic import (
+    ClassificationResult, RiskLevel, PROHIBITED_PRACTICES, DEADLINE_NAMES, CatalogSnapshot, Clock, SYSTEM_CLOCK, get_catalog
+)
 
-import pandas as pd
 
-from classifier_logic import ClassificationResult, RiskLevel, HIGH_RISK_DOMAINS, PROHIBITED_PRACTICES
+# Formate des Klassifizierungszeitpunkts (Bericht bzw. Zusammenfassung/CSV/Excel)
+REPORT_TIME_FORMAT = '%d.%m.%Y um %H:%M:%S Uhr'
+SUMMARY_TIME_FORMAT = '%d.%m.%Y %H:%M:%S'
+
+# Zeitpunkte in den Dokumenteigenschaften einer xlsx-Datei
+_XLSX_PROPERTY_RE = re.compile(rb"(<dcterms:(created|modified)[^>]*>)[^<]*(</dcterms:\2>)")
 
 
 def generate_markdown_report(
@@ -17,11 +34,15 @@ def generate_markdown_report(
     system_name: str,
     system_description: str,
     provider: str,
-    additional_info: Optional[dict] = None
+    additional_info: Optional[dict] = None,
+    clock: Optional[Clock] = None
 ) -> str:
     """
     Generiert einen vollständigen Markdown-Bericht für eine KI-System-Klassifizierung.
+    Der Fristenstatus bezieht sich auf `clock` (Standard: Zeitpunkt der Klassifizierung).
     """
+    if clock is None:
+        clock = Clock(result.timestamp)
 
     risk_emoji = {
         RiskLevel.UNACCEPTABLE: "🚫",
@@ -35,7 +56,7 @@ def generate_markdown_report(
     # Header
     md.append(f"# EU AI Act Klassifizierungsbericht")
     md.append("")
-    md.append(f"**Erstellt am:** {result.timestamp.strftime('%d.%m.%Y um %H:%M:%S Uhr')}")
+    md.append(f"**Erstellt am:** {result.timestamp.strftime(REPORT_TIME_FORMAT)}")
     md.append("")
     md.append("---")
     md.append("")
@@ -172,18 +193,9 @@ def generate_markdown_report(
         md.append("")
         md.append("| Frist | Datum | Status |")
         md.append("|-------|-------|--------|")
-        from datetime import date
-        today = date.today()
-        deadline_names = {
-            "verbotene_praktiken": "Verbotene Praktiken (Art. 5)",
-            "ki_kompetenz": "KI-Kompetenz (Art. 4)",
-            "gpai": "GPAI-Modell-Pflichten",
-            "transparenzpflichten": "Transparenzpflichten (Art. 50)",
-            "hochrisiko_anhang_iii": "Hochrisiko-Systeme (Anhang III)",
-            "hochrisiko_anhang_i": "Hochrisiko-Produkte (Anhang I)"
-        }
+        today = clock.today()
         for key, deadline in result.applicable_deadlines.items():
-            name = deadline_names.get(key, key)
+            name = DEADLINE_NAMES.get(key, key)
             status = "✅ In Kraft" if today >= deadline else "⏳ Noch nicht in Kraft"
             md.append(f"| {name} | {deadline.strftime('%d.%m.%Y')} | {status} |")
         md.append("")
@@ -220,12 +232,16 @@ def generate_markdown_report(
 def generate_technical_documentation_template(
     system_name: str,
     provider: str,
-    result: ClassificationResult
+    result: ClassificationResult,
+    clock: Optional[Clock] = None
 ) -> str:
     """
     Generiert eine Vorlage für die technische Dokumentation nach Anhang IV.
-    Nur relevant für Hochrisiko-Systeme.
+    Nur relevant für Hochrisiko-Systeme. Das Erstellungsdatum stammt aus
+    `clock` (Standard: Zeitpunkt der Klassifizierung).
     """
+    if clock is None:
+        clock = Clock(result.timestamp)
 
     if result.risk_level != RiskLevel.HIGH:
         return "Technische Dokumentation nach Anhang IV ist nur für Hochrisiko-Systeme erforderlich."
@@ -237,7 +253,7 @@ def generate_technical_documentation_template(
     md.append(f"## Anbieter: {provider}")
     md.append("")
     md.append(f"**Dokumentversion:** 1.0")
-    md.append(f"**Erstellt am:** {datetime.now().strftime('%d.%m.%Y')}")
+    md.append(f"**Erstellt am:** {clock.today().strftime('%d.%m.%Y')}")
     md.append("")
     md.append("---")
     md.append("")
@@ -380,18 +396,129 @@ def generate_technical_documentation_template(
     return "\n".join(md)
 
 
-def export_to_csv(classifications: list[dict]) -> str:
+# Spaltenreihenfolge der Zusammenfassung (siehe create_classification_summary)
+SUMMARY_COLUMNS = (
+    "Systemname",
+    "Risikostufe",
+    "Begründungen",
+    "Pflichten",
+    "Empfehlungen",
+    "Anwendbare_Artikel",
+    "Klassifizierungsdatum",
+    "GPAI",
+    "GPAI_Systemisches_Risiko",
+    "GPAI_Pflichten",
+    "Transparenzpflichten",
+    "Universelle_Pflichten",
+    "Dokumentationspflicht_Ausnahme",
+    "Warnungen",
+)
+
+
+def csv_columns(keys: Iterable[str]) -> list[str]:
     """
-    Exportiert Klassifizierungen als CSV-String.
+    Bestimmt die CSV-Spalten: zuerst die Spalten der Zusammenfassung in fester
+    Reihenfolge, danach alle weiteren Schlüssel (z.B. Anbieter) in ihrer Reihenfolge.
     """
-    df = pd.DataFrame(classifications)
-    return df.to_csv(index=False)
+    keys = list(dict.fromkeys(keys))
+    columns = [col for col in SUMMARY_COLUMNS if col in keys]
+    columns.extend(col for col in keys if col not in SUMMARY_COLUMNS)
+    return columns
+
+
+def iter_csv_lines(
+    classifications: Iterable[dict],
+    columns: Optional[Sequence[str]] = None
+) -> Iterator[str]:
+    """
+    Erzeugt den CSV-Export Zeile für Zeile (inkl. Kopfzeile), ohne pandas.
+
+    Ohne explizite Spalten werden alle SUMMARY_COLUMNS plus die zusätzlichen
+    Schlüssel der ersten Zeile verwendet; da die Kopfzeile vor den übrigen
+    Zeilen geschrieben wird, löst ein später erstmals auftretender Schlüssel
+    einen ValueError aus (Aufrufer mit uneinheitlichen Zeilen übergeben die
+    Spalten, z.B. ClassificationRegister.columns). Bei expliziten Spalten
+    werden Schlüssel außerhalb der Spalten ignoriert. Fehlende Werte bleiben leer.
+    """
+    rows = iter(classifications)
+    known = None
+    if columns is None:
+        first_row = next(rows, None)
+        if first_row is None:
+            return
+        columns = csv_columns(chain(SUMMARY_COLUMNS, first_row))
+        known = frozenset(columns)
+        rows = _prepend(first_row, rows)
+
+    line = _LineCapture()
+    writer = csv.writer(line, lineterminator="\n")
+
+    writer.writerow(columns)
+    yield line.value
+
+    for row in rows:
+        if known is not None and not known.issuperset(row):
+            unknown = ", ".join(key for key in row if key not in known)
+            raise ValueError(f"Spalten fehlen in der Kopfzeile: {unknown} (Spalten bitte explizit übergeben)")
+        writer.writerow([row.get(col, "") for col in columns])
+        yield line.value
+
+
+def write_csv(
+    classifications: Iterable[dict],
+    file: TextIO,
+    columns: Optional[Sequence[str]] = None
+) -> int:
+    """
+    Schreibt Klassifizierungen zeilenweise als CSV in eine Datei.
+    Gibt die Anzahl der geschriebenen Datenzeilen zurück.
+    """
+    count = -1  # Kopfzeile nicht mitzählen
+    for line in iter_csv_lines(classifications, columns):
+        file.write(line)
+        count += 1
+    return max(count, 0)
 
 
-def export_to_excel(classifications: list[dict]) -> io.BytesIO:
+def export_to_csv(classifications: Iterable[dict], columns: Optional[Sequence[str]] = None) -> str:
+    """
+    Exportiert Klassifizierungen als CSV-String (Spalten siehe iter_csv_lines).
+    """
+    return "".join(iter_csv_lines(classifications, columns))
+
+
+class _LineCapture:
+    """Minimales Datei-Objekt, das die zuletzt vom csv-Writer geschriebene Zeile festhält."""
+    __slots__ = ("value",)
+
+    def write(self, line: str) -> None:
+        self.value = line
+
+
+def _prepend(first: dict, rest: Iterator[dict]) -> Iterator[dict]:
+    """Stellt ein bereits gelesenes Element wieder vor einen Iterator."""
+    yield first
+    yield from rest
+
+
+def export_to_excel(
+    classifications: list[dict],
+    catalog: Optional[CatalogSnapshot] = None,
+    clock: Optional[Clock] = None
+) -> io.BytesIO:
     """
     Exportiert Klassifizierungen als Excel-Datei (BytesIO).
+    Die Referenz-Sheets werden aus dem übergebenen (bzw. aktiven) Katalog-Snapshot erzeugt.
+    Erstellungs- und Änderungszeitpunkt der Datei stammen aus `clock` (Standard:
+    Systemzeit); mit fester Uhr sind gleiche Exporte byte-identisch.
     """
+    import pandas as pd  # zieht openpyxl erst über pd.ExcelWriter nach
+
+    if catalog is None:
+        catalog = get_catalog()
+    if clock is None:
+        clock = SYSTEM_CLOCK
+
     df = pd.DataFrame(classifications)
 
     output = io.BytesIO()
@@ -421,7 +548,7 @@ def export_to_excel(classifications: list[dict]) -> io.BytesIO:
 
         # Hochrisiko-Bereiche
         high_risk_data = []
-        for domain_key, domain in HIGH_RISK_DOMAINS.items():
+        for domain_key, domain in catalog.high_risk_domains.items():
             for use_case in domain["use_cases"]:
                 high_risk_data.append({
                     "Bereich": domain["name"],
@@ -431,8 +558,43 @@ def export_to_excel(classifications: list[dict]) -> io.BytesIO:
         high_risk_df = pd.DataFrame(high_risk_data)
         high_risk_df.to_excel(writer, sheet_name='Hochrisiko-Bereiche', index=False)
 
-    output.seek(0)
-    return output
+    return io.BytesIO(rewrite_xlsx(output.getvalue(), clock.now()))
+
+
+def stamp_classification_time(artifact: Union[str, bytes], shared: datetime, actual: datetime) -> Union[str, bytes]:
+    """
+    Setzt in ein sessionübergreifend geteiltes Artefakt (Bericht, CSV, Excel) den
+    Zeitpunkt der eigenen Klassifizierung ein. Geteilt wird das mit dem gemeinsamen
+    Zeitpunkt `shared` gerenderte Artefakt; ersetzt wird jeweils dessen erstes Vorkommen.
+    """
+    replacements = [(shared.strftime(fmt), actual.strftime(fmt)) for fmt in (REPORT_TIME_FORMAT, SUMMARY_TIME_FORMAT)]
+    if isinstance(artifact, str):
+        for old, new in replacements:
+            artifact = artifact.replace(old, new, 1)
+        return artifact
+    return rewrite_xlsx(artifact, actual, replacements)
+
+
+def rewrite_xlsx(data: bytes, moment: datetime, replacements: Sequence[tuple[str, str]] = ()) -> bytes:
+    """
+    Schreibt eine xlsx-Datei mit festem Zeitpunkt neu: Zeitstempel der Archiv-Einträge
+    sowie dcterms:created/modified (openpyxl setzt beim Speichern immer die aktuelle Zeit).
+    `replacements` ersetzt zusätzlich Zellentexte (erstes Vorkommen je Paar und Datei).
+    """
+    date_time = moment.timetuple()[:6]
+    properties = moment.replace(microsecond=0).isoformat() + "Z"
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(data)) as source, \
+            zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            content = source.read(info)
+            if info.filename == "docProps/core.xml":
+                content = _XLSX_PROPERTY_RE.sub(rb"\g<1>" + properties.encode("ascii") + rb"\g<3>", content)
+            elif info.filename == "xl/sharedStrings.xml" or info.filename.startswith("xl/worksheets/"):
+                for old, new in replacements:
+                    content = content.replace(escape(old).encode("utf-8"), escape(new).encode("utf-8"), 1)
+            target.writestr(zipfile.ZipInfo(info.filename, date_time), content, zipfile.ZIP_DEFLATED)
+    return output.getvalue()
 
 
 def create_classification_summary(result: ClassificationResult, system_name: str) -> dict:
@@ -446,7 +608,7 @@ def create_classification_summary(result: ClassificationResult, system_name: str
         "Pflichten": "; ".join(result.obligations),
         "Empfehlungen": "; ".join(result.recommendations),
         "Anwendbare_Artikel": "; ".join(result.applicable_articles),
-        "Klassifizierungsdatum": result.timestamp.strftime('%d.%m.%Y %H:%M:%S'),
+        "Klassifizierungsdatum": result.timestamp.strftime(SUMMARY_TIME_FORMAT),
         # Neue Felder
         "GPAI": "Ja" if result.is_gpai else "Nein",
         "GPAI_Systemisches_Risiko": "Ja" if result.gpai_has_systemic_risk else "Nein",
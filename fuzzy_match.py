@@ -0,0 +1,138 @@
+"""
+Unscharfe Zuordnung freier Anwendungsfall-Texte zu den Katalogen
+Ordnet Freitexte aus importierten Inventaren den Anwendungsfällen aus
+Anhang III bzw. den Produktkategorien aus Anhang I zu.
+
+Alle Katalogeinträge werden einmal in Zeichen-Trigramme zerlegt und in einem
+invertierten Index abgelegt. Eine Anfrage zählt nur über die Postinglisten
+ihrer eigenen Trigramme, statt jeden Eintrag paarweise zu vergleichen, und
+bewertet die Kandidaten aus Dice-Koeffizient und Überlappungsanteil.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Optional
+
+from classifier_logic import CatalogSnapshot, get_catalog
+
+
+KIND_USE_CASE = "use_case"
+KIND_ANNEX_I = "annex_i"
+
+# Mindestpunktzahl, ab der best_inputs() einen Treffer übernimmt
+DEFAULT_MIN_SCORE = 0.45
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass(frozen=True)
+class FuzzyMatch:
+    """Treffer der unscharfen Suche."""
+    kind: str                  # KIND_USE_CASE oder KIND_ANNEX_I
+    label: str                 # Anwendungsfall bzw. Produktkategorie im Wortlaut des Katalogs
+    domain: Optional[str]      # Hochrisiko-Bereich (nur bei Anwendungsfällen)
+    score: float               # Trigramm-Ähnlichkeit (0.0 - 1.0)
+
+
+class FuzzyCatalogIndex:
+    """Trigramm-Index über Anhang-III-Anwendungsfälle und Anhang-I-Produktkategorien."""
+
+    def __init__(self, catalog: CatalogSnapshot):
+        self._entries: list[tuple[str, str, Optional[str]]] = []
+        self._sizes: list[int] = []
+        self._postings: dict[str, list[int]] = defaultdict(list)
+
+        for domain_key, domain in catalog.high_risk_domains.items():
+            for use_case in domain["use_cases"]:
+                self._add(KIND_USE_CASE, use_case, domain_key)
+        for product in catalog.annex_i_products:
+            self._add(KIND_ANNEX_I, product, None)
+
+    def _add(self, kind: str, label: str, domain: Optional[str]) -> None:
+        entry_id = len(self._entries)
+        grams = trigrams(label)
+        self._entries.append((kind, label, domain))
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings[gram].append(entry_id)
+
+    def search(
+        self,
+        text: str,
+        kind: Optional[str] = None,
+        limit: int = 5,
+        domain: Optional[str] = None
+    ) -> list[FuzzyMatch]:
+        """Beste Treffer für einen Freitext, absteigend nach Punktzahl (optional nur einer Art bzw. eines Bereichs)."""
+        grams = trigrams(text)
+        if not grams:
+            return []
+
+        common: dict[int, int] = defaultdict(int)
+        postings = self._postings
+        for gram in grams:
+            for entry_id in postings.get(gram, ()):
+                common[entry_id] += 1
+
+        matches = []
+        query_size = len(grams)
+        for entry_id, shared in common.items():
+            entry_kind, label, entry_domain = self._entries[entry_id]
+            if (kind is not None and entry_kind != kind) or (domain is not None and entry_domain != domain):
+                continue
+            entry_size = self._sizes[entry_id]
+            # Mittel aus Dice (Gesamtähnlichkeit) und Überlappung (Teiltreffer in langen Bezeichnungen)
+            score = (2 * shared / (query_size + entry_size) + shared / min(query_size, entry_size)) / 2
+            matches.append(FuzzyMatch(entry_kind, label, entry_domain, score))
+        matches.sort(key=lambda m: m.score, reverse=True)
+        return matches[:limit]
+
+    def best_inputs(self, text: str, min_score: float = DEFAULT_MIN_SCORE) -> dict:
+        """
+        Bester Treffer als Keyword-Argumente für classify_ai_system:
+        high_risk_domain/high_risk_use_case bzw. annex_i_product_type
+        (leer, wenn kein Treffer die Mindestpunktzahl erreicht).
+        """
+        matches = self.search(text, limit=1)
+        if not matches or matches[0].score < min_score:
+            return {}
+        match = matches[0]
+        if match.kind == KIND_USE_CASE:
+            return {"high_risk_domain": match.domain, "high_risk_use_case": match.label}
+        return {"annex_i_product_type": match.label}
+
+
+def normalize(text: str) -> str:
+    """Kleinschreibung, Umlaute ausgeschrieben, Satzzeichen als Leerzeichen."""
+    return _NON_WORD_RE.sub(" ", text.lower().translate(_UMLAUTS)).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """Zeichen-Trigramme der Wörter eines Textes (mit Leerzeichen an Wortanfang und -ende)."""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# Nur die zuletzt verwendete Katalog-Version wird vorgehalten
+_index: Optional[tuple[str, FuzzyCatalogIndex]] = None
+_index_lock = threading.Lock()
+
+
+def get_fuzzy_index(catalog: Optional[CatalogSnapshot] = None) -> FuzzyCatalogIndex:
+    """Gibt den (für die aktuelle Katalog-Version einmal aufgebauten) Index zurück."""
+    global _index
+    if catalog is None:
+        catalog = get_catalog()
+    cached = _index
+    if cached is None or cached[0] != catalog.version:
+        with _index_lock:
+            cached = _index
+            if cached is None or cached[0] != catalog.version:
+                cached = _index = (catalog.version, FuzzyCatalogIndex(catalog))
+    return cached[1]
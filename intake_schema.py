@@ -0,0 +1,181 @@
+"""
+Schema-Prüfung für die Stapel-Erfassung
+Prüft Eingaben im Format der Keyword-Argumente von classify_ai_system vor der
+Klassifizierung auf Typen und gültige Katalogwerte.
+
+classify_ai_system übergeht unbekannte Hochrisiko-Bereiche, Biometrie-Ausnahmen
+und Medientypen stillschweigend; fehlerhafte Inventarzeilen würden so ohne
+Fehlermeldung als minimales Risiko eingestuft. Der Validator wird pro
+Katalog-Version einmal aus dem Schema übersetzt: jede Eingabe erhält eine
+feste Prüffunktion, die erlaubten Werte liegen als frozenset vor. Eine
+Prüfung ist damit ein Durchlauf über die Felder des Eintrags ohne weitere
+Nachschlagearbeit und sammelt alle Fehler des Eintrags.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from classifier_logic import FLAG_FIELDS, CatalogSnapshot, get_catalog
+
+
+# Freitext-Eingaben (str oder None)
+TEXT_FIELDS = ("system_name", "system_description", "provider", "high_risk_use_case", "annex_i_product_type")
+
+# Alle Eingaben von classify_ai_system, die zum Fragebogen gehören
+INPUT_FIELDS = TEXT_FIELDS + ("high_risk_domain", "realtime_biometric_exception", "synthetic_content_types") + FLAG_FIELDS
+
+# Höchstzahl der im ValidationReport aufbewahrten fehlerhaften Einträge (gezählt werden alle)
+MAX_REPORTED_ERRORS = 1000
+
+Check = Callable[[Any], Optional[str]]
+
+
+@dataclass
+class ValidationReport:
+    """Ergebnis einer Prüfung vieler Einträge."""
+    total: int = 0
+    invalid: int = 0
+    errors: list[tuple[int, list[str]]] = field(default_factory=list)   # (Position, Fehler)
+    field_counts: dict[str, int] = field(default_factory=dict)          # Fehler je Eingabe
+
+    @property
+    def valid(self) -> int:
+        return self.total - self.invalid
+
+
+class SchemaValidator:
+    """
+    Aus einem Katalog-Snapshot übersetzter Validator für Eingaben als dict.
+
+    `errors` liefert alle Fehler eines Eintrags (leer = gültig), `is_valid`
+    bricht beim ersten Fehler ab. Fehlende Eingaben sind erlaubt und gelten
+    wie bei classify_ai_system als nicht angegeben.
+    """
+
+    def __init__(self, catalog: CatalogSnapshot):
+        domains = frozenset(catalog.high_risk_domains)
+        exceptions = frozenset(catalog.realtime_biometric_exceptions)
+        content_types = frozenset(catalog.code_of_practice_marking)
+
+        checks: dict[str, Check] = dict.fromkeys(FLAG_FIELDS, _check_bool)
+        checks.update(dict.fromkeys(TEXT_FIELDS, _check_text))
+        checks["high_risk_domain"] = _choice_check(domains, "Hochrisiko-Bereich")
+        checks["realtime_biometric_exception"] = _choice_check(exceptions, "Biometrie-Ausnahme")
+        checks["synthetic_content_types"] = _list_check(content_types, "Medientyp")
+        self.catalog_version = catalog.version
+        self._checks = checks
+        self._flags = frozenset(FLAG_FIELDS)
+
+    def errors(self, record: dict) -> list[str]:
+        """Alle Fehler eines Eintrags als "eingabe: meldung"."""
+        errors = []
+        checks = self._checks
+        for name, value in record.items():
+            check = checks.get(name)
+            if check is None:
+                errors.append(f"{name}: unbekannte Eingabe")
+                continue
+            message = check(value)
+            if message is not None:
+                errors.append(f"{name}: {message}")
+        return errors
+
+    def is_valid(self, record: dict) -> bool:
+        """Schnelle Prüfung ohne Fehlermeldungen (Abbruch beim ersten Fehler)."""
+        checks = self._checks
+        flags = self._flags
+        for name, value in record.items():
+            # Ja/Nein-Fragen stellen die meisten Felder, daher ohne Funktionsaufruf
+            if name in flags:
+                if value is True or value is False:
+                    continue
+                return False
+            check = checks.get(name)
+            if check is None or check(value) is not None:
+                return False
+        return True
+
+    def validate(self, record: dict) -> None:
+        """Wirft einen ValueError mit allen Fehlern, falls der Eintrag ungültig ist."""
+        errors = self.errors(record)
+        if errors:
+            raise ValueError("; ".join(errors))
+
+    def scan(self, records: Iterable[dict]) -> ValidationReport:
+        """Prüft alle Einträge vorab (z.B. ein komplettes Inventar vor dem Stapellauf)."""
+        report = ValidationReport()
+        counts = report.field_counts
+        is_valid = self.is_valid
+        index = -1
+        for index, record in enumerate(records):
+            if is_valid(record):
+                continue
+            errors = self.errors(record)
+            report.invalid += 1
+            if len(report.errors) < MAX_REPORTED_ERRORS:
+                report.errors.append((index, errors))
+            for message in errors:
+                name = message.split(":", 1)[0]
+                counts[name] = counts.get(name, 0) + 1
+        report.total = index + 1
+        return report
+
+
+def _check_bool(value: Any) -> Optional[str]:
+    if value is True or value is False:
+        return None
+    return f"Ja/Nein-Wert erwartet, erhalten {type(value).__name__}"
+
+
+def _check_text(value: Any) -> Optional[str]:
+    if value is None or type(value) is str:
+        return None
+    return f"Text erwartet, erhalten {type(value).__name__}"
+
+
+def _choice_check(allowed: frozenset, label: str) -> Check:
+    def check(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        if type(value) is not str:
+            return f"Text erwartet, erhalten {type(value).__name__}"
+        if value in allowed or not value:
+            return None
+        return f"unbekannter {label}: {value!r}"
+    return check
+
+
+def _list_check(allowed: frozenset, label: str) -> Check:
+    def check(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        if type(value) not in (list, tuple):
+            return f"Liste erwartet, erhalten {type(value).__name__}"
+        try:
+            if allowed.issuperset(value):
+                return None
+        except TypeError:  # nicht hashbare Elemente
+            pass
+        unknown = [v for v in value if not isinstance(v, str) or v not in allowed]
+        return f"unbekannter {label}: {', '.join(map(repr, unknown))}"
+    return check
+
+
+# Nur die zuletzt verwendete Katalog-Version wird vorgehalten
+_validator: Optional[tuple[str, SchemaValidator]] = None
+_validator_lock = threading.Lock()
+
+
+def get_validator(catalog: Optional[CatalogSnapshot] = None) -> SchemaValidator:
+    """Gibt den (für die aktuelle Katalog-Version einmal übersetzten) Validator zurück."""
+    global _validator
+    if catalog is None:
+        catalog = get_catalog()
+    cached = _validator
+    if cached is None or cached[0] != catalog.version:
+        with _validator_lock:
+            cached = _validator
+            if cached is None or cached[0] != catalog.version:
+                cached = _validator = (catalog.version, SchemaValidator(catalog))
+    return cached[1]
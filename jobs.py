@@ -0,0 +1,246 @@
+"""
+Hintergrundaufträge für lange Massenoperationen
+Führt Exporte und Stapel-Klassifizierungen in einem begrenzten Thread-Pool
+außerhalb des Streamlit-Skriptlaufs aus, damit große Inventare die Session
+nicht blockieren.
+
+Jeder Auftrag meldet seinen Fortschritt über einen Callback; das Ergebnis
+wird als Datei unter DATA_DIR/jobs abgelegt und nur bei Bedarf wieder
+gelesen. Die Aufträge aller Sessions teilen sich einen prozessweiten Pool
+(siehe get_job_manager), die Anzahl gleichzeitig laufender Aufträge ist
+dadurch begrenzt.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
+
+from session_store import DATA_DIR
+
+
+JOB_DIR = os.path.join(DATA_DIR, "jobs")
+
+# Anzahl gleichzeitig laufender Aufträge (prozessweit)
+JOB_WORKERS_ENV = "AI_ACT_JOB_WORKERS"
+DEFAULT_JOB_WORKERS = 2
+
+# Abgeschlossene Aufträge, die (samt Ergebnisdatei) aufbewahrt werden
+MAX_FINISHED_JOBS = 100
+
+# Fortschritt wird bei track() alle n Einträge gemeldet
+PROGRESS_EVERY = 500
+
+T = TypeVar("T")
+
+
+class JobStatus(str, Enum):
+    QUEUED = "Wartend"
+    RUNNING = "Läuft"
+    DONE = "Fertig"
+    FAILED = "Fehlgeschlagen"
+    CANCELLED = "Abgebrochen"
+
+
+FINISHED_STATUSES = frozenset({JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED})
+
+
+class JobCancelled(Exception):
+    """Wird im Auftrag ausgelöst, wenn er während der Ausführung abgebrochen wurde."""
+
+
+@dataclass(frozen=True)
+class Job:
+    """Momentaufnahme eines Auftrags."""
+    id: str
+    title: str
+    owner: str                        # z.B. Session-ID; leer = allgemein
+    filename: str
+    mime: str
+    status: JobStatus = JobStatus.QUEUED
+    done: int = 0
+    total: int = 0                    # 0 = Umfang unbekannt
+    created: Optional[datetime] = None
+    started: Optional[datetime] = None
+    finished: Optional[datetime] = None
+    path: Optional[str] = None        # Ergebnisdatei (nur bei DONE)
+    error: str = ""
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Anteil 0.0 - 1.0 (None, wenn der Umfang unbekannt ist)."""
+        if self.status == JobStatus.DONE:
+            return 1.0
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class JobManager:
+    """
+    Verwaltet Hintergrundaufträge in einem begrenzten Thread-Pool.
+
+    `submit` startet einen Auftrag: `func(progress, *args, **kwargs)` muss den
+    Inhalt des Ergebnisses (str oder bytes) zurückgeben und ruft
+    `progress(erledigt, gesamt)` zwischendurch auf. Ein Abbruch laufender
+    Aufträge wird beim nächsten Fortschritts-Aufruf wirksam (JobCancelled).
+    Statusabfragen liefern unveränderliche Momentaufnahmen und sind aus
+    beliebigen Threads möglich.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_JOB_WORKERS, result_dir: str = JOB_DIR):
+        self.max_workers = max_workers
+        self.result_dir = result_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai-act-job")
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._futures: dict[str, Future] = {}
+        self._cancel_requested: set[str] = set()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        title: str,
+        func: Callable[..., Any],
+        *args,
+        filename: str,
+        mime: str = "application/octet-stream",
+        owner: str = "",
+        **kwargs
+    ) -> Job:
+        """Reiht einen Auftrag ein und gibt seine Momentaufnahme zurück."""
+        job = Job(
+            id=uuid.uuid4().hex,
+            title=title,
+            owner=owner,
+            filename=filename,
+            mime=mime,
+            created=datetime.now()
+        )
+        with self._lock:
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job.id, func, args, kwargs)
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner: Optional[str] = None) -> list[Job]:
+        """Alle Aufträge (optional nur eines Besitzers), neueste zuerst."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if owner is not None:
+            jobs = [job for job in jobs if job.owner == owner]
+        return jobs[::-1]
+
+    def cancel(self, job_id: str) -> bool:
+        """Bricht einen wartenden Auftrag sofort, einen laufenden beim nächsten Fortschritt ab."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.is_finished:
+                return False
+            if self._futures[job_id].cancel():
+                self._jobs[job_id] = replace(job, status=JobStatus.CANCELLED, finished=datetime.now())
+            else:
+                self._cancel_requested.add(job_id)
+        return True
+
+    def result(self, job_id: str) -> bytes:
+        """Liest das Ergebnis eines abgeschlossenen Auftrags; KeyError, falls keines vorliegt."""
+        job = self.get(job_id)
+        if job is None or job.path is None:
+            raise KeyError(job_id)
+        with open(job.path, "rb") as f:
+            return f.read()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job_id: str, func: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        self._update(job_id, status=JobStatus.RUNNING, started=datetime.now())
+
+        def progress(done: int, total: int = 0) -> None:
+            if job_id in self._cancel_requested:
+                raise JobCancelled()
+            self._update(job_id, done=done, total=total)
+
+        try:
+            content = func(progress, *args, **kwargs)
+            path = self._write_result(job_id, content)
+        except JobCancelled:
+            self._update(job_id, status=JobStatus.CANCELLED, finished=datetime.now())
+        except Exception as e:  # Fehler des Auftrags im Status festhalten statt im Pool verschlucken
+            self._update(job_id, status=JobStatus.FAILED, finished=datetime.now(), error=f"{type(e).__name__}: {e}")
+        else:
+            self._update(job_id, status=JobStatus.DONE, finished=datetime.now(), path=path)
+        finally:
+            with self._lock:
+                self._cancel_requested.discard(job_id)
+                self._futures.pop(job_id, None)
+
+    def _write_result(self, job_id: str, content: Any) -> str:
+        """Schreibt das Ergebnis atomar (temporäre Datei + Umbenennen) in das Auftragsverzeichnis."""
+        job = self.get(job_id)
+        data = content.encode("utf-8") if isinstance(content, str) else bytes(content)
+        directory = os.path.join(self.result_dir, job_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, os.path.basename(job.filename) or "result")
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return path
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                self._jobs[job_id] = replace(job, **changes)
+
+    def _prune(self) -> None:
+        """Entfernt die ältesten abgeschlossenen Aufträge samt Ergebnis (Aufruf mit gehaltenem Lock)."""
+        finished = [job for job in self._jobs.values() if job.is_finished]
+        for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job.id]
+            shutil.rmtree(os.path.join(self.result_dir, job.id), ignore_errors=True)
+
+
+def track(items: Iterable[T], progress: ProgressCallback, total: int = 0, every: int = PROGRESS_EVERY) -> Iterator[T]:
+    """Reicht `items` durch und meldet dabei alle `every` Einträge den Fortschritt."""
+    done = 0
+    for item in items:
+        yield item
+        done += 1
+        if done % every == 0:
+            progress(done, total)
+    progress(done, total)
+
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Gibt den prozessweiten Auftrags-Manager zurück (Poolgröße über AI_ACT_JOB_WORKERS)."""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                workers = int(os.environ.get(JOB_WORKERS_ENV, DEFAULT_JOB_WORKERS))
+                _job_manager = JobManager(max_workers=max(workers, 1))
+    return _job_manager
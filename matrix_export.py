@@ -0,0 +1,153 @@
+"""
+Dünnbesetzte Inzidenzmatrizen für Portfolio-Analysen
+Exportiert Systeme × Pflichten bzw. Systeme × Artikel als CSR-Matrix mit
+Zeilen- und Spaltenbeschriftungen im .npz-Format.
+
+Die Matrix wird direkt aus den Indexbegriffen der Ergebnisse aufgebaut (ohne
+die "; "-verketteten Textspalten der Zusammenfassung). Die .npz-Datei wird
+ohne numpy geschrieben und ist kompatibel mit `numpy.load` sowie
+`scipy.sparse.load_npz` (Schlüssel data, indices, indptr, shape, format;
+zusätzlich row_labels und col_labels).
+"""
+
+import struct
+import sys
+import zipfile
+from array import array
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Union
+
+from classifier_logic import ClassificationResult
+from portfolio_index import ObligationIndex, is_article_term, is_obligation_term, obligation_terms
+
+
+MATRIX_KINDS = {
+    "obligations": is_obligation_term,
+    "articles": is_article_term,
+}
+
+
+@dataclass
+class IncidenceMatrix:
+    """Binäre CSR-Matrix (Zeile = System, Spalte = Pflicht bzw. Artikel)."""
+    indptr: array       # int64, Länge = Zeilen + 1
+    indices: array      # int32, Spaltenindizes je Zeile aufsteigend
+    row_labels: list[str]
+    col_labels: list[str]
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return len(self.row_labels), len(self.col_labels)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def column_counts(self) -> list[int]:
+        """Anzahl der Systeme je Spalte (z.B. wie viele Systeme eine Pflicht trifft)."""
+        counts = [0] * len(self.col_labels)
+        for col in self.indices:
+            counts[col] += 1
+        return counts
+
+    def save_npz(self, file: Union[str, BinaryIO]) -> None:
+        """Schreibt die Matrix als unkomprimiertes .npz-Archiv."""
+        arrays = {
+            "data": _npy(array("b", bytes([1]) * self.nnz), "|i1"),
+            "indices": _npy(self.indices, "<i4"),
+            "indptr": _npy(self.indptr, "<i8"),
+            "shape": _npy(array("q", self.shape), "<i8"),
+            "format": _npy_str(["csr"], shape=()),
+            "row_labels": _npy_str(self.row_labels),
+            "col_labels": _npy_str(self.col_labels),
+        }
+        with zipfile.ZipFile(file, "w", zipfile.ZIP_STORED) as zf:
+            for name, payload in arrays.items():
+                zf.writestr(f"{name}.npy", payload)
+
+
+def build_incidence_matrix(rows: Iterable[tuple[str, Iterable[str]]]) -> IncidenceMatrix:
+    """
+    Baut eine CSR-Matrix aus (Zeilenbeschriftung, Spaltenbegriffe).
+    Spalten werden alphabetisch sortiert, doppelte Begriffe je Zeile zählen einfach.
+    """
+    columns: dict[str, int] = {}
+    row_labels = []
+    row_columns = []
+    for label, terms in rows:
+        row_labels.append(label)
+        row_columns.append({columns.setdefault(term, len(columns)) for term in terms})
+
+    col_labels = sorted(columns)
+    remap = [0] * len(columns)
+    for position, term in enumerate(col_labels):
+        remap[columns[term]] = position
+
+    indptr = array("q", [0])
+    indices = array("i")
+    for cols in row_columns:
+        indices.extend(sorted(remap[col] for col in cols))
+        indptr.append(len(indices))
+    return IncidenceMatrix(indptr, indices, row_labels, col_labels)
+
+
+def results_to_matrix(
+    results: Iterable[tuple[str, ClassificationResult]],
+    kind: str = "obligations"
+) -> IncidenceMatrix:
+    """Inzidenzmatrix aus (Systemname, Ergebnis); `kind` ist "obligations" oder "articles"."""
+    keep = _kind_filter(kind)
+    return build_incidence_matrix(
+        (label, [term for term in obligation_terms(result) if keep(term)])
+        for label, result in results
+    )
+
+
+def index_to_matrix(index: ObligationIndex, labels: list[str], kind: str = "obligations") -> IncidenceMatrix:
+    """
+    Inzidenzmatrix aus einem bestehenden Pflichten-Index (z.B. dem eines Registers).
+    `labels` enthält die Zeilenbeschriftung je System-ID.
+    """
+    keep = _kind_filter(kind)
+    system_ids = index.system_ids()
+    row_of = {system_id: row for row, system_id in enumerate(system_ids)}
+    row_terms: list[list[str]] = [[] for _ in system_ids]
+    # Spaltenweise über die Postinglisten statt je System über alle Begriffe
+    for term in index.terms():
+        if keep(term):
+            for system_id in index.term_systems(term):
+                row_terms[row_of[system_id]].append(term)
+    return build_incidence_matrix(
+        (labels[system_id], terms) for system_id, terms in zip(system_ids, row_terms)
+    )
+
+
+def _kind_filter(kind: str):
+    try:
+        return MATRIX_KINDS[kind]
+    except KeyError:
+        raise ValueError(f"Unbekannte Matrixart: {kind} (erlaubt: {', '.join(MATRIX_KINDS)})") from None
+
+
+def _npy(values: array, descr: str) -> bytes:
+    """Serialisiert ein eindimensionales array im .npy-Format (Version 1.0)."""
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return _npy_header(descr, (len(values),)) + values.tobytes()
+
+
+def _npy_str(values: list[str], shape=None) -> bytes:
+    """Serialisiert Zeichenketten als numpy-Unicode-Array (UTF-32, feste Breite)."""
+    width = max((len(v) for v in values), default=0) or 1
+    payload = b"".join(v.encode("utf-32-le").ljust(width * 4, b"\0") for v in values)
+    return _npy_header(f"<U{width}", (len(values),) if shape is None else shape) + payload
+
+
+def _npy_header(descr: str, shape: tuple) -> bytes:
+    header = repr({"descr": descr, "fortran_order": False, "shape": shape})
+    # Magic (6) + Version (2) + Längenfeld (2) + Header inkl. "\n" auf Vielfache von 64 auffüllen
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = (header + " " * (padding % 64) + "\n").encode("latin1")
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header
+
@@ -0,0 +1,500 @@
+"""
+Portfolio-Indizes über gespeicherte Klassifizierungen
+Ermöglichen Abfragen über alle Systeme eines Registers, ohne die einzelnen
+Ergebnisse oder die exportierten Textspalten erneut zu durchsuchen.
+"""
+
+import hashlib
+import random
+import re
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from classifier_logic import ClassificationResult
+
+
+# Sortiert hinter jedem Fristschlüssel; begrenzt Bereichssuchen auf ganze Tage
+_MAX_KEY = "\uffff"
+
+
+class DeadlineIndex:
+    """
+    Sortierter Fristen-Kalender über alle Systeme.
+
+    Jede anwendbare Frist (Schlüssel aus `applicable_deadlines`, z.B.
+    "hochrisiko_anhang_iii") wird als Bit (Bit i = System-ID i) im Bitset
+    ihres (Datum, Fristart)-Paares gehalten; die wenigen unterschiedlichen
+    Paare liegen in einer sortierten Liste. Bereichsabfragen benötigen damit
+    nur zwei Binärsuchen plus die Ausgabe der Treffer, und ein System belegt
+    nur ein Bit je Frist.
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[date, str]] = []
+        self._postings: dict[tuple[date, str], bytearray] = {}
+
+    def __len__(self) -> int:
+        return sum(_to_int(posting).bit_count() for posting in self._postings.values())
+
+    def add(self, system_id: int, deadlines: dict[str, date]) -> None:
+        """Nimmt die Fristen eines Systems auf (ersetzt bereits vorhandene)."""
+        self.remove(system_id)
+        for key, deadline in deadlines.items():
+            posting = self._postings.get((deadline, key))
+            if posting is None:
+                posting = self._postings[(deadline, key)] = bytearray()
+                insort(self._keys, (deadline, key))
+            _set_bit(posting, system_id)
+
+    def remove(self, system_id: int) -> None:
+        """Entfernt alle Fristen eines Systems."""
+        for posting in self._postings.values():
+            _clear_bit(posting, system_id)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._postings.clear()
+
+    def between(self, start: date, end: date) -> list[tuple[date, str, int]]:
+        """Alle Fristen im Zeitraum [start, end] als (Datum, Fristart, System-ID), nach Datum sortiert."""
+        lo = bisect_left(self._keys, (start,))
+        hi = bisect_right(self._keys, (end, _MAX_KEY))
+        return [
+            (deadline, key, system_id)
+            for deadline, key in self._keys[lo:hi]
+            for system_id in _bit_ids(_to_int(self._postings[(deadline, key)]))
+        ]
+
+    def grouped(self, start: date, end: date) -> dict[str, list[int]]:
+        """Fristen im Zeitraum [start, end], gruppiert nach Fristart (System-IDs je Fristart)."""
+        groups: dict[str, list[int]] = defaultdict(list)
+        for _, key, system_id in self.between(start, end):
+            groups[key].append(system_id)
+        return dict(groups)
+
+    def next_boundary(self, reference_date: date) -> Optional[tuple[date, dict[str, list[int]]]]:
+        """
+        Nächster Stichtag nach `reference_date`, an dem Fristen in Kraft treten.
+
+        Gibt (Datum, {Fristart: System-IDs}) zurück, also alle Systeme, deren
+        Status an diesem Tag von "Noch nicht in Kraft" auf "In Kraft" wechselt,
+        oder None, wenn keine Frist mehr aussteht.
+        """
+        i = bisect_right(self._keys, (reference_date, _MAX_KEY))
+        # Paare ohne Systeme (nach remove) überspringen
+        while i < len(self._keys) and not any(self._postings[self._keys[i]]):
+            i += 1
+        if i == len(self._keys):
+            return None
+        boundary = self._keys[i][0]
+        return boundary, self.grouped(boundary, boundary)
+
+    def system_deadlines(self, system_id: int) -> dict[str, date]:
+        """Fristen eines einzelnen Systems."""
+        return {
+            key: deadline
+            for (deadline, key), posting in self._postings.items()
+            if _test_bit(posting, system_id)
+        }
+
+
+# Artikel- und Anhangsverweise in Pflichten-Texten, z.B. "(Artikel 11, Anhang IV)" oder "(Art. 53(1)(a))"
+_ARTICLE_RE = re.compile(r"\b(?:Artikel|Art\.)\s*(\d+)((?:\(\w+\))*)")
+_PARAGRAPH_RE = re.compile(r"\(\w+\)")
+_ANNEX_RE = re.compile(r"\bAnhang\s+([IVX]+)\b")
+# Medientypen der Markierungsempfehlungen: "  [VIDEO] ..." (Hochrisiko) bzw. "--- Empfehlungen für VIDEO: ---"
+_MEDIA_RE = re.compile(r"^\s*\[(\w+)\]|Empfehlungen für (\w+):")
+
+# Präfixe der Begriffe, die weder Pflicht noch Artikel sind
+_META_PREFIXES = ("Risikostufe: ", "Medium: ", "GPAI")
+
+# Felder, deren Einträge im Wortlaut indexiert werden
+_OBLIGATION_FIELDS = (
+    "obligations",
+    "transparency_obligations",
+    "gpai_obligations",
+    "universal_obligations",
+)
+
+# Davon die Felder, die nur die tatsächlich ausgelösten Pflichten enthalten und deren
+# Verweise daher mit indexiert werden. Die übrigen Pflichtenlisten sind je Risikostufe
+# fest (z.B. nennt LIMITED auch Art. 50(2) und 50(4) für einen reinen Chatbot).
+_TRIGGERED_FIELDS = frozenset({"transparency_obligations", "gpai_obligations"})
+
+
+def is_article_term(term: str) -> bool:
+    """Prüft, ob ein Indexbegriff ein Artikel- oder Anhangsverweis ist."""
+    return term.startswith(("Art. ", "Anhang "))
+
+
+def is_obligation_term(term: str) -> bool:
+    """Prüft, ob ein Indexbegriff eine Pflicht im Wortlaut ist."""
+    return not is_article_term(term) and not term.startswith(_META_PREFIXES)
+
+
+def obligation_terms(result: ClassificationResult) -> set[str]:
+    """
+    Leitet die Indexbegriffe eines Ergebnisses ab.
+
+    - jede Pflicht im Wortlaut
+    - normalisierte Artikelverweise inkl. übergeordneter Ebenen
+      ("Art. 53(1)(a)" ergibt auch "Art. 53(1)" und "Art. 53") aus den
+      anwendbaren Artikeln sowie den ausgelösten Transparenz- und GPAI-Pflichten
+    - Anhänge ("Anhang III") aus denselben Quellen; Einträge der anwendbaren
+      Artikel ohne Artikelnummer (z.B. "Anhang III, Nr. 4") zusätzlich im Wortlaut
+    - Medientypen der Markierungsempfehlungen ("Medium: video")
+    - Risikostufe ("Risikostufe: HIGH") sowie "GPAI"
+    """
+    terms = {f"Risikostufe: {result.risk_level.name}"}
+    if result.is_gpai:
+        terms.add("GPAI")
+    for name in _OBLIGATION_FIELDS:
+        for text in getattr(result, name):
+            terms.update(_text_terms(text, True, name in _TRIGGERED_FIELDS))
+    for text in result.applicable_articles:
+        terms.update(_text_terms(text, False, True))
+    for text in result.recommendations:
+        media = _MEDIA_RE.search(text)
+        if media:
+            terms.add(f"Medium: {(media.group(1) or media.group(2)).lower()}")
+    return terms
+
+
+@lru_cache(maxsize=4096)
+def _text_terms(text: str, verbatim: bool, references: bool) -> tuple[str, ...]:
+    """Begriffe eines einzelnen Textes (die Texte wiederholen sich über das Portfolio)."""
+    media = _MEDIA_RE.search(text)
+    if media:
+        return (f"Medium: {(media.group(1) or media.group(2)).lower()}",)
+    if not references:
+        return (text,)
+
+    terms = []
+    articles = _ARTICLE_RE.findall(text)
+    if verbatim or not articles:
+        terms.append(text)
+    for number, paragraphs in articles:
+        ref = f"Art. {number}"
+        terms.append(ref)
+        for part in _PARAGRAPH_RE.findall(paragraphs):
+            ref += part
+            terms.append(ref)
+    for annex in _ANNEX_RE.findall(text):
+        terms.append(f"Anhang {annex}")
+    return tuple(terms)
+
+
+class ObligationIndex:
+    """
+    Invertierter Index von Pflichten, Artikeln und Anhängen auf System-IDs.
+
+    Jede Postingliste ist ein Bitset (bytearray, Bit i = System-ID i), das
+    beim Hinzufügen in O(1) gesetzt wird. Abfragen wandeln die beteiligten
+    Bitsets in Ganzzahlen um und verknüpfen sie mit &, | und ~; das läuft
+    vollständig in C und bleibt auch bei zehntausenden Systemen im
+    Millisekundenbereich. Ein System belegt nur ein Bit je Begriff; die
+    Begriffe eines Systems werden bei Bedarf aus den Bitsets gelesen.
+    """
+
+    def __init__(self):
+        self._postings: dict[str, bytearray] = {}
+        self._all = bytearray()
+
+    def __len__(self) -> int:
+        return _to_int(self._all).bit_count()
+
+    def add(self, system_id: int, result: ClassificationResult) -> None:
+        """Nimmt ein Ergebnis auf (ersetzt ein vorhandenes mit derselben ID)."""
+        if _test_bit(self._all, system_id):
+            self.remove(system_id)
+        for term in obligation_terms(result):
+            _set_bit(self._postings.setdefault(term, bytearray()), system_id)
+        _set_bit(self._all, system_id)
+
+    def remove(self, system_id: int) -> None:
+        """Entfernt ein System aus allen Postinglisten."""
+        for posting in self._postings.values():
+            _clear_bit(posting, system_id)
+        _clear_bit(self._all, system_id)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._all.clear()
+
+    def terms(self) -> list[str]:
+        """Alle bekannten Indexbegriffe (sortiert)."""
+        return sorted(self._postings)
+
+    def system_terms(self, system_id: int) -> set[str]:
+        """Indexbegriffe eines Systems (leer, falls unbekannt)."""
+        return {term for term, posting in self._postings.items() if _test_bit(posting, system_id)}
+
+    def system_ids(self) -> list[int]:
+        """Alle indexierten System-IDs (aufsteigend)."""
+        return _bit_ids(_to_int(self._all))
+
+    def term_systems(self, term: str) -> list[int]:
+        """System-IDs mit diesem Begriff (aufsteigend)."""
+        return _bit_ids(_to_int(self._postings.get(term, b"")))
+
+    def count(self, term: str) -> int:
+        """Anzahl der Systeme mit diesem Begriff."""
+        return _to_int(self._postings.get(term, b"")).bit_count()
+
+    def query(
+        self,
+        all_of: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+        none_of: Iterable[str] = ()
+    ) -> list[int]:
+        """
+        Boolesche Abfrage, Ergebnis als aufsteigende System-IDs.
+
+        Treffer haben alle Begriffe aus `all_of` (UND), mindestens einen aus
+        `any_of` (ODER, falls angegeben) und keinen aus `none_of` (NICHT).
+        Unbekannte Begriffe haben eine leere Postingliste.
+        """
+        bits = _to_int(self._all)
+        for term in all_of:
+            bits &= _to_int(self._postings.get(term, b""))
+        any_of = list(any_of)
+        if any_of:
+            union = 0
+            for term in any_of:
+                union |= _to_int(self._postings.get(term, b""))
+            bits &= union
+        for term in none_of:
+            bits &= ~_to_int(self._postings.get(term, b""))
+        return _bit_ids(bits)
+
+
+def _set_bit(bitset: bytearray, i: int) -> None:
+    byte = i >> 3
+    if byte >= len(bitset):
+        bitset.extend(bytes(byte + 1 - len(bitset)))
+    bitset[byte] |= 1 << (i & 7)
+
+
+def _test_bit(bitset: bytes, i: int) -> bool:
+    byte = i >> 3
+    return byte < len(bitset) and bool(bitset[byte] & (1 << (i & 7)))
+
+
+def _clear_bit(bitset: bytearray, i: int) -> None:
+    byte = i >> 3
+    if byte < len(bitset):
+        bitset[byte] &= ~(1 << (i & 7)) & 0xFF
+
+
+def _to_int(bitset: bytes) -> int:
+    return int.from_bytes(bitset, "little")
+
+
+def _bit_ids(bits: int) -> list[int]:
+    """Positionen der gesetzten Bits (aufsteigend)."""
+    if bits <= 0:
+        return []
+    digits = format(bits, "b")[::-1]
+    ids = []
+    i = digits.find("1")
+    while i != -1:
+        ids.append(i)
+        i = digits.find("1", i + 1)
+    return ids
+
+
+# MinHash-Parameter: 64 Permutationen in 16 LSH-Bändern zu je 4 Zeilen
+# (Kandidaten ab einer geschätzten Jaccard-Ähnlichkeit von etwa 0,5)
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+DEFAULT_DUPLICATE_THRESHOLD = 0.5
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_SHINGLE_WORDS = 3
+_WORD_RE = re.compile(r"\w+")
+
+
+def _make_permutations(seed: int = 20240801) -> tuple[tuple[int, int], ...]:
+    """Feste Hash-Permutationen (a * x + b) mod p, damit Signaturen prozessübergreifend vergleichbar sind."""
+    rng = random.Random(seed)
+    return tuple(
+        (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+        for _ in range(MINHASH_PERMUTATIONS)
+    )
+
+
+_PERMUTATIONS = _make_permutations()
+
+
+@dataclass(frozen=True)
+class DuplicateCandidate:
+    """Mögliches Duplikat eines Systems."""
+    system_id: int
+    similarity: float       # geschätzte Jaccard-Ähnlichkeit der Beschreibungen
+    same_provider: bool
+    same_decision: bool     # gleicher Entscheidungs-Fingerabdruck (gleiche Fragebogen-Antworten)
+
+
+def minhash_signature(text: str) -> Optional[tuple[int, ...]]:
+    """MinHash-Signatur über Wort-Trigramme eines Textes (None bei leerem Text)."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return None
+    width = min(_SHINGLE_WORDS, len(words))
+    shingles = {" ".join(words[i:i + width]) for i in range(len(words) - width + 1)}
+    bases = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        for shingle in shingles
+    ]
+    return tuple(min((a * x + b) % _MERSENNE_PRIME for x in bases) for a, b in _PERMUTATIONS)
+
+
+# Tabellen für ausgelagerte Signaturen (in der Auslagerungsdatei des Registers)
+_DUPLICATE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS minhash_systems ("
+    "system_id INTEGER PRIMARY KEY, signature BLOB NOT NULL, provider TEXT NOT NULL, fingerprint TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS minhash_bands (band INTEGER NOT NULL, system_id INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS minhash_bands_band ON minhash_bands (band)",
+)
+
+
+class NearDuplicateIndex:
+    """
+    Erkennt mehrfach erfasste Systeme über ähnliche Beschreibungen (MinHash/LSH).
+
+    Die Signatur jeder Beschreibung wird in LSH_BANDS Bänder zerlegt; Systeme,
+    die in mindestens einem Band übereinstimmen, sind Kandidaten. Eine Anfrage
+    prüft damit nur die Einträge der eigenen Buckets statt aller Systeme.
+    Anbieter und Entscheidungs-Fingerabdruck werden zu jedem Kandidaten
+    mit ausgewiesen.
+
+    Mit `connect` (Fabrik für SQLite-Verbindungen) können Systeme per `spill`
+    samt Signatur und Bändern ausgelagert werden; `candidates` liest die
+    Buckets dann zusätzlich aus der Datei.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_DUPLICATE_THRESHOLD,
+        connect: Optional[Callable[[], sqlite3.Connection]] = None
+    ):
+        self.threshold = threshold
+        self._connect = connect
+        self._buckets: dict[tuple, dict[int, None]] = defaultdict(dict)
+        self._systems: dict[int, tuple[tuple[int, ...], str, str]] = {}
+        self._spilled = 0
+        self._max_spilled_id = -1
+
+    def __len__(self) -> int:
+        return len(self._systems) + self._spilled
+
+    def add(self, system_id: int, description: str, provider: str = "", fingerprint: str = "") -> None:
+        """Nimmt ein System auf (Systeme ohne Beschreibung werden nicht indexiert)."""
+        signature = minhash_signature(description)
+        if signature is None:
+            return
+        self.remove(system_id)
+        self._systems[system_id] = (signature, provider, fingerprint)
+        for band in _bands(signature):
+            self._buckets[band][system_id] = None
+
+    def remove(self, system_id: int) -> None:
+        entry = self._systems.pop(system_id, None)
+        if entry is not None:
+            self._drop_buckets(system_id, entry[0])
+        elif self._spilled and system_id <= self._max_spilled_id:
+            with closing(self._connect()) as conn, conn:
+                if conn.execute("DELETE FROM minhash_systems WHERE system_id = ?", (system_id,)).rowcount:
+                    conn.execute("DELETE FROM minhash_bands WHERE system_id = ?", (system_id,))
+                    self._spilled -= 1
+
+    def spill(self, system_ids: Iterable[int], conn: sqlite3.Connection) -> None:
+        """Lagert die angegebenen Systeme über die offene Verbindung `conn` aus (Commit durch den Aufrufer)."""
+        if self._connect is None:
+            raise RuntimeError("NearDuplicateIndex ohne connect kann nicht auslagern")
+        systems = []
+        bands = []
+        for system_id in system_ids:
+            entry = self._systems.pop(system_id, None)
+            if entry is None:
+                continue
+            signature, provider, fingerprint = entry
+            self._drop_buckets(system_id, signature)
+            systems.append((system_id, array("Q", signature).tobytes(), provider, fingerprint))
+            bands.extend((hash(band), system_id) for band in _bands(signature))
+        if not systems:
+            return
+        for statement in _DUPLICATE_SCHEMA:
+            conn.execute(statement)
+        conn.executemany("INSERT OR REPLACE INTO minhash_systems VALUES (?, ?, ?, ?)", systems)
+        conn.executemany("INSERT INTO minhash_bands VALUES (?, ?)", bands)
+        self._spilled += len(systems)
+        self._max_spilled_id = max(self._max_spilled_id, max(row[0] for row in systems))
+
+    def clear(self) -> None:
+        """Leert den Index (ausgelagerte Tabellen entfernt der Besitzer der Datei)."""
+        self._buckets.clear()
+        self._systems.clear()
+        self._spilled = 0
+        self._max_spilled_id = -1
+
+    def candidates(
+        self,
+        description: str,
+        provider: str = "",
+        fingerprint: str = "",
+        exclude: Optional[int] = None
+    ) -> list[DuplicateCandidate]:
+        """Mögliche Duplikate einer Beschreibung, absteigend nach Ähnlichkeit."""
+        signature = minhash_signature(description)
+        if signature is None:
+            return []
+
+        bands = _bands(signature)
+        systems = {}
+        for band in bands:
+            for system_id in self._buckets.get(band, ()):
+                systems[system_id] = self._systems[system_id]
+        if self._spilled:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    "SELECT system_id, signature, provider, fingerprint FROM minhash_systems "
+                    "WHERE system_id IN (SELECT system_id FROM minhash_bands "
+                    f"WHERE band IN ({', '.join('?' * len(bands))}))",
+                    [hash(band) for band in bands]
+                )
+                for system_id, blob, other_provider, other_fingerprint in rows:
+                    systems[system_id] = (array("Q", blob), other_provider, other_fingerprint)
+        systems.pop(exclude, None)
+
+        found = []
+        for system_id, (other, other_provider, other_fingerprint) in systems.items():
+            similarity = sum(x == y for x, y in zip(signature, other)) / MINHASH_PERMUTATIONS
+            if similarity >= self.threshold:
+                found.append(DuplicateCandidate(
+                    system_id,
+                    similarity,
+                    same_provider=bool(provider) and provider.casefold() == other_provider.casefold(),
+                    same_decision=bool(fingerprint) and fingerprint == other_fingerprint
+                ))
+        found.sort(key=lambda c: (c.similarity, c.same_decision, c.same_provider), reverse=True)
+        return found
+
+    def _drop_buckets(self, system_id: int, signature: tuple[int, ...]) -> None:
+        for band in _bands(signature):
+            bucket = self._buckets[band]
+            del bucket[system_id]
+            if not bucket:
+                del self._buckets[band]
+
+
+def _bands(signature: tuple[int, ...]) -> list[tuple]:
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
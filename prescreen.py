@@ -0,0 +1,300 @@
+"""
+Stichwort-Vorprüfung von Systembeschreibungen
+Durchsucht freie Beschreibungstexte in einem Durchlauf nach Begriffen aus den
+Regelkatalogen und schlägt daraus wahrscheinliche Fragebogen-Antworten
+(Flags, Hochrisiko-Bereich, Anwendungsfall, Anhang-I-Produkt) mit Fundstellen vor.
+
+Alle Begriffe werden zu einem einzigen regulären Ausdruck kompiliert, dessen
+Alternativen als Präfixbaum (Trie) verschachtelt sind. Wie bei Aho-Corasick
+wird so an jeder Textposition nur dem passenden Pfad gefolgt, statt jeden
+Begriff einzeln zu prüfen; die eigentliche Suche läuft in der C-Implementierung
+von `re`. Begriffe treffen am Wortanfang ohne Beachtung der Groß-/Kleinschreibung
+und schließen Komposita ein ("gesichtserkennung" trifft auch
+"Gesichtserkennungssoftware").
+"""
+
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+from classifier_logic import (
+    PROHIBITED_PRACTICES,
+    LIMITED_RISK_TRIGGERS,
+    CatalogSnapshot,
+    ClassificationInput,
+    get_catalog
+)
+
+
+# Zielarten der Vorschläge
+KIND_FLAG = "flag"
+KIND_DOMAIN = "domain"
+KIND_USE_CASE = "use_case"
+KIND_ANNEX_I = "annex_i"
+
+# Katalogschlüssel → Flag von classify_ai_system
+PROHIBITED_PRACTICE_FLAGS = {
+    "subliminal_manipulation": "uses_subliminal_manipulation",
+    "exploitation_vulnerable": "exploits_vulnerable_groups",
+    "social_scoring": "performs_social_scoring",
+    "predictive_policing_profiling": "predictive_policing_only_profiling",
+    "facial_recognition_scraping": "scrapes_facial_recognition",
+    "emotion_recognition_work_education": "emotion_recognition_work_education",
+    "biometric_categorization_sensitive": "biometric_categorization_sensitive",
+    "realtime_biometric_public": "realtime_biometric_public",
+}
+
+LIMITED_RISK_TRIGGER_FLAGS = {
+    "chatbot": "interacts_with_humans",
+    "deepfake": "generates_deepfakes",
+    "ai_generated_content": "generates_synthetic_content",
+    "emotion_recognition_allowed": "emotion_recognition_medical_safety",
+    "biometric_categorization_allowed": "biometric_categorization_lawful",
+}
+
+# Ergänzende Stichwörter (klein geschrieben, Treffer am Wortanfang), die in den
+# Katalogtexten selbst nicht oder nur umschrieben vorkommen
+FLAG_KEYWORDS = {
+    "uses_subliminal_manipulation": ["unterschwellig", "subliminal", "dark pattern"],
+    "exploits_vulnerable_groups": ["schutzbedürftig", "vulnerable", "minderjährig"],
+    "performs_social_scoring": ["social scoring", "sozialkredit", "sozialverhalten", "soziales scoring"],
+    "predictive_policing_only_profiling": ["predictive policing", "straftatenvorhersage", "kriminalitätsprognose"],
+    "scrapes_facial_recognition": ["gesichtsdatenbank", "bilder aus dem internet", "cctv-aufnahmen", "scraping"],
+    "emotion_recognition_work_education": ["emotionserkennung am arbeitsplatz", "stimmung der mitarbeiter"],
+    "biometric_categorization_sensitive": [
+        "ethnische herkunft", "ethnie", "politische meinung", "sexuelle orientierung",
+        "gewerkschaftszugehörigkeit", "religiöse überzeugung"
+    ],
+    "realtime_biometric_public": ["echtzeit-gesichtserkennung", "live-gesichtserkennung", "öffentlich zugängliche"],
+    "is_safety_component_annex_i": ["sicherheitsbauteil", "sicherheitskomponente", "safety component"],
+    "requires_third_party_assessment": ["benannte stelle", "notified body", "konformitätsbewertung durch dritte"],
+    "performs_profiling": ["profiling", "profilbildung", "persönlichkeitsprofil", "verhaltensprofil"],
+    "interacts_with_humans": [
+        "chatbot", "virtueller assistent", "virtuelle assistentin", "sprachassistent",
+        "dialogsystem", "conversational", "kundenservice-bot"
+    ],
+    "generates_synthetic_content": [
+        "generative ki", "generativ", "textgenerierung", "bildgenerierung", "synthetisch",
+        "sprachmodell", "large language model", "llm"
+    ],
+    "generates_deepfakes": ["deepfake", "deep fake", "face swap", "stimmklon", "voice cloning"],
+    "emotion_recognition_medical_safety": ["müdigkeitserkennung", "fahrerüberwachung"],
+    "is_gpai": ["foundation model", "basismodell", "general purpose", "gpai", "allzweck"],
+    "gpai_has_systemic_risk": ["systemisches risiko", "systemic risk", "10^25"],
+}
+
+DOMAIN_KEYWORDS = {
+    "biometrics": ["biometri", "gesichtserkennung", "fingerabdruck", "iris-scan", "stimmerkennung"],
+    "critical_infrastructure": ["kritische infrastruktur", "stromnetz", "wasserversorgung", "gasversorgung", "verkehrssteuerung"],
+    "education": ["schüler", "studierend", "studenten", "hochschul", "prüfungs", "benotung", "lernplattform"],
+    "employment": [
+        "bewerber", "bewerbung", "recruiting", "personalauswahl", "lebenslauf", "lebensläuf", "stellenanzeige",
+        "kündigung", "beförderung", "leistungsbeurteilung", "mitarbeiterbewertung"
+    ],
+    "essential_services": ["kredit", "bonität", "versicherung", "sozialleistung", "notruf", "triage"],
+    "law_enforcement": ["polizei", "strafverfolgung", "ermittlungsbehörde", "rückfall", "lügendetektor"],
+    "migration_border": ["grenzkontrolle", "asyl", "visum", "visa", "einwanderung", "aufenthaltstitel"],
+    "justice_democracy": ["gericht", "richter", "rechtsprechung", "wahlbeeinflussung", "wahlkampf"],
+}
+
+# Wörter aus Katalogbezeichnungen, die zu allgemein sind, um als Begriff zu taugen
+_STOPWORDS = {
+    "system", "systeme", "bewertung", "prüfung", "entscheidungen", "ähnliche", "anlagen",
+    "sowie", "höher", "klasse", "personen", "basierend", "tools", "alternative",
+}
+_MIN_WORD_LENGTH = 7
+_WORD_SPLIT_RE = re.compile(r"[^\wäöüß]+")
+
+
+@dataclass(frozen=True)
+class Hit:
+    """Fundstelle eines Begriffs in der Beschreibung."""
+    start: int
+    end: int
+    term: str
+
+
+@dataclass
+class Suggestion:
+    """Vorgeschlagene Antwort mit Punktzahl und Fundstellen."""
+    kind: str       # KIND_FLAG, KIND_DOMAIN, KIND_USE_CASE oder KIND_ANNEX_I
+    key: object     # Flag-Name, Bereichsschlüssel, (Bereich, Anwendungsfall) oder Produktkategorie
+    score: float = 0.0
+    evidence: list[Hit] = field(default_factory=list)
+
+
+@dataclass
+class ScreeningReport:
+    """Ergebnis der Vorprüfung einer Beschreibung (Vorschläge nach Punktzahl absteigend)."""
+    suggestions: list[Suggestion]
+
+    def of_kind(self, kind: str) -> list[Suggestion]:
+        return [s for s in self.suggestions if s.kind == kind]
+
+    def suggested_kwargs(self, min_score: float = 1.0) -> dict:
+        """
+        Vorschlag als Keyword-Argumente für classify_ai_system bzw.
+        ClassificationInput.from_kwargs: alle Flags mit mindestens `min_score`
+        (ein eindeutiger Begriff zählt 1), der beste Bereich mit seinem besten
+        Anwendungsfall und das beste Anhang-I-Produkt.
+        """
+        kwargs = {s.key: True for s in self.of_kind(KIND_FLAG) if s.score >= min_score}
+        domains = self.of_kind(KIND_DOMAIN)
+        if domains:
+            domain = domains[0].key
+            kwargs["high_risk_domain"] = domain
+            use_cases = [s for s in self.of_kind(KIND_USE_CASE) if s.key[0] == domain]
+            if use_cases:
+                kwargs["high_risk_use_case"] = use_cases[0].key[1]
+        products = self.of_kind(KIND_ANNEX_I)
+        if products:
+            kwargs["annex_i_product_type"] = products[0].key
+            kwargs["is_product_annex_i"] = True
+        return kwargs
+
+    def missing_answers(self, inp: ClassificationInput, min_score: float = 1.0) -> dict:
+        """
+        Der Teil von suggested_kwargs(), den die Eingabe nicht bereits beantwortet:
+        nicht gesetzte Flags sowie Bereich/Anwendungsfall bzw. Anhang-I-Produkt,
+        falls die Eingabe keinen angibt (leer = keine Hinweise).
+        """
+        missing = {}
+        for name, value in self.suggested_kwargs(min_score).items():
+            if name in ("high_risk_domain", "high_risk_use_case"):
+                if inp.high_risk_domain is None:
+                    missing[name] = value
+            elif name == "annex_i_product_type":
+                if inp.annex_i_product_type is None:
+                    missing[name] = value
+            elif not inp.has(name):
+                missing[name] = value
+        return missing
+
+
+class KeywordScreener:
+    """
+    Vorkompilierter Mehrfach-Begriffsabgleich über die Regelkataloge.
+
+    Ein Begriff kann auf mehrere Ziele zeigen; sein Gewicht wird dann auf
+    diese aufgeteilt, damit allgemeine Begriffe weniger zählen als eindeutige.
+    """
+
+    def __init__(self, terms: dict[str, list[tuple[str, object]]]):
+        self._targets = {term: tuple(dict.fromkeys(targets)) for term, targets in terms.items()}
+        body = _trie_pattern(self._targets)
+        # Gesucht wird im klein geschriebenen Text; ändert lower() die Länge (selten, z.B. "İ"),
+        # wird stattdessen ohne Beachtung der Groß-/Kleinschreibung im Original gesucht
+        self._pattern = re.compile(r"\b(?:" + body + ")")
+        self._pattern_ignorecase = re.compile(r"\b(?:" + body + ")", re.IGNORECASE)
+
+    @classmethod
+    def from_catalog(cls, catalog: CatalogSnapshot) -> "KeywordScreener":
+        """Leitet die Begriffe aus den Katalogen und den ergänzenden Stichwörtern ab."""
+        terms: dict[str, list[tuple[str, object]]] = defaultdict(list)
+
+        def add(words: Iterable[str], target: tuple[str, object]):
+            for word in words:
+                terms[word.lower()].append(target)
+
+        for flag, keywords in FLAG_KEYWORDS.items():
+            add(keywords, (KIND_FLAG, flag))
+        for key, practice in PROHIBITED_PRACTICES.items():
+            add(_label_words(practice["name"]), (KIND_FLAG, PROHIBITED_PRACTICE_FLAGS[key]))
+        for key, text in LIMITED_RISK_TRIGGERS.items():
+            add(_label_words(text), (KIND_FLAG, LIMITED_RISK_TRIGGER_FLAGS[key]))
+
+        for domain_key, domain in catalog.high_risk_domains.items():
+            add(DOMAIN_KEYWORDS.get(domain_key, ()), (KIND_DOMAIN, domain_key))
+            add(_label_words(domain["name"]), (KIND_DOMAIN, domain_key))
+            for use_case in domain["use_cases"]:
+                words = _label_words(use_case)
+                add(words, (KIND_USE_CASE, (domain_key, use_case)))
+                add(words, (KIND_DOMAIN, domain_key))
+
+        for product in catalog.annex_i_products:
+            add(_label_words(product), (KIND_ANNEX_I, product))
+
+        return cls(terms)
+
+    def scan(self, text: str) -> list[Hit]:
+        """Alle Fundstellen in einem Durchlauf."""
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            return [Hit(m.start(), m.end(), m.group()) for m in self._pattern.finditer(lowered)]
+        return [Hit(m.start(), m.end(), m.group().lower()) for m in self._pattern_ignorecase.finditer(text)]
+
+    def screen(self, text: str) -> ScreeningReport:
+        """Vorprüfung einer Beschreibung."""
+        suggestions: dict[tuple[str, object], Suggestion] = {}
+        for hit in self.scan(text):
+            targets = self._targets[hit.term]
+            weight = 1.0 / len(targets)
+            for kind, key in targets:
+                suggestion = suggestions.get((kind, key))
+                if suggestion is None:
+                    suggestion = suggestions[(kind, key)] = Suggestion(kind, key)
+                suggestion.score += weight
+                suggestion.evidence.append(hit)
+        return ScreeningReport(sorted(suggestions.values(), key=lambda s: s.score, reverse=True))
+
+    def screen_many(self, texts: Iterable[str]) -> Iterable[ScreeningReport]:
+        """Vorprüfung vieler Beschreibungen (als Generator)."""
+        for text in texts:
+            yield self.screen(text)
+
+
+# Nur die zuletzt verwendete Katalog-Version wird vorgehalten
+_screener: Optional[tuple[str, KeywordScreener]] = None
+_screener_lock = threading.Lock()
+
+
+def get_screener(catalog: Optional[CatalogSnapshot] = None) -> KeywordScreener:
+    """Gibt den (für die aktuelle Katalog-Version einmal kompilierten) Screener zurück."""
+    global _screener
+    if catalog is None:
+        catalog = get_catalog()
+    cached = _screener
+    if cached is None or cached[0] != catalog.version:
+        with _screener_lock:
+            cached = _screener
+            if cached is None or cached[0] != catalog.version:
+                cached = _screener = (catalog.version, KeywordScreener.from_catalog(catalog))
+    return cached[1]
+
+
+def screen_description(text: str, catalog: Optional[CatalogSnapshot] = None) -> ScreeningReport:
+    """Vorprüfung einer Systembeschreibung gegen den aktiven (oder angegebenen) Katalog."""
+    return get_screener(catalog).screen(text)
+
+
+def _label_words(label: str) -> list[str]:
+    """Aussagekräftige Einzelwörter einer Katalogbezeichnung."""
+    return [
+        word for word in _WORD_SPLIT_RE.split(label.lower())
+        if len(word) >= _MIN_WORD_LENGTH and word not in _STOPWORDS
+    ]
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """Kompiliert Begriffe zu einem als Präfixbaum verschachtelten Regex (längster Treffer zuerst)."""
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: dict) -> str:
+    terminal = "" in node
+    branches = [re.escape(char) + _node_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if terminal:
+        # Längere Begriffe zuerst versuchen, sonst den kürzeren akzeptieren
+        return "(?:" + body + ")?"
+    return body
@@ -0,0 +1,284 @@
+"""
+Sessionübergreifender Ergebnis- und Artefakt-Cache
+Teilt Klassifizierungsergebnisse und gerenderte Artefakte (Markdown, CSV,
+Excel) zwischen allen Sessions eines Prozesses, optional ergänzt um eine
+Ablage auf der Festplatte.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import date
+from typing import Callable, Optional, Union
+
+from classifier_logic import (
+    ClassificationInput,
+    ClassificationResult,
+    CatalogSnapshot,
+    Clock,
+    SYSTEM_CLOCK,
+    classify_ai_system,
+    deadline_epoch,
+    get_catalog
+)
+
+
+Artifact = Union[str, bytes]
+
+# Standardgrenzen des prozessweiten Caches
+DEFAULT_MAX_RESULTS = 1000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+
+# Typkennung für Artefakte in der Festplattenablage
+_TAG_STR = b"s"
+_TAG_BYTES = b"b"
+
+
+class SharedResultCache:
+    """
+    Thread-sicherer Cache für Klassifizierungsergebnisse und Artefakte.
+
+    Ergebnisse werden über (Entscheidungs-Fingerabdruck, Fristen-Epoche,
+    Katalog-Version) adressiert. Innerhalb dieses Schlüssels ist die Einstufung
+    identisch; geteilt werden nur die Entscheidungsfelder, jeder Aufrufer
+    erhält eine Kopie mit dem Zeitstempel seiner eigenen Klassifizierung. Die
+    Listen der Kopien sind gemeinsam genutzt und dürfen nicht verändert werden.
+    Artefakte hängen zusätzlich von Art und Identität des Systems ab und
+    werden nach Größe (LRU) verdrängt.
+    Ist `disk_dir` gesetzt, werden Artefakte zusätzlich dort abgelegt.
+    """
+
+    def __init__(
+        self,
+        max_results: int = DEFAULT_MAX_RESULTS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES
+    ):
+        self.max_results = max_results
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.Lock()
+        self._results: OrderedDict[str, ClassificationResult] = OrderedDict()
+        self._artifacts: OrderedDict[str, tuple[Artifact, int]] = OrderedDict()  # (Artefakt, Größe in Bytes)
+        self._artifact_bytes = 0
+        self._disk_bytes: Optional[int] = None  # wird beim ersten Schreiben ermittelt
+
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Klassifizierungsergebnisse
+    # ------------------------------------------------------------------
+
+    def classify(
+        self,
+        inp: ClassificationInput,
+        reference_date: Optional[date] = None,
+        catalog: Optional[CatalogSnapshot] = None,
+        clock: Optional[Clock] = None
+    ) -> tuple[str, ClassificationResult]:
+        """
+        Klassifiziert über classify_ai_system oder liefert ein gespeichertes Ergebnis.
+        Gibt (Ergebnis-Schlüssel, Ergebnis) zurück; der Schlüssel adressiert die Artefakte.
+        `clock` bestimmt Zeitstempel (auch bei Cache-Treffern) und Standard-Referenzdatum.
+        """
+        if clock is None:
+            clock = SYSTEM_CLOCK
+        if reference_date is None:
+            reference_date = clock.today()
+        if catalog is None:
+            catalog = get_catalog()
+
+        key = result_key(inp.fingerprint(), deadline_epoch(reference_date), catalog.version)
+
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return key, replace(result, timestamp=clock.now())
+            self.misses += 1
+
+        # Berechnung außerhalb der Sperre; parallele Fehlzugriffe rechnen schlimmstenfalls doppelt
+        result = classify_ai_system(inp, reference_date=reference_date, catalog=catalog, clock=clock)
+
+        with self._lock:
+            result = self._results.setdefault(key, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return key, replace(result, timestamp=clock.now())
+
+    # ------------------------------------------------------------------
+    # Artefakte
+    # ------------------------------------------------------------------
+
+    def artifact(self, key: str, kind: str, identity: tuple, render: Callable[[], Artifact]) -> Artifact:
+        """
+        Liefert ein gerendertes Artefakt aus dem Cache oder erzeugt es mit `render`.
+
+        `key` ist der Ergebnis-Schlüssel aus classify(), `kind` die Artefaktart
+        (z.B. "markdown") und `identity` alle weiteren Eingaben des Renderers
+        (Systemname, Anbieter, ...).
+        """
+        artifact_key = hashlib.sha256(repr((key, kind, identity)).encode("utf-8")).hexdigest()
+
+        with self._lock:
+            cached = self._artifacts.get(artifact_key)
+            if cached is not None:
+                self._artifacts.move_to_end(artifact_key)
+                self.hits += 1
+                return cached[0]
+
+        value = self._read_disk(artifact_key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            value = render()
+            self._write_disk(artifact_key, value)
+
+        with self._lock:
+            if artifact_key not in self._artifacts:
+                size = _artifact_size(value)
+                self._artifacts[artifact_key] = (value, size)
+                self._artifact_bytes += size
+                while self._artifact_bytes > self.max_bytes and len(self._artifacts) > 1:
+                    _, (_, evicted) = self._artifacts.popitem(last=False)
+                    self._artifact_bytes -= evicted
+        return value
+
+    def clear(self) -> None:
+        """Leert den Arbeitsspeicher-Teil des Caches."""
+        with self._lock:
+            self._results.clear()
+            self._artifacts.clear()
+            self._artifact_bytes = 0
+
+    # ------------------------------------------------------------------
+    # Festplattenablage
+    # ------------------------------------------------------------------
+
+    def _disk_path(self, artifact_key: str) -> str:
+        return os.path.join(self.disk_dir, artifact_key[:2], artifact_key)
+
+    def _read_disk(self, artifact_key: str) -> Optional[Artifact]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(artifact_key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        tag, payload = data[:1], data[1:]
+        return payload.decode("utf-8") if tag == _TAG_STR else payload
+
+    def _write_disk(self, artifact_key: str, value: Artifact) -> None:
+        if not self.disk_dir:
+            return
+        if isinstance(value, str):
+            data = _TAG_STR + value.encode("utf-8")
+        else:
+            data = _TAG_BYTES + bytes(value)
+
+        path = self._disk_path(artifact_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        # Atomar über eine eindeutige temporäre Datei (auch prozessübergreifend),
+        # damit parallele Leser nie halbe Dateien sehen
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            else:
+                self._disk_bytes += len(data) - replaced
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _disk_entries(self) -> list[tuple[float, int, str]]:
+        """Listet (Zugriffszeit, Größe, Pfad) aller abgelegten Artefakte."""
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".tmp"):  # Schreibvorgang eines anderen Threads/Prozesses
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+        return entries
+
+    def _evict_disk(self) -> None:
+        """Löscht die am längsten nicht genutzten Dateien bis auf 90% der Obergrenze."""
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_bytes = total
+
+
+def _artifact_size(value: Artifact) -> int:
+    """Größe eines Artefakts in Bytes (Texte UTF-8-kodiert, wie in der Festplattenablage)."""
+    return len(value.encode("utf-8")) if isinstance(value, str) else len(value)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def result_key(fingerprint: str, epoch: int, catalog_version: str) -> str:
+    """Bildet den Cache-Schlüssel eines Klassifizierungsergebnisses."""
+    return f"{fingerprint}:{epoch}:{catalog_version}"
+
+
+_shared_cache: Optional[SharedResultCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedResultCache:
+    """
+    Gibt den prozessweiten Cache zurück (wird beim ersten Aufruf angelegt).
+
+    Konfiguration über Umgebungsvariablen:
+    AI_ACT_CACHE_DIR (optionale Festplattenablage) und AI_ACT_CACHE_MAX_MB
+    (Obergrenze für Artefakte im Arbeitsspeicher).
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                max_mb = float(os.environ.get("AI_ACT_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 1024 / 1024))
+                _shared_cache = SharedResultCache(
+                    max_bytes=int(max_mb * 1024 * 1024),
+                    disk_dir=os.environ.get("AI_ACT_CACHE_DIR") or None
+                )
+    return _shared_cache
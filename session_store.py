@@ -0,0 +1,315 @@
+"""
+Speicherbegrenztes Register für Klassifizierungen einer Session
+Hält nur die neuesten Einträge im Arbeitsspeicher und lagert ältere
+transparent in eine lokale SQLite-Datei aus.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import uuid
+import weakref
+from collections import deque
+from contextlib import closing
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from classifier_logic import ClassificationResult
+from export_utils import csv_columns
+from portfolio_index import DeadlineIndex, NearDuplicateIndex, ObligationIndex
+
+
+# Basisverzeichnis für lokal abgelegte Daten (Auslagerung, Caches, Protokolle)
+DATA_DIR = os.environ.get(
+    "AI_ACT_DATA_DIR",
+    os.path.join(tempfile.gettempdir(), "ai_act_classifier")
+)
+
+# Standardanzahl der im Arbeitsspeicher gehaltenen Klassifizierungen pro Session
+DEFAULT_MEMORY_LIMIT = 50
+
+# Anzahl der Zeilen, die beim Lesen aus der Auslagerungsdatei pro Abfrage geholt werden
+_FETCH_SIZE = 500
+
+# Spalten der Tabellenansicht; für ausgelagerte Einträge als eigene Tabellenspalten abgelegt
+DISPLAY_COLUMNS = ("Systemname", "Anbieter", "Risikostufe", "Klassifizierungsdatum")
+
+_SELECT_DISPLAY = ", ".join(f'"{col}"' for col in DISPLAY_COLUMNS)
+
+_SNAPSHOT_SCHEMA = "CREATE TABLE snapshot.classifications (id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+
+
+class ClassificationRegister:
+    """
+    Register der Klassifizierungs-Zusammenfassungen einer Session.
+
+    Die neuesten `memory_limit` Einträge liegen im Arbeitsspeicher, ältere werden
+    in eine SQLite-Datei ausgelagert. Lesende Zugriffe (Iteration, tail) sehen
+    immer alle Einträge in Einfügereihenfolge. Die Auslagerungsdatei wird beim
+    Leeren des Registers bzw. beim Aufräumen des Objekts gelöscht.
+
+    Für die Tabellenansicht werden die kurzen DISPLAY_COLUMNS ausgelagerter
+    Einträge in eigenen Tabellenspalten abgelegt, damit Seiten ohne JSON-Parsen
+    gelesen werden. Jede Änderung (Hinzufügen, Leeren) erhöht `version`;
+    abgeleitete Artefakte (Exporte) werden pro Version zwischengespeichert.
+    Zu jedem Eintrag mit Ergebnis werden die Portfolio-Indizes `deadlines`
+    (Fristen-Kalender), `obligations` (Pflichten/Artikel) und `duplicates`
+    (ähnliche Beschreibungen) fortgeschrieben; System-ID ist jeweils die
+    laufende Nummer des Eintrags.
+
+    `memory_limit` begrenzt alle Daten je Eintrag: Die MinHash-Signaturen
+    der Duplikaterkennung werden zusammen mit dem Eintrag ausgelagert,
+    Fristen und Pflichten belegen als Bitsets nur ein Bit je Eintrag und Begriff.
+    """
+
+    def __init__(self, memory_limit: int = DEFAULT_MEMORY_LIMIT, spill_path: Optional[str] = None):
+        if memory_limit < 1:
+            raise ValueError("memory_limit muss mindestens 1 sein")
+        self.memory_limit = memory_limit
+        self._window: deque[dict] = deque()
+        self._spilled = 0
+        self._spill_path = spill_path or os.path.join(DATA_DIR, "sessions", f"{uuid.uuid4().hex}.sqlite")
+        self._finalizer = weakref.finalize(self, _remove_file, self._spill_path)
+        self._keys: dict[str, None] = {}
+        self._artifacts: dict[str, tuple[int, Any]] = {}
+        self.deadlines = DeadlineIndex()
+        self.obligations = ObligationIndex()
+        self.duplicates = NearDuplicateIndex(connect=partial(_open_spill, self._spill_path))
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._window)
+
+    def __iter__(self) -> Iterator[dict]:
+        if self._spilled:
+            with closing(self._connect()) as conn:
+                cursor = conn.execute("SELECT data FROM classifications ORDER BY id")
+                while True:
+                    batch = cursor.fetchmany(_FETCH_SIZE)
+                    if not batch:
+                        break
+                    for (data,) in batch:
+                        yield json.loads(data)
+        yield from list(self._window)
+
+    @property
+    def spilled_count(self) -> int:
+        """Anzahl der ausgelagerten Einträge."""
+        return self._spilled
+
+    def append(self, summary: dict, result: Optional[ClassificationResult] = None, fingerprint: str = "") -> int:
+        """
+        Fügt eine Zusammenfassung hinzu und gibt ihre laufende Nummer (ab 0) zurück.
+        Mit `result` wird der Eintrag zusätzlich in die Portfolio-Indizes aufgenommen
+        (`fingerprint` = Entscheidungs-Fingerabdruck für die Duplikaterkennung).
+        """
+        self._window.append(summary)
+        self._keys.update(dict.fromkeys(summary))
+        index = len(self) - 1
+        if result is not None:
+            self.deadlines.add(index, result.applicable_deadlines)
+            self.obligations.add(index, result)
+            self.duplicates.add(index, summary.get("Beschreibung", ""), summary.get("Anbieter", ""), fingerprint)
+        self.version += 1
+        self._spill_overflow()
+        return index
+
+    @property
+    def columns(self) -> list[str]:
+        """Exportspalten über alle Einträge (Vereinigung der Schlüssel, siehe export_utils.csv_columns)."""
+        return csv_columns(self._keys)
+
+    def tail(self, n: int) -> list[dict]:
+        """Gibt die letzten n Einträge in Einfügereihenfolge zurück."""
+        if n <= 0:
+            return []
+        if n <= len(self._window):
+            return list(self._window)[-n:]
+
+        missing = min(n - len(self._window), self._spilled)
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT data FROM classifications ORDER BY id DESC LIMIT ?", (missing,)
+            ).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)] + list(self._window)
+
+    def column(self, name: str, ids: Iterable[int]) -> list:
+        """Gibt die Werte einer Tabellenspalte (DISPLAY_COLUMNS) für die angegebenen Einträge zurück."""
+        if name not in DISPLAY_COLUMNS:
+            raise KeyError(name)
+        ids = list(ids)
+        spilled = [i for i in ids if i < self._spilled]
+        stored = {}
+        if spilled:
+            with closing(self._connect()) as conn:
+                if len(spilled) <= _FETCH_SIZE:
+                    cursor = conn.execute(
+                        f'SELECT id, "{name}" FROM classifications WHERE id IN ({", ".join("?" * len(spilled))})',
+                        spilled
+                    )
+                else:
+                    cursor = conn.execute(
+                        f'SELECT id, "{name}" FROM classifications WHERE id BETWEEN ? AND ?',
+                        (min(spilled), max(spilled))
+                    )
+                stored = dict(cursor.fetchall())
+        return [
+            stored.get(i, "") if i < self._spilled else self._window[i - self._spilled].get(name, "")
+            for i in ids
+        ]
+
+    def page(self, offset: int, limit: int) -> dict[str, list]:
+        """Gibt einen Ausschnitt der Tabellenspalten zurück (spaltenweise)."""
+        end = min(offset + limit, len(self))
+        rows = []
+        if offset < self._spilled:
+            with closing(self._connect()) as conn:
+                rows = conn.execute(
+                    f"SELECT {_SELECT_DISPLAY} FROM classifications WHERE id >= ? AND id < ? ORDER BY id",
+                    (offset, min(end, self._spilled))
+                ).fetchall()
+        for i in range(max(offset, self._spilled), end):
+            summary = self._window[i - self._spilled]
+            rows.append(tuple(summary.get(col, "") for col in DISPLAY_COLUMNS))
+        return {col: [row[j] for row in rows] for j, col in enumerate(DISPLAY_COLUMNS)}
+
+    def artifact(self, kind: str, render: Callable[[], Any]) -> Any:
+        """
+        Gibt ein aus dem gesamten Register abgeleitetes Artefakt zurück.
+        Es wird nur neu erzeugt, wenn sich das Register seit dem letzten Aufruf geändert hat.
+        """
+        cached = self._artifacts.get(kind)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        value = render()
+        self._artifacts[kind] = (self.version, value)
+        return value
+
+    def snapshot(self) -> "RegisterSnapshot":
+        """
+        Friert den aktuellen Stand für Hintergrundaufträge ein. Ausgelagerte Einträge
+        werden in eine eigene Datei kopiert; spätere Änderungen am Register
+        (Hinzufügen, Leeren) wirken sich nicht auf den Schnappschuss aus.
+        """
+        path = ""
+        if self._spilled:
+            path = f"{os.path.splitext(self._spill_path)[0]}.{uuid.uuid4().hex}.snapshot.sqlite"
+            with closing(self._connect()) as conn:
+                conn.execute("ATTACH DATABASE ? AS snapshot", (path,))
+                with conn:
+                    conn.execute(_SNAPSHOT_SCHEMA)
+                    conn.execute(
+                        "INSERT INTO snapshot.classifications (id, data) "
+                        "SELECT id, data FROM main.classifications ORDER BY id"
+                    )
+                conn.execute("DETACH DATABASE snapshot")
+        return RegisterSnapshot(path, self._spilled, list(self._window), self.columns)
+
+    def set_memory_limit(self, memory_limit: int) -> None:
+        """Ändert die Obergrenze im Arbeitsspeicher und lagert bei Bedarf sofort aus."""
+        if memory_limit < 1:
+            raise ValueError("memory_limit muss mindestens 1 sein")
+        self.memory_limit = memory_limit
+        self._spill_overflow()
+
+    def clear(self) -> None:
+        """Entfernt alle Einträge inklusive der Auslagerungsdatei."""
+        self._window.clear()
+        self._spilled = 0
+        self._artifacts.clear()
+        self._keys.clear()
+        self.deadlines.clear()
+        self.obligations.clear()
+        self.duplicates.clear()
+        self.version += 1
+        _remove_file(self._spill_path)
+
+    def _spill_overflow(self) -> None:
+        """
+        Lagert die ältesten Einträge (samt Duplikat-Signaturen) aus, sobald das
+        Fenster die Obergrenze überschreitet; dabei wird bis auf die halbe
+        Obergrenze ausgelagert, damit nicht jedes Hinzufügen eine Transaktion kostet.
+        """
+        if len(self._window) <= self.memory_limit:
+            return
+        overflow = len(self._window) - (self.memory_limit + 1) // 2
+
+        rows = []
+        for system_id in range(self._spilled, self._spilled + overflow):
+            summary = self._window.popleft()
+            rows.append((
+                system_id,
+                json.dumps(summary, ensure_ascii=False),
+                *(_display_value(summary.get(col, "")) for col in DISPLAY_COLUMNS)
+            ))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                f"INSERT INTO classifications (id, data, {_SELECT_DISPLAY}) "
+                f"VALUES ({', '.join('?' * (2 + len(DISPLAY_COLUMNS)))})",
+                rows
+            )
+            self.duplicates.spill(range(self._spilled, self._spilled + overflow), conn)
+        self._spilled += overflow
+
+    def _connect(self) -> sqlite3.Connection:
+        return _open_spill(self._spill_path)
+
+
+class RegisterSnapshot:
+    """
+    Unveränderlicher Stand eines Registers (siehe ClassificationRegister.snapshot).
+    Liest wie das Register alle Einträge in Einfügereihenfolge; die Kopie der
+    ausgelagerten Einträge wird mit close() bzw. beim Aufräumen gelöscht.
+    """
+
+    def __init__(self, path: str, spilled: int, window: list[dict], columns: list[str]):
+        self.columns = columns
+        self._path = path
+        self._spilled = spilled
+        self._window = window
+        self._finalizer = weakref.finalize(self, _remove_file, path) if path else None
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._window)
+
+    def __iter__(self) -> Iterator[dict]:
+        if self._path:
+            with closing(sqlite3.connect(self._path)) as conn:
+                cursor = conn.execute("SELECT data FROM classifications ORDER BY id")
+                while True:
+                    batch = cursor.fetchmany(_FETCH_SIZE)
+                    if not batch:
+                        break
+                    for (data,) in batch:
+                        yield json.loads(data)
+        yield from self._window
+
+    def close(self) -> None:
+        """Löscht die Kopie der ausgelagerten Einträge."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+def _open_spill(path: str) -> sqlite3.Connection:
+    """Öffnet die Auslagerungsdatei (Streamlit kann Durchläufe auf wechselnden Threads ausführen)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS classifications (id INTEGER PRIMARY KEY, data TEXT NOT NULL, "
+        + ", ".join(f'"{col}"' for col in DISPLAY_COLUMNS) + ")"
+    )
+    return conn
+
+
+def _display_value(value: Any) -> Any:
+    """Spaltenwert für SQLite (Zahlen und Texte unverändert, sonst Textdarstellung)."""
+    return value if value is None or isinstance(value, (str, int, float)) else str(value)
+
+
+def _remove_file(path: str) -> None:
+    """Löscht eine Datei, falls vorhanden."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,466 @@
+"""
+Verteilte Stapel-Klassifizierung über eine gemeinsame SQLite-Warteschlange
+Mehrere Worker-Prozesse (auf einem oder mehreren Rechnern) holen sich Pakete
+von Inventar-Einträgen aus einer SQLite-Datei, klassifizieren sie, erzeugen
+die Markdown-Berichte und schreiben die Ergebnisse zurück - ohne externen
+Broker.
+
+Ein Paket wird für `lease_seconds` an einen Worker verliehen; der Worker
+verlängert die Leihe während der Arbeit. Stürzt er ab, läuft die Leihe ab
+und ein anderer Worker übernimmt das Paket. Ergebnisse werden nur
+angenommen, solange die Leihe (Worker und Versuch) noch gültig ist, sodass
+ein verspäteter Worker keine Ergebnisse doppelt schreibt. Zeitstempel,
+Referenzdatum und Katalog-Version werden beim Anlegen der Warteschlange
+festgehalten; alle Worker erzeugen damit identische Ergebnisse.
+
+Für mehrere Rechner muss die Datei auf einem gemeinsamen Dateisystem mit
+funktionierenden POSIX-Sperren liegen (SQLite-WAL setzt gemeinsamen
+Speicher voraus, daher wird hier der Rollback-Journal-Modus verwendet).
+
+Aufruf (aus dem Projektverzeichnis):
+    python work_queue.py enqueue QUEUE.sqlite inventar.csv [--chunk-size N] [--skip-invalid]
+    python work_queue.py work QUEUE.sqlite [--processes N]
+    python work_queue.py status QUEUE.sqlite
+    python work_queue.py export QUEUE.sqlite ergebnis.csv
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date, datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO, Union
+
+from batch import iter_batch
+from bulk_import import ImportReport, item_summary, iter_inputs
+from classifier_logic import CatalogSnapshot, ClassificationInput, Clock, SYSTEM_CLOCK, get_catalog
+from export_utils import generate_markdown_report, write_csv
+from intake_schema import get_validator
+
+
+# Einträge pro Paket
+DEFAULT_CHUNK_SIZE = 100
+
+# Leihdauer eines Pakets (Sekunden); verlängert wird nach einem Drittel
+DEFAULT_LEASE_SECONDS = 60.0
+
+# Versuche je Paket, bevor es als fehlgeschlagen gilt
+MAX_ATTEMPTS = 3
+
+# Wartezeit eines Workers, wenn alle offenen Pakete verliehen sind (Sekunden)
+POLL_INTERVAL = 1.0
+
+STATUS_PENDING = "pending"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    record_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    task_id INTEGER NOT NULL,
+    risk_level TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    report TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS results_position ON results (position);
+"""
+
+Record = tuple[str, Union[ClassificationInput, dict]]
+
+
+@dataclass(frozen=True)
+class Lease:
+    """Verliehenes Paket; `attempt` dient als Kennung der Leihe."""
+    task_id: int
+    worker: str
+    attempt: int
+    records: list[tuple[str, int, ClassificationInput]]   # (Record-ID, Position, Eingabe)
+
+
+@dataclass
+class WorkerReport:
+    worker: str
+    tasks: int = 0
+    records: int = 0
+    lost_leases: int = 0
+    failures: int = 0
+
+
+class WorkQueue:
+    """Warteschlange in einer SQLite-Datei; jede Methode nutzt eine eigene Verbindung (prozesssicher)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def enqueue(
+        self,
+        records: Iterable[Record],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        reference_date: Optional[date] = None,
+        catalog: Optional[CatalogSnapshot] = None,
+        clock: Optional[Clock] = None
+    ) -> int:
+        """
+        Legt (Record-ID, Eingabe)-Paare in Paketen ab und gibt die Anzahl der Einträge zurück.
+        Alle Einträge werden zuerst geprüft und dann in einer Transaktion abgelegt;
+        schlägt die Prüfung fehl, bleibt die Warteschlange unverändert. Eine
+        Warteschlange wird genau einmal befüllt (Record-IDs sind die Schlüssel der
+        Ergebnisse), dabei werden Zeitstempel, Referenzdatum und Katalog-Version festgehalten.
+        """
+        if catalog is None:
+            catalog = get_catalog()
+        validator = get_validator(catalog)
+
+        payloads = []
+        seen: set[str] = set()
+        position = 0
+        records_iter = iter(records)
+        while True:
+            chunk = list(islice(records_iter, chunk_size))
+            if not chunk:
+                break
+            payload = []
+            for record_id, record in chunk:
+                if record_id in seen:
+                    raise ValueError(f"Eintrag {record_id}: Record-ID ist doppelt")
+                seen.add(record_id)
+                if not isinstance(record, ClassificationInput):
+                    errors = validator.errors(record)
+                    if errors:
+                        raise ValueError(f"Eintrag {record_id}: {'; '.join(errors)}")
+                    record = ClassificationInput.from_kwargs(catalog=catalog, **record)
+                payload.append([record_id, position, record.pack()])
+                position += 1
+            payloads.append((json.dumps(payload, ensure_ascii=False), len(payload)))
+
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone():
+                    raise ValueError("Warteschlange enthält bereits Einträge; bitte eine neue Datei verwenden")
+                settings = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+                if not settings:
+                    started = (clock or SYSTEM_CLOCK).now()
+                    settings = {
+                        "started": started.isoformat(),
+                        "reference_date": (reference_date or started.date()).isoformat(),
+                        "catalog_version": catalog.version,
+                    }
+                    conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", settings.items())
+                elif settings["catalog_version"] != catalog.version:
+                    raise ValueError(
+                        f"Warteschlange wurde mit Katalog-Version {settings['catalog_version']} angelegt, "
+                        f"aktiv ist {catalog.version}"
+                    )
+                conn.executemany("INSERT INTO tasks (payload, size) VALUES (?, ?)", payloads)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return position
+
+    def lease(self, worker: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Lease]:
+        """Verleiht das nächste offene (oder abgelaufene) Paket; None, wenn derzeit keines frei ist."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")  # Schreibsperre: nur ein Worker wählt gleichzeitig aus
+            try:
+                row = conn.execute(
+                    "SELECT id, payload, attempts FROM tasks "
+                    "WHERE (status = ? OR (status = ? AND lease_expires < ?)) AND attempts < ? "
+                    "ORDER BY id LIMIT 1",
+                    (STATUS_PENDING, STATUS_LEASED, now, MAX_ATTEMPTS)
+                ).fetchone()
+                if row is None:
+                    # Abgelaufene Pakete ohne verbleibende Versuche endgültig aufgeben
+                    conn.execute(
+                        "UPDATE tasks SET status = ?, error = 'Leihe mehrfach abgelaufen' "
+                        "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                        (STATUS_FAILED, STATUS_LEASED, now, MAX_ATTEMPTS)
+                    )
+                    conn.execute("COMMIT")
+                    return None
+                task_id, payload, attempts = row
+                conn.execute(
+                    "UPDATE tasks SET status = ?, owner = ?, lease_expires = ?, attempts = ? WHERE id = ?",
+                    (STATUS_LEASED, worker, now + lease_seconds, attempts + 1, task_id)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        records = [
+            (record_id, position, ClassificationInput.unpack(packed))
+            for record_id, position, packed in json.loads(payload)
+        ]
+        return Lease(task_id, worker, attempts + 1, records)
+
+    def renew(self, lease: Lease, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Verlängert eine Leihe; False, wenn sie inzwischen an einen anderen Worker gegangen ist."""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND status = ? AND owner = ? AND attempts = ?",
+                (time.time() + lease_seconds, lease.task_id, STATUS_LEASED, lease.worker, lease.attempt)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, lease: Lease, results: list[tuple]) -> bool:
+        """
+        Schreibt (record_id, position, risk_level, summary, report) und schließt das Paket ab.
+        Ist die Leihe verloren, wird nichts geschrieben und False zurückgegeben.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = conn.execute(
+                    "UPDATE tasks SET status = ?, lease_expires = NULL "
+                    "WHERE id = ? AND status = ? AND owner = ? AND attempts = ?",
+                    (STATUS_DONE, lease.task_id, STATUS_LEASED, lease.worker, lease.attempt)
+                )
+                if cursor.rowcount != 1:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.executemany(
+                    "INSERT OR REPLACE INTO results (record_id, position, task_id, risk_level, summary, report) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(record_id, position, lease.task_id, *rest) for record_id, position, *rest in results]
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def fail(self, lease: Lease, error: str) -> None:
+        """Gibt ein Paket nach einem Fehler zurück (endgültig fehlgeschlagen nach MAX_ATTEMPTS)."""
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "lease_expires = NULL, error = ? "
+                "WHERE id = ? AND status = ? AND owner = ? AND attempts = ?",
+                (MAX_ATTEMPTS, STATUS_FAILED, STATUS_PENDING, error,
+                 lease.task_id, STATUS_LEASED, lease.worker, lease.attempt)
+            )
+
+    def settings(self) -> dict:
+        """Festgehaltene Rahmendaten (started, reference_date, catalog_version)."""
+        with closing(self._connect()) as conn:
+            return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def status(self) -> dict[str, int]:
+        """Anzahl der Pakete je Status sowie der geschriebenen Ergebnisse."""
+        counts = dict.fromkeys((STATUS_PENDING, STATUS_LEASED, STATUS_DONE, STATUS_FAILED), 0)
+        with closing(self._connect()) as conn:
+            counts.update(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+            counts["results"] = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return counts
+
+    def is_drained(self) -> bool:
+        """True, wenn kein Paket mehr offen oder verliehen ist."""
+        counts = self.status()
+        return counts[STATUS_PENDING] == 0 and counts[STATUS_LEASED] == 0
+
+    def summaries(self) -> Iterator[dict]:
+        """Zusammenfassungen in Eingabereihenfolge."""
+        with closing(self._connect()) as conn:
+            for (summary,) in conn.execute("SELECT summary FROM results ORDER BY position"):
+                yield json.loads(summary)
+
+    def report(self, record_id: str) -> str:
+        """Markdown-Bericht eines Eintrags; KeyError, falls (noch) nicht vorhanden."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT report FROM results WHERE record_id = ?", (record_id,)).fetchone()
+        if row is None:
+            raise KeyError(record_id)
+        return row[0]
+
+    def export_csv(self, file: TextIO) -> int:
+        return write_csv(self.summaries(), file)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # Autocommit; mehrteilige Schreibvorgänge öffnen ihre Transaktion selbst (BEGIN IMMEDIATE)
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        return conn
+
+
+def run_worker(
+    path: str,
+    worker: Optional[str] = None,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    render_reports: bool = True,
+    catalog: Optional[CatalogSnapshot] = None,
+    max_tasks: Optional[int] = None
+) -> WorkerReport:
+    """
+    Arbeitet Pakete ab, bis die Warteschlange leer ist (bzw. `max_tasks` erreicht sind).
+    Sind alle offenen Pakete verliehen, wartet der Worker auf ablaufende Leihen.
+    """
+    queue = WorkQueue(path)
+    if catalog is None:
+        catalog = get_catalog()
+    settings = queue.settings()
+    if settings and settings["catalog_version"] != catalog.version:
+        raise ValueError(
+            f"Warteschlange wurde mit Katalog-Version {settings['catalog_version']} angelegt, "
+            f"aktiv ist {catalog.version}"
+        )
+    if worker is None:
+        worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    report = WorkerReport(worker)
+
+    while max_tasks is None or report.tasks < max_tasks:
+        lease = queue.lease(worker, lease_seconds)
+        if lease is None:
+            if queue.is_drained():
+                break
+            time.sleep(POLL_INTERVAL)
+            continue
+        try:
+            results = _process(queue, lease, settings, catalog, lease_seconds, render_reports)
+        except _LeaseLost:
+            report.lost_leases += 1
+            continue
+        except Exception as e:  # Paket zurückgeben, andere Pakete weiter bearbeiten
+            queue.fail(lease, f"{type(e).__name__}: {e}")
+            report.failures += 1
+            continue
+        if queue.complete(lease, results):
+            report.tasks += 1
+            report.records += len(results)
+        else:
+            report.lost_leases += 1
+    return report
+
+
+class _LeaseLost(Exception):
+    pass
+
+
+def _process(
+    queue: WorkQueue,
+    lease: Lease,
+    settings: dict,
+    catalog: CatalogSnapshot,
+    lease_seconds: float,
+    render_reports: bool
+) -> list[tuple]:
+    """Klassifiziert ein Paket (über batch.iter_batch) und verlängert die Leihe nach Bedarf."""
+    clock = Clock.fixed(datetime.fromisoformat(settings["started"]))
+    reference_date = date.fromisoformat(settings["reference_date"])
+    renew_at = time.monotonic() + lease_seconds / 3
+
+    results = []
+    items = iter_batch((inp for _, _, inp in lease.records), reference_date, catalog, clock=clock)
+    for (record_id, position, inp), item in zip(lease.records, items):
+        report = ""
+        if render_reports:
+            report = generate_markdown_report(item.result, inp.system_name, inp.system_description, inp.provider, clock=clock)
+        results.append((
+            record_id, position, item.result.risk_level.value,
+            json.dumps(item_summary(item), ensure_ascii=False), report
+        ))
+        if time.monotonic() >= renew_at:
+            if not queue.renew(lease, lease_seconds):
+                raise _LeaseLost()
+            renew_at = time.monotonic() + lease_seconds / 3
+    return results
+
+
+def _worker_process(path: str, lease_seconds: float, render_reports: bool) -> None:
+    report = run_worker(path, lease_seconds=lease_seconds, render_reports=render_reports)
+    print(f"{report.worker}: {report.tasks} Pakete, {report.records} Einträge, "
+          f"{report.lost_leases} verlorene Leihen, {report.failures} Fehler", flush=True)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Inventar (CSV/Excel) in die Warteschlange stellen")
+    enqueue.add_argument("queue")
+    enqueue.add_argument("inventory")
+    enqueue.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    enqueue.add_argument("--skip-invalid", action="store_true", help="ungültige Zeilen überspringen statt abzubrechen")
+
+    work = commands.add_parser("work", help="Worker starten")
+    work.add_argument("queue")
+    work.add_argument("--processes", type=int, default=1)
+    work.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    work.add_argument("--no-reports", action="store_true", help="keine Markdown-Berichte erzeugen")
+
+    status = commands.add_parser("status", help="Stand der Warteschlange anzeigen")
+    status.add_argument("queue")
+
+    export = commands.add_parser("export", help="Ergebnisse als CSV exportieren")
+    export.add_argument("queue")
+    export.add_argument("output")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "enqueue":
+        queue = WorkQueue(args.queue)
+        report = ImportReport()
+        records = [(f"Zeile {row}", inp) for row, inp in iter_inputs(args.inventory, report=report)]
+        if report.assignment_count:
+            print(f"{report.assignment_count} Freitexte unscharf dem Katalog zugeordnet")
+        if report.error_count:
+            for error in report.errors:
+                print(f"Zeile {error.row}: {'; '.join(error.messages)}", file=sys.stderr)
+            if len(report.errors) < report.error_count:
+                print(f"... weitere {report.error_count - len(report.errors)} ungültige Zeilen", file=sys.stderr)
+            if not args.skip_invalid:
+                print(f"{report.error_count} von {report.rows} Zeilen ungültig, nichts eingereiht "
+                      "(--skip-invalid überspringt sie)", file=sys.stderr)
+                return 1
+            print(f"{report.error_count} ungültige Zeilen übersprungen", file=sys.stderr)
+        print(f"{queue.enqueue(records, args.chunk_size)} Einträge eingereiht")
+    elif args.command == "work":
+        WorkQueue(args.queue)  # Schema anlegen, bevor mehrere Prozesse starten
+        processes = [
+            multiprocessing.Process(target=_worker_process, args=(args.queue, args.lease_seconds, not args.no_reports))
+            for _ in range(max(args.processes, 1))
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    elif args.command == "status":
+        for key, value in WorkQueue(args.queue).status().items():
+            print(f"{key:<8} {value}")
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            print(f"{WorkQueue(args.queue).export_csv(f)} Zeilen exportiert")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())